@@ -1,9 +1,12 @@
 import ROOT
 import argparse
+import os
 import awkward as ak
 import json
 import numpy as np
 from sampleBuilder import samples_unpacked, samples_emulated
+import streamAlignment
+import profiling
 
 # limits for histograms
 min_diff = -100
@@ -16,40 +19,82 @@ min_score = 0
 max_score = 256
 bins_score = 100
 
-def main(dataset, out_dir):
+########################################################################
+# Counts, for every distinct row of keys (e.g. run, or run and lumi),
+# the total number of events and the number of events where mismatch is
+# True. Each row stands for weights events (one by default). Returns the
+# unique keys and the two (integer) counts
+def countByKey(keys, mismatch, weights=None):
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
 
-    dict_total = {}
-    dict_discrepancies = {}
+    if weights is None:
+        weights = np.ones(len(inverse), dtype=np.int64)
+    total = np.bincount(inverse, weights=weights, minlength=len(unique_keys)).astype(np.int64)
+    discrepancies = np.bincount(inverse[mismatch], weights=weights[mismatch], minlength=len(unique_keys)).astype(np.int64)
 
-    # get dataframe from samples
-    print("Getting dataframes and creating aliases")
-    df_unpacked = samples_unpacked[dataset].getNewDataframe()
-    df_emulated = samples_emulated[dataset].getNewDataframe()
-    df_unpacked = df_unpacked.Alias("CICADAScore_unpacked", "CICADAScore")
-    df_emulated = df_emulated.Alias("CICADAScore_emulated", "CICADAScore")
+    return unique_keys, total, discrepancies
 
-    print("Saving as numpy arrays")
-    df_unpacked_arr = df_unpacked.AsNumpy(columns=["CICADAScore_unpacked", "run"])
-    df_emulated_arr = df_emulated.AsNumpy(columns=["CICADAScore_emulated"])
+# per-run and per-lumisection counts of the events with the run and lumi
+# numbers run and lumi, and of those where mismatch is True
+def countRunsAndLumis(run, lumi, mismatch, weights=None):
+    runs, run_total, run_discrepancies = countByKey(run, mismatch, weights)
+    lumis, lumi_total, lumi_discrepancies = countByKey(np.stack([run, lumi], axis=1), mismatch, weights)
+    return runs, run_total, run_discrepancies, lumis, lumi_total, lumi_discrepancies
 
-    combined_data = {
-        "run": df_unpacked_arr["run"],
-        "CICADAScore_unpacked": df_unpacked_arr["CICADAScore_unpacked"],
-        "CICADAScore_emulated": df_emulated_arr["CICADAScore_emulated"],
-        "score_difference": df_unpacked_arr["CICADAScore_unpacked"] - df_emulated_arr["CICADAScore_emulated"]
-    }
+########################################################################
+# The single pass counts the events of each (run, lumi, discrepancy)
+# inside the event loop with keycounts::countKeys, on a key packing the
+# three into 64 bits: run << 33 | lumi << 1 | discrepancy
+keyCountsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyCounts.h")
+countKeyExpression = "(ULong64_t(run) << 33) | (ULong64_t(lumi) << 1) | ULong64_t(score_difference != 0)"
 
-    print("Creating combined dataframe")
-    combined_df = ROOT.RDF.FromNumpy(combined_data)
+def loadKeyCounts():
+    if not hasattr(ROOT, "keycounts"):
+        ROOT.gInterpreter.Declare(f'#include "{keyCountsPath}"')
 
-    # create output ROOT file
-    print("Creating output ROOT file")
-    output_file = ROOT.TFile(
-        f'{out_dir}/hist_comparescore_{dataset}.root',
-        'RECREATE'
-    )
+# per-run and per-lumisection counts from the counts of each key of
+# countKeyExpression, as returned by countRunsAndLumis
+def countsFromKeys(keys, counts):
+    run = keys >> np.uint64(33)
+    lumi = (keys >> np.uint64(1)) & np.uint64(0xFFFFFFFF)
+    mismatch = (keys & np.uint64(1)) == 1
+    return countRunsAndLumis(run, lumi, mismatch, counts)
+
+########################################################################
+# Writes the per-run and per-lumisection event and discrepancy counts to
+# the json file out_path. runs holds the run numbers, lumis the (run,
+# lumi) pairs, with the corresponding counts from countByKey
+def writeCounts(out_path, runs, run_total, run_discrepancies, lumis, lumi_total, lumi_discrepancies):
+
+    dict_runs = {}
+    for i in range(len(runs)):
+        dict_runs[int(runs[i])] = {
+            "total": int(run_total[i]),
+            "discrepancies": int(run_discrepancies[i]),
+            "ratio": run_discrepancies[i]/run_total[i],
+        }
+        print("    Run = ", runs[i], ", Fraction Not Matching = ", dict_runs[int(runs[i])]["ratio"])
+
+    dict_lumis = {}
+    for i in range(len(lumis)):
+        run = int(lumis[i][0])
+        if run not in dict_lumis:
+            dict_lumis[run] = {}
+        dict_lumis[run][int(lumis[i][1])] = {
+            "total": int(lumi_total[i]),
+            "discrepancies": int(lumi_discrepancies[i]),
+            "ratio": lumi_discrepancies[i]/lumi_total[i],
+        }
+
+    with open(out_path, "w") as outfile:
+        json.dump({"runs": dict_runs, "lumis": dict_lumis}, outfile)
+
+########################################################################
+# Books (without filling) the 2d histograms of run number against score
+# difference, unpacked score and emulated score on the dataframe df
+def bookHists(df):
 
-    print("Creating and writing histogram for difference")
     histModel = ROOT.RDF.TH2DModel(
         "compareScore",
         "compareScore",
@@ -60,14 +105,12 @@ def main(dataset, out_dir):
         min_diff,
         max_diff,
     )
-    hist = combined_df.Histo2D(
+    hist_diff = df.Histo2D(
         histModel,
         "run",
         "score_difference"
     )
-    hist.Write()
 
-    print("Creating and writing histogram for unpacked score")
     histModel = ROOT.RDF.TH2DModel(
         "unpackedScore",
         "unpackedScore",
@@ -78,14 +121,12 @@ def main(dataset, out_dir):
         min_score,
         max_score,
     )
-    hist = combined_df.Histo2D(
+    hist_unpacked = df.Histo2D(
         histModel,
         "run",
         "CICADAScore_unpacked"
     )
-    hist.Write()
 
-    print("Creating and writing histogram for emulated score")
     histModel = ROOT.RDF.TH2DModel(
         "emulatedScore",
         "emulatedScore",
@@ -96,30 +137,123 @@ def main(dataset, out_dir):
         min_score,
         max_score,
     )
-    hist = combined_df.Histo2D(
+    hist_emulated = df.Histo2D(
         histModel,
         "run",
         "CICADAScore_emulated"
     )
-    hist.Write()
 
-    print("Computing number of discrepancies and saving to dictionaries")
-    for i in range(len(combined_data["run"])):
-        if not combined_data["run"][i] in dict_total:
-            dict_total[combined_data["run"][i]] = 0
-            dict_discrepancies[combined_data["run"][i]] = 0
+    return [hist_diff, hist_unpacked, hist_emulated]
 
-        if combined_data["score_difference"][i]!=0: dict_discrepancies[combined_data["run"][i]]+=1
-        dict_total[combined_data["run"][i]]+=1
+########################################################################
+# Fills the histograms and per-run/per-lumisection counters in a single
+# event loop. The emulated score tree is added as a friend (with alias
+# "emulated") of the unpacked chain, and the counters only hold one
+# entry per (run, lumi, discrepancy), so nothing is held in memory per
+# event. The streams must be checked to be aligned before (see main)
+def fillSinglePass(dataset, output_file):
 
-    print("Dividing number of discrepancies by total number of events and saving")
-    dict_ratio = {}
-    for run in dict_total.keys():
-        dict_ratio[int(run)] = dict_discrepancies[run]/dict_total[run]
-        print("    Run = ", run, ", Fraction Not Matching = ", dict_ratio[run])
+    print("Getting chains and joining them as friends")
+    chain = samples_unpacked[dataset].getNewChain()
+    chain_emulated = samples_emulated[dataset].getNewChain(['l1CaloSummaryEmuTree/L1CaloSummaryTree'])
+    chain.AddFriend(chain_emulated, "emulated")
+
+    df = ROOT.RDataFrame(chain)
+    profiling.trackEvents(df)
+    df = df.Define("CICADAScore_unpacked", "CICADAScore")
+    df = df.Define("CICADAScore_emulated", "emulated.CICADAScore")
+    df = df.Define("score_difference", "CICADAScore_unpacked - CICADAScore_emulated")
+
+    print("Booking histograms and counters")
+    hists = bookHists(df)
+
+    # events of each (run, lumi, discrepancy), counted in the same event
+    # loop. The counts need no fixed run/lumi range, so no event is lost
+    # to under- or overflow
+    loadKeyCounts()
+    df = df.Define("count_key", countKeyExpression)
+    counters = ROOT.keycounts.countKeys(ROOT.RDF.AsRNode(df), "count_key")
+
+    print("Running event loop and writing histograms")
+    with profiling.stage("eventLoop", dataset, countEvents=True):
+        counters = counters.GetValue()
+    output_file.cd()
+    for hist in hists:
+        hist.Write()
+
+    print("Computing number of discrepancies per run and lumisection")
+    keys = np.fromiter((entry.first for entry in counters), dtype=np.uint64, count=counters.size())
+    counts = np.fromiter((entry.second for entry in counters), dtype=np.int64, count=counters.size())
+    return countsFromKeys(keys, counts)
+
+########################################################################
+# Reads the unpacked and emulated scores into numpy arrays, fills the
+# histograms from a dataframe built on those arrays and counts the
+# discrepancies per run and lumisection
+def fillFromNumpy(dataset, output_file):
+
+    # get dataframe from samples
+    print("Getting dataframes and creating aliases")
+    df_unpacked = samples_unpacked[dataset].getNewDataframe()
+    df_emulated = samples_emulated[dataset].getNewDataframe()
+    df_unpacked = df_unpacked.Alias("CICADAScore_unpacked", "CICADAScore")
+    df_emulated = df_emulated.Alias("CICADAScore_emulated", "CICADAScore")
+
+    print("Saving as numpy arrays")
+    with profiling.stage("eventLoop", f"{dataset} unpacked", countEvents=True):
+        df_unpacked_arr = df_unpacked.AsNumpy(columns=["CICADAScore_unpacked", "run", "lumi"])
+    with profiling.stage("eventLoop", f"{dataset} emulated", countEvents=True):
+        df_emulated_arr = df_emulated.AsNumpy(columns=["CICADAScore_emulated"])
+
+    combined_data = {
+        "run": df_unpacked_arr["run"],
+        "CICADAScore_unpacked": df_unpacked_arr["CICADAScore_unpacked"],
+        "CICADAScore_emulated": df_emulated_arr["CICADAScore_emulated"],
+        "score_difference": df_unpacked_arr["CICADAScore_unpacked"] - df_emulated_arr["CICADAScore_emulated"]
+    }
+
+    print("Creating combined dataframe")
+    combined_df = ROOT.RDF.FromNumpy(combined_data)
+
+    print("Creating and writing histograms")
+    output_file.cd()
+    for hist in bookHists(combined_df):
+        hist.Write()
 
-    with open(f"{out_dir}/differences_{dataset}.json", "w") as outfile:
-        json.dump(dict_ratio, outfile)
+    print("Computing number of discrepancies per run and lumisection")
+    mismatch = combined_data["score_difference"] != 0
+    return countRunsAndLumis(combined_data["run"], df_unpacked_arr["lumi"], mismatch)
+
+def main(dataset, out_dir, single_pass, check_alignment):
+
+    # both fill modes read the unpacked and emulated scores side by
+    # side, which is only correct if the two streams are event aligned.
+    # The single pass joins them as friends by entry number, so it is
+    # always checked
+    if check_alignment or single_pass:
+        print("Checking event alignment of unpacked and emulated streams")
+        report = streamAlignment.main(dataset, out_dir)
+        if not report["aligned"]:
+            raise RuntimeError(
+                f"Unpacked and emulated streams of {dataset} are not event aligned, see {out_dir}/alignment_{dataset}.json"
+            )
+
+    # create output ROOT file
+    print("Creating output ROOT file")
+    output_file = ROOT.TFile(
+        f'{out_dir}/hist_comparescore_{dataset}.root',
+        'RECREATE'
+    )
+
+    if single_pass:
+        counts = fillSinglePass(dataset, output_file)
+    else:
+        counts = fillFromNumpy(dataset, output_file)
+
+    output_file.Close()
+
+    print("Dividing number of discrepancies by total number of events and saving")
+    writeCounts(f"{out_dir}/differences_{dataset}.json", *counts)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -136,7 +270,19 @@ if __name__ == "__main__":
         default = ".",
         help="directory to save files to"
     )
+    parser.add_argument(
+        "-s",
+        "--single_pass",
+        action="store_true",
+        help="fill histograms and counters in one pass over the unpacked and emulated chains joined as friends"
+    )
+    parser.add_argument(
+        "-c",
+        "--check_alignment",
+        action="store_true",
+        help="check the entry counts of the unpacked and emulated streams first and stop if they are not aligned (always done with --single_pass)"
+    )
 
     args = parser.parse_args()
 
-    main(args.dataset, args.out_dir)
+    main(args.dataset, args.out_dir, args.single_pass, args.check_alignment)
@@ -93,9 +93,9 @@ def main(input_file_hist, input_file_json, out_dir, dataset):
     f.close()
 
     f = open(input_file_json)
-    data = json.load(f)
+    data = json.load(f)["runs"]
     runs = list(data.keys())
-    ratios = list(data.values())
+    ratios = [data[run]["ratio"] for run in runs]
     ratios = [x for _,x in sorted(zip(runs, ratios))]
     runs = sorted(runs)
 
@@ -0,0 +1,35 @@
+////////////////////////////////////////////////////////////////////////
+// keyCounts.h                                                        //
+// counts the events of each value of a 64 bit key column inside the  //
+// event loop, so that memory grows with the number of distinct keys  //
+// rather than with the number of events                              //
+////////////////////////////////////////////////////////////////////////
+
+#ifndef KEYCOUNTS_H
+#define KEYCOUNTS_H
+
+#include <map>
+#include <string>
+#include <vector>
+#include "ROOT/RDataFrame.hxx"
+
+namespace keycounts {
+
+using Counts = std::map<ULong64_t, ULong64_t>;
+
+// books (without running) the number of events of each value of the
+// ULong64_t column column of df. Each slot fills its own map, and the
+// maps are added up once the loop is done
+inline ROOT::RDF::RResultPtr<Counts> countKeys(ROOT::RDF::RNode df, const std::string& column) {
+    auto aggregator = [](Counts& counts, ULong64_t key) { ++counts[key]; };
+    auto merger = [](std::vector<Counts>& slots) {
+        for (std::size_t i = 1; i < slots.size(); ++i) {
+            for (const auto& entry : slots[i]) slots[0][entry.first] += entry.second;
+        }
+    };
+    return df.Aggregate(aggregator, merger, column, Counts());
+}
+
+}
+
+#endif
@@ -1,15 +1,24 @@
 import sys
 import os
-import json
 
 current = os.path.dirname(os.path.realpath(__file__))
 parent = os.path.dirname(current)
 sys.path.append(parent)
 
 from sample import sample
+from fileCatalog import fileCatalog, sampleCollection, loadFileEntries
 
-f = open("filePaths.json")
-filePaths = json.load(f)
+# samples are built from the catalog only when they are first used
+filePaths = fileCatalog("filePaths.json")
+
+# how the friend trees of the samples are kept event aligned (see
+# sample.__init__). Off by default, as the streams are checked once per
+# dataset with createScoreComparisonHist.py --check_alignment (see
+# streamAlignment.py); set it before the first use of a sample to check
+# on every chain instead. Entries are counted from the metadata of
+# saveFilesToJSON.py where it exists, and from the files otherwise
+friendCheck = None
+metadataPath = "fileMetadata.json"
 
 treeNames_unpacked = [
     'l1EventTree/L1EventTree',
@@ -21,22 +30,22 @@ treeNames_emulated = [
     'l1CaloSummaryEmuTree/L1CaloSummaryTree'
 ]
 
-samples_unpacked = dict(
-    [
-        (
-            sampleName,
-            sample(listOfFiles = filePaths[sampleName], treeNames = treeNames_unpacked)
-        )
-        for sampleName in filePaths
-    ]
+# function for building sample object from files
+def buildSample(paths, treeNames):
+    theSample = sample(
+        listOfFiles = paths,
+        treeNames = treeNames,
+        friendCheck = friendCheck,
+        fileEntries = loadFileEntries(metadataPath)
+    )
+    return theSample
+
+samples_unpacked = sampleCollection(
+    filePaths,
+    lambda paths: buildSample(paths, treeNames_unpacked)
 )
 
-samples_emulated = dict(
-    [
-        (
-            sampleName,
-            sample(listOfFiles = filePaths[sampleName], treeNames = treeNames_emulated)
-        )
-        for sampleName in filePaths
-    ]
+samples_emulated = sampleCollection(
+    filePaths,
+    lambda paths: buildSample(paths, treeNames_emulated)
 )
@@ -1,21 +1,155 @@
+########################################################################
+## saveFilesToJSON.py                                                 ##
+## builds filePaths.json, the catalog of the ntuples of each dataset, ##
+## and fileMetadata.json with the size, mtime and entry counts of     ##
+## every file                                                         ##
+########################################################################
+
 import os
 import json
+import argparse
+import uproot
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 datasets = ["Muon0", "JetMET0", "Tau"]
 directories = ["/hdfs/store/user/ekauffma/Muon0/", "/hdfs/store/user/ekauffma/JetMET0", "/hdfs/store/user/ekauffma/Tau"]
 
-def list_root_files(directory):
-    root_files = []
-    for dirpath, _, filenames in os.walk(directory):
-        for filename in filenames:
-            if filename.endswith('.root'):
-                full_path = os.path.join(dirpath, filename)
-                root_files.append(full_path)
-    return root_files
-
-filePaths = {}
-for i in range(len(datasets)):
-    filePaths[datasets[i]] = root_files = list_root_files(directories[i])
-
-with open("filePaths.json", "w") as outfile:
-    json.dump(filePaths, outfile)
+# trees whose number of entries is recorded for every file
+countedTrees = [
+    'l1EventTree/L1EventTree',
+    'l1CaloSummaryTree/L1CaloSummaryTree',
+    'l1CaloSummaryEmuTree/L1CaloSummaryTree',
+]
+
+########################################################################
+# Lists one directory. If its mtime is unchanged since the last scan no
+# file was added or removed directly in it, so the cached listing is
+# reused without touching the files. Returns (directory metadata, list
+# of root files in it, list of subdirectories, whether it was listed)
+def scanDirectory(dirpath, cachedDirectory):
+
+    mtime = os.stat(dirpath).st_mtime_ns
+    if cachedDirectory is not None and cachedDirectory["mtime"] == mtime:
+        return cachedDirectory, cachedDirectory["files"], cachedDirectory["subdirs"], False
+
+    files = []
+    subdirs = []
+    with os.scandir(dirpath) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=True):
+                subdirs.append(entry.path)
+            elif entry.name.endswith('.root'):
+                files.append(entry.path)
+
+    files.sort()
+    subdirs.sort()
+    directory = {"mtime": mtime, "files": files, "subdirs": subdirs}
+    return directory, files, subdirs, True
+
+########################################################################
+# Walks the tree below top, listing directories concurrently on
+# executor. Returns the metadata of every directory visited and the
+# number of directories that had to be listed again
+def walkDirectories(top, cachedDirectories, executor):
+
+    scanned = {}
+    n_rescanned = 0
+    pending = {executor.submit(scanDirectory, top, cachedDirectories.get(top)): top}
+
+    while len(pending) > 0:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            dirpath = pending.pop(future)
+            directory, _, subdirs, rescanned = future.result()
+            scanned[dirpath] = directory
+            n_rescanned += rescanned
+            for subdir in subdirs:
+                pending[executor.submit(scanDirectory, subdir, cachedDirectories.get(subdir))] = subdir
+
+    return scanned, n_rescanned
+
+########################################################################
+# Returns the size, mtime and number of entries of each tree in
+# countedTrees of the file fileName (None for trees it does not contain,
+# and for every tree if the file cannot be read)
+def describeFile(fileName):
+
+    stat = os.stat(fileName)
+    entries = {treeName: None for treeName in countedTrees}
+    try:
+        with uproot.open(fileName) as f:
+            for treeName in countedTrees:
+                try:
+                    entries[treeName] = f[treeName].num_entries
+                except uproot.KeyInFileError:
+                    print(f"    {fileName} has no tree {treeName}")
+    except (OSError, uproot.deserialization.DeserializationError) as error:
+        print(f"    Could not read {fileName}: {error}")
+
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "entries": entries}
+
+# reuses the cached description of fileName unless its size or mtime
+# changed
+def updateFile(fileName, cachedFile):
+    if cachedFile is not None:
+        stat = os.stat(fileName)
+        if stat.st_size == cachedFile["size"] and stat.st_mtime_ns == cachedFile["mtime"]:
+            return cachedFile
+    return describeFile(fileName)
+
+########################################################################
+# Builds the catalog of the files of every dataset, reusing whatever is
+# still valid in the metadata of the previous run
+def main(metadata_path, out_path, n_workers):
+
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            cache = json.load(f)
+    else:
+        cache = {}
+
+    filePaths = {}
+    metadata = {}
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        for i in range(len(datasets)):
+            cached = cache.get(datasets[i], {"directories": {}, "files": {}})
+
+            print(f"Scanning {directories[i]}")
+            scanned, n_rescanned = walkDirectories(directories[i], cached["directories"], executor)
+            print(f"    {len(scanned)} directories, {n_rescanned} listed again")
+
+            root_files = sorted(
+                fileName
+                for directory in scanned.values()
+                for fileName in directory["files"]
+            )
+
+            # only files whose size or mtime changed are opened again
+            descriptions = executor.map(
+                lambda fileName: updateFile(fileName, cached["files"].get(fileName)),
+                root_files
+            )
+            files = dict(zip(root_files, descriptions))
+            n_reopened = sum(1 for fileName in files if files[fileName] is not cached["files"].get(fileName))
+            print(f"    {len(files)} files, {n_reopened} opened to count entries")
+
+            filePaths[datasets[i]] = root_files
+            metadata[datasets[i]] = {"directories": scanned, "files": files}
+
+    with open(out_path, "w") as outfile:
+        json.dump(filePaths, outfile)
+
+    with open(metadata_path, "w") as outfile:
+        json.dump(metadata, outfile)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program builds the catalog of ntuple files of each dataset, rescanning only what changed since the last run"
+    )
+    parser.add_argument("-o", "--out_path", default="filePaths.json", help="catalog to write")
+    parser.add_argument("-m", "--metadata_path", default="fileMetadata.json", help="file and directory metadata, also used as the cache of the previous run")
+    parser.add_argument("-w", "--workers", type=int, default=16, help="number of directories or files handled concurrently")
+
+    args = parser.parse_args()
+
+    main(args.metadata_path, args.out_path, args.workers)
@@ -0,0 +1,75 @@
+########################################################################
+## streamAlignment.py                                                 ##
+## checks that the unpacked and emulated CICADA streams are event     ##
+## aligned before they are read side by side                          ##
+########################################################################
+
+import argparse
+import json
+from sampleBuilder import samples_unpacked, samples_emulated
+
+########################################################################
+# Returns the files of the sample theSample in which the trees of the
+# sample do not all have the same number of entries. Friend trees of
+# such files are paired with the wrong events
+def checkEntryCounts(theSample):
+
+    mismatched = theSample.entryMismatches()
+    for mismatch in mismatched:
+        print(f"    Entry count mismatch in {mismatch['file']}: {mismatch['entries']}")
+
+    return mismatched
+
+########################################################################
+# Checks the alignment of the unpacked and emulated streams of dataset.
+# Both streams are trees of the same files, and only l1EventTree holds
+# run, lumi and event, so the streams are paired by entry number within
+# each file. They are aligned if they read the same files and every
+# file has the same number of entries in l1EventTree and in both
+# CICADA summary trees. Returns a dictionary with the files with
+# inconsistent entry counts and whether the streams are aligned
+def checkAlignment(dataset):
+
+    report = {}
+
+    report["files_differ"] = (
+        samples_unpacked[dataset].listOfFiles != samples_emulated[dataset].listOfFiles
+    )
+
+    print("Checking entry counts of the friend trees")
+    report["entry_count_mismatches"] = (
+        checkEntryCounts(samples_unpacked[dataset])
+        + checkEntryCounts(samples_emulated[dataset])
+    )
+
+    report["aligned"] = (
+        not report["files_differ"]
+        and len(report["entry_count_mismatches"]) == 0
+    )
+
+    print(f"    files_differ = {report['files_differ']}")
+    print(f"    entry_count_mismatches = {len(report['entry_count_mismatches'])}")
+    print(f"    aligned = {report['aligned']}")
+
+    return report
+
+# runs checkAlignment and writes its report to out_dir
+def main(dataset, out_dir):
+
+    report = checkAlignment(dataset)
+
+    with open(f"{out_dir}/alignment_{dataset}.json", "w") as outfile:
+        json.dump(report, outfile, indent=4)
+
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program checks that the unpacked and emulated CICADA streams contain the same number of events in every file"
+    )
+    parser.add_argument("-d", "--dataset", help="which dataset to check")
+    parser.add_argument("-o", "--out_dir", default=".", help="directory to save the report to")
+
+    args = parser.parse_args()
+
+    main(args.dataset, args.out_dir)
@@ -0,0 +1,186 @@
+########################################################################
+## fileCatalog.py                                                     ##
+## lazy, indexed access to the filePaths.json catalogs of sample     ##
+## files, and a lazily built collection of samples                    ##
+########################################################################
+
+
+#!/usr/bin/env python3
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+from collections.abc import Mapping, MutableMapping
+
+#Read-only mapping of sample name -> list of files backed by a json
+#catalog. The json is parsed once into a SQLite index next to it, which
+#is rebuilt whenever the json changes; lookups then only read the rows
+#of the sample asked for
+class fileCatalog(Mapping):
+    def __init__(self, jsonPath:str, indexPath:str=None):
+        self.jsonPath = jsonPath
+        if indexPath != None:
+            self.indexPath = indexPath
+        else:
+            self.indexPath = os.path.splitext(jsonPath)[0] + '.sqlite'
+        self.connection = None
+        #only used if the index cannot be written
+        self.filePaths = None
+
+    #identifies the version of the json the index was built from
+    def jsonStamp(self):
+        stat = os.stat(self.jsonPath)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def indexIsCurrent(self):
+        if not os.path.exists(self.indexPath):
+            return False
+        try:
+            connection = sqlite3.connect(self.indexPath)
+            try:
+                row = connection.execute("SELECT value FROM meta WHERE key = 'jsonStamp'").fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return False
+        return row != None and row[0] == self.jsonStamp()
+
+    def buildIndex(self):
+        with open(self.jsonPath) as f:
+            filePaths = json.load(f)
+
+        #write to a temporary file first so that readers never see a
+        #half written index
+        temporaryPath = f"{self.indexPath}.{os.getpid()}.tmp"
+        connection = sqlite3.connect(temporaryPath)
+        with connection:
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.execute("CREATE TABLE samples (name TEXT PRIMARY KEY, position INTEGER)")
+            connection.execute("CREATE TABLE files (sample TEXT, position INTEGER, path TEXT)")
+            connection.executemany(
+                "INSERT INTO samples VALUES (?, ?)",
+                [(sampleName, i) for i, sampleName in enumerate(filePaths)]
+            )
+            for sampleName in filePaths:
+                connection.executemany(
+                    "INSERT INTO files VALUES (?, ?, ?)",
+                    [(sampleName, i, path) for i, path in enumerate(filePaths[sampleName])]
+                )
+            connection.execute("CREATE INDEX files_by_sample ON files (sample, position)")
+            connection.execute("INSERT INTO meta VALUES ('jsonStamp', ?)", (self.jsonStamp(),))
+        connection.close()
+        os.replace(temporaryPath, self.indexPath)
+
+    def connect(self):
+        if self.connection == None and self.filePaths == None:
+            try:
+                if not self.indexIsCurrent():
+                    self.buildIndex()
+                self.connection = sqlite3.connect(self.indexPath)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not use file catalog index {self.indexPath} ({e}), reading {self.jsonPath}")
+                with open(self.jsonPath) as f:
+                    self.filePaths = json.load(f)
+        return self.connection
+
+    def __getitem__(self, sampleName:str):
+        connection = self.connect()
+        if connection == None:
+            return self.filePaths[sampleName]
+        if sampleName not in self:
+            raise KeyError(sampleName)
+        rows = connection.execute(
+            "SELECT path FROM files WHERE sample = ? ORDER BY position", (sampleName,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def __contains__(self, sampleName):
+        connection = self.connect()
+        if connection == None:
+            return sampleName in self.filePaths
+        row = connection.execute("SELECT 1 FROM samples WHERE name = ?", (sampleName,)).fetchone()
+        return row != None
+
+    def __iter__(self):
+        connection = self.connect()
+        if connection == None:
+            return iter(self.filePaths)
+        rows = connection.execute("SELECT name FROM samples ORDER BY position").fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        connection = self.connect()
+        if connection == None:
+            return len(self.filePaths)
+        return connection.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+#Mapping of sample name -> sample that only builds a sample (and reads
+#its file list from the catalog) the first time it is asked for.
+#buildSample takes the list of files of a sample and returns the sample.
+#Entries can be replaced, e.g. to read a sample from a skim instead
+class sampleCollection(MutableMapping):
+    def __init__(self, catalog:Mapping, buildSample):
+        self.catalog = catalog
+        self.buildSample = buildSample
+        self.builtSamples = {}
+        self.removedSamples = set()
+
+    def __getitem__(self, sampleName:str):
+        if sampleName in self.removedSamples:
+            raise KeyError(sampleName)
+        if sampleName not in self.builtSamples:
+            self.builtSamples[sampleName] = self.buildSample(self.catalog[sampleName])
+        return self.builtSamples[sampleName]
+
+    def __setitem__(self, sampleName:str, theSample):
+        self.removedSamples.discard(sampleName)
+        self.builtSamples[sampleName] = theSample
+
+    def __delitem__(self, sampleName:str):
+        if sampleName not in self:
+            raise KeyError(sampleName)
+        self.builtSamples.pop(sampleName, None)
+        self.removedSamples.add(sampleName)
+
+    def __contains__(self, sampleName):
+        if sampleName in self.removedSamples:
+            return False
+        return sampleName in self.builtSamples or sampleName in self.catalog
+
+    def __iter__(self):
+        names = [sampleName for sampleName in self.catalog if sampleName not in self.removedSamples]
+        names += [sampleName for sampleName in self.builtSamples if sampleName not in self.catalog]
+        return iter(names)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+#Entries of each tree of every file in the metadata written by
+#compareScores/saveFilesToJSON.py, as file name -> {tree: entries}, for
+#the friend checks of sample. Read once per path; empty if the metadata
+#has not been written
+@functools.lru_cache(maxsize=None)
+def loadFileEntries(metadataPath:str):
+    if not os.path.exists(metadataPath):
+        return {}
+    with open(metadataPath, "r") as f:
+        fileMetadata = json.load(f)
+    fileEntries = {}
+    for dataset in fileMetadata:
+        for fileName, described in fileMetadata[dataset]["files"].items():
+            fileEntries[fileName] = described.get("entries")
+    return fileEntries
+
+#Hash of a list of files, including their size and modification time
+#where they can be read, so that it changes when any file is rewritten
+def filesHash(files:list[str]):
+    digest = hashlib.sha256()
+    for fileName in files:
+        try:
+            stat = os.stat(fileName)
+            digest.update(f"{fileName}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        except OSError:
+            digest.update(f"{fileName}\n".encode())
+    return digest.hexdigest()[:16]
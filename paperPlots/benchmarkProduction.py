@@ -0,0 +1,204 @@
+########################################################################
+## benchmarkProduction.py                                             ##
+## measures the throughput of the histogram producers on synthetic    ##
+## ntuples with the layout of paperSampleBuilder.treeNames            ##
+########################################################################
+
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+
+# stages that can be benchmarked, each the core (booking and event loops)
+# of one production script
+stages = ["createHistsForROC", "createScorePlots", "createHTHistograms"]
+
+# names of the synthetic samples. ZeroBias is needed by every stage
+syntheticSamples = ["ZeroBias", "Synthetic"]
+
+########################################################################
+# Writes one synthetic ntuple with n_events events to path, holding the
+# trees of paperSampleBuilder.treeNames with the branches read by the
+# producers: event numbers, L1 jets and energy sums, every trigger of
+# triggers.py with its prescale, and the score of every CICADA version
+def writeNtuple(path, n_events, rng, first_event=0):
+
+    import awkward as ak
+    import uproot
+    from paperSampleBuilder import treeNames
+    from triggers import triggers
+
+    def jagged(counts, values):
+        return ak.unflatten(values, counts)
+
+    n_jets = rng.poisson(4, n_events)
+    n_sums = np.full(n_events, 4)
+    n_towers = rng.poisson(20, n_events)
+
+    trees = {
+        'l1EventTree/L1EventTree': {
+            "run": np.full(n_events, 383000, dtype=np.int32),
+            "lumi": (first_event + np.arange(n_events)) // 1000 + 1,
+            "event": np.arange(first_event, first_event + n_events, dtype=np.uint64),
+        },
+        'l1CaloTowerEmuTree/L1CaloTowerTree': {
+            "iet": jagged(n_towers, rng.integers(0, 64, n_towers.sum()).astype(np.int16)),
+        },
+        'l1UpgradeTree/L1UpgradeTree': {
+            "jetEt": jagged(n_jets, rng.exponential(40.0, n_jets.sum()).astype(np.float32)),
+            "jetEta": jagged(n_jets, rng.uniform(-5.0, 5.0, n_jets.sum()).astype(np.float32)),
+            "jetBx": jagged(n_jets, rng.integers(-2, 3, n_jets.sum()).astype(np.int16)),
+            "sumEt": jagged(n_sums, rng.exponential(200.0, n_sums.sum()).astype(np.float32)),
+            "sumType": jagged(n_sums, np.tile(np.arange(4, dtype=np.int16), n_events)),
+            "sumBx": jagged(n_sums, rng.integers(-1, 2, n_sums.sum()).astype(np.int16)),
+        },
+        'L1TTriggerBitsNtuplizer/L1TTriggerBits': {},
+    }
+    for trigger in triggers:
+        trees['L1TTriggerBitsNtuplizer/L1TTriggerBits'][trigger] = (rng.random(n_events) < 0.01).astype(np.int32)
+        trees['L1TTriggerBitsNtuplizer/L1TTriggerBits'][f"{trigger}_prescale"] = np.ones(n_events, dtype=np.int32)
+    for treeName in treeNames:
+        if treeName.startswith('CICADA'):
+            cicada_name = treeName.split('/')[1]
+            trees[treeName] = {f"{cicada_name}_score": rng.exponential(20.0, n_events).astype(np.float32)}
+
+    with uproot.recreate(path) as f:
+        for treeName in trees:
+            f[treeName] = trees[treeName]
+
+# writes n_files ntuples of n_events events for every synthetic sample
+# to out_dir and returns a dictionary sample name -> list of files
+def generateNtuples(out_dir, n_files, n_events, seed=0):
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    sampleFiles = {}
+    for sample_name in syntheticSamples:
+        sampleFiles[sample_name] = []
+        for i in range(n_files):
+            path = os.path.join(out_dir, f"{sample_name}_{i}.root")
+            if not os.path.exists(path):
+                writeNtuple(path, n_events, rng, first_event=i*n_events)
+            sampleFiles[sample_name].append(path)
+
+    return sampleFiles
+
+########################################################################
+# Runs in a fresh process: runs the core of the production script stage
+# on the synthetic samples and prints the wall time of booking and event
+# loops, the number of events read and the peak RSS as JSON. The RDF
+# log (on stderr) reports the JIT time
+def runStage(stage, sampleFiles, out_dir, n_threads):
+
+    import ROOT
+    from sample import sample
+    from paperSampleBuilder import samples, treeNames
+    from graphRunner import enableThreads, runJobs
+
+    enableThreads(n_threads)
+    verbosity = ROOT.Experimental.RLogScopedVerbosity(
+        ROOT.Detail.RDF.RDFLogChannel(),
+        ROOT.Experimental.ELogLevel.kInfo
+    )
+
+    for sample_name in sampleFiles:
+        samples[sample_name] = sample(listOfFiles = sampleFiles[sample_name], treeNames = treeNames)
+
+    start = time.perf_counter()
+    if stage == "createHistsForROC":
+        import createHistsForROC
+        with open("unprescaledTriggerTables.json", "r") as f:
+            triggers = json.load(f)["unprescaledTriggers"]
+        out_prefix = os.path.join(out_dir, "ROChist")
+        jobs = [createHistsForROC.zeroBiasJob(out_prefix, triggers)]
+        jobs += [createHistsForROC.sampleJob(out_prefix, triggers, sample_name) for sample_name in sampleFiles if sample_name != 'ZeroBias']
+        runJobs(jobs)
+    elif stage == "createScorePlots":
+        import createScorePlots
+        hists = {}
+        runJobs([createScorePlots.sampleJob(sample_name, 100, hists) for sample_name in sampleFiles])
+    elif stage == "createHTHistograms":
+        import createHTHistograms
+        output_file = ROOT.TFile(os.path.join(out_dir, "hists_HT.root"), "RECREATE")
+        runJobs([createHTHistograms.sampleJob(sample_name, 100, output_file) for sample_name in sampleFiles])
+        output_file.Close()
+    finished = time.perf_counter()
+
+    n_events = 0
+    for sample_name in sampleFiles:
+        chain = ROOT.TChain('l1EventTree/L1EventTree')
+        for fileName in sampleFiles[sample_name]:
+            chain.Add(fileName)
+        n_events += chain.GetEntries()
+
+    print(json.dumps({
+        "stage": stage,
+        "seconds": finished - start,
+        "events": n_events,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+# total JIT time reported in the RDF log
+def jitSeconds(log):
+    return sum(
+        float(seconds)
+        for seconds in re.findall(r"Just-in-time compilation phase completed(?: in)? ([0-9.eE+-]+) seconds", log)
+    )
+
+def main(out_dir, n_files, n_events, n_threads, stage_names, out_json):
+
+    sampleFiles = generateNtuples(os.path.join(out_dir, "ntuples"), n_files, n_events)
+
+    results = []
+    for stage in stage_names:
+        print(f"Running {stage}")
+        process = subprocess.run(
+            [
+                sys.executable, __file__,
+                "--run", stage,
+                "--files", json.dumps(sampleFiles),
+                "-o", out_dir,
+                "-t", str(n_threads),
+            ],
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result["jit_seconds"] = jitSeconds(process.stderr)
+        result["events_per_second"] = result["events"] / result["seconds"]
+        results.append(result)
+
+    print(f"{'stage':<20} {'events/s':>12} {'seconds':>9} {'JIT s':>7} {'peak RSS MB':>12}")
+    for result in results:
+        print(f"{result['stage']:<20} {result['events_per_second']:>12.0f} {result['seconds']:>9.2f} {result['jit_seconds']:>7.2f} {result['peak_rss_mb']:>12.0f}")
+
+    if out_json != None:
+        with open(out_json, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program benchmarks the histogram producers on synthetic ntuples"
+    )
+    parser.add_argument("-o", "--out_dir", default="benchmark", help="directory for the synthetic ntuples and the output histograms")
+    parser.add_argument("-f", "--n_files", type=int, default=4, help="number of synthetic files per sample")
+    parser.add_argument("-e", "--n_events", type=int, default=100000, help="number of events per synthetic file")
+    parser.add_argument("-t", "--threads", type=int, default=0, help="number of threads for ROOT implicit multithreading (0 uses all cores)")
+    parser.add_argument("-s", "--stages", nargs="+", default=stages, choices=stages, help="production scripts to benchmark")
+    parser.add_argument("--json", default=None, help="also write the results to this JSON file")
+    parser.add_argument("--run", default=None, choices=stages, help=argparse.SUPPRESS)
+    parser.add_argument("--files", default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run != None:
+        runStage(args.run, json.loads(args.files), args.out_dir, args.threads)
+    else:
+        main(args.out_dir, args.n_files, args.n_events, args.threads, args.stages, args.json)
@@ -0,0 +1,241 @@
+########################################################################
+## benchmarkROC.py                                                    ##
+## times the ROC functions of plottingUtils on synthetic histograms   ##
+## with the createHistsForROC binning and checks their results        ##
+## against the original per-threshold Integral implementation and a   ##
+## stored golden file                                                 ##
+########################################################################
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import ROOT
+import plottingUtils
+from rocBinning import (
+    n_bins_cicada, min_score_cicada, max_score_cicada,
+    n_bins_ht, min_score_ht, max_score_ht,
+    n_bins_trig, min_score_trig, max_score_trig,
+    n_bins_pt, min_score_pt, max_score_pt
+)
+
+########################################################################
+# Synthetic unweighted histograms with the createHistsForROC binning.
+# Counts fall exponentially with score, HT and pT, faster for background
+# than for signal, so the high thresholds have empty bins as in data
+def syntheticHist3D(name, n_events, slope, trigger_fraction, rng):
+
+    hist = ROOT.TH3D(
+        name, name,
+        n_bins_cicada, min_score_cicada, max_score_cicada,
+        n_bins_ht, min_score_ht, max_score_ht,
+        n_bins_trig, min_score_trig, max_score_trig
+    )
+
+    # ROOT stores bin (x, y, z) at x + n_x * (y + n_y * z)
+    x = np.arange(n_bins_cicada + 2)
+    y = np.arange(n_bins_ht + 2)
+    shape = np.exp(-slope * (x[np.newaxis, :] / n_bins_cicada + y[:, np.newaxis] / n_bins_ht))
+    shape = shape / shape.sum()
+    z = np.array([0.0, 1.0 - trigger_fraction, trigger_fraction, 0.0])
+    means = n_events * z[:, np.newaxis, np.newaxis] * shape[np.newaxis, :, :]
+
+    counts = rng.poisson(means).astype(np.float64)
+    hist.SetContent(counts.ravel())
+    hist.SetEntries(counts.sum())
+    return hist
+
+def syntheticHist1D(name, n_events, slope, rng):
+
+    hist = ROOT.TH1D(name, name, n_bins_pt, min_score_pt, max_score_pt)
+
+    x = np.arange(n_bins_pt + 2)
+    shape = np.exp(-slope * x / n_bins_pt)
+    counts = rng.poisson(n_events * shape / shape.sum()).astype(np.float64)
+    hist.SetContent(counts)
+    hist.SetEntries(counts.sum())
+    return hist
+
+########################################################################
+# Reference implementations: one Integral per threshold, as plottingUtils
+# computed the ROC curves originally
+def integralAll(hist):
+    return float(hist.Integral(0, hist.GetNbinsX()+1, 0, hist.GetNbinsY()+1, 0, hist.GetNbinsZ()+1))
+
+def integralAbove(hist, x_bin=0, y_bin=0, z_bin=0):
+    return hist.Integral(x_bin, hist.GetNbinsX()+1, y_bin, hist.GetNbinsY()+1, z_bin, hist.GetNbinsZ()+1)
+
+def thresholdsOf(hist, axis):
+    theAxis = hist.GetXaxis() if axis == 0 else hist.GetYaxis()
+    return [theAxis.FindBin(theAxis.GetBinLowEdge(i)) for i in range(1, theAxis.GetNbins() + 2)]
+
+def truncatedROC(accepted):
+    tpr = []
+    fpr = []
+    for tpr_current, fpr_current in accepted:
+        tpr.append(tpr_current)
+        fpr.append(fpr_current)
+        if (tpr_current==0) and (fpr_current==0):
+            break
+    return np.array(tpr), np.array(fpr)
+
+def referenceROC(bkg_hist, sig_hist, axis):
+    total_bkg = integralAll(bkg_hist)
+    total_sig = integralAll(sig_hist)
+    def accepted():
+        for threshold_bin in thresholdsOf(sig_hist, axis):
+            bins = {"x_bin": threshold_bin} if axis == 0 else {"y_bin": threshold_bin}
+            yield integralAbove(sig_hist, **bins) / total_sig, integralAbove(bkg_hist, **bins) / total_bkg
+    return truncatedROC(accepted())
+
+def referenceROCOR(bkg_hist, sig_hist, or_threshold, or_axis):
+    total_bkg = integralAll(bkg_hist)
+    total_sig = integralAll(sig_hist)
+    if or_axis == 1:
+        or_bins = {"y_bin": sig_hist.GetYaxis().FindBin(or_threshold)}
+    else:
+        or_bins = {"z_bin": sig_hist.GetZaxis().FindBin(or_threshold)}
+    def accepted():
+        for threshold_bin in thresholdsOf(sig_hist, 0):
+            rates = []
+            for hist, total in [(sig_hist, total_sig), (bkg_hist, total_bkg)]:
+                accepted_events = (
+                    integralAbove(hist, x_bin=threshold_bin)
+                    + integralAbove(hist, **or_bins)
+                    - integralAbove(hist, x_bin=threshold_bin, **or_bins)
+                )
+                rates.append(accepted_events / total)
+            yield rates
+    return truncatedROC(accepted())
+
+def referenceROCPt(bkg_hist, sig_hist):
+    total_bkg = float(bkg_hist.Integral(0, bkg_hist.GetNbinsX()+1))
+    total_sig = float(sig_hist.Integral(0, sig_hist.GetNbinsX()+1))
+    def accepted():
+        for threshold_bin in thresholdsOf(sig_hist, 0):
+            yield (
+                sig_hist.Integral(threshold_bin, sig_hist.GetNbinsX()+1) / total_sig,
+                bkg_hist.Integral(threshold_bin, bkg_hist.GetNbinsX()+1) / total_bkg
+            )
+    return truncatedROC(accepted())
+
+def referenceAcceptRatio(hist, axis):
+    total = integralAll(hist)
+    n_bins = hist.GetNbinsX() if axis == 0 else hist.GetNbinsY()
+    contents = np.zeros(n_bins + 2)
+    errors = np.zeros(n_bins + 2)
+    for j, threshold_bin in enumerate(thresholdsOf(hist, axis)):
+        bins = {"x_bin": threshold_bin} if axis == 0 else {"y_bin": threshold_bin}
+        integral_partial = integralAbove(hist, **bins)
+        contents[j+1] = integral_partial / total * plottingUtils.options["rate_scale_factor"]
+        errors[j+1] = np.sqrt(integral_partial) / total
+    return contents, errors
+
+# bin contents and errors (including under- and overflow) of a TH1
+def histArrays(hist):
+    n_cells = hist.GetNbinsX() + 2
+    return (
+        np.array([hist.GetBinContent(i) for i in range(n_cells)]),
+        np.array([hist.GetBinError(i) for i in range(n_cells)])
+    )
+
+########################################################################
+# Returns a list of (name, current function, reference function), each
+# function taking no arguments and returning a tuple of arrays
+def benchmarkCases(bkg_hist, sig_hist, bkg_pt, sig_pt):
+
+    def acceptRatio(axis):
+        return lambda: histArrays(plottingUtils.getAcceptRatioHist(bkg_hist, axis, f"ratio_accepted_{axis}"))
+
+    return [
+        ("calculateROC_score",
+         lambda: plottingUtils.calculateROC(bkg_hist, sig_hist, 0),
+         lambda: referenceROC(bkg_hist, sig_hist, 0)),
+        ("calculateROC_HT",
+         lambda: plottingUtils.calculateROC(bkg_hist, sig_hist, 1),
+         lambda: referenceROC(bkg_hist, sig_hist, 1)),
+        ("calculateROCOR_HT",
+         lambda: plottingUtils.calculateROCOR(bkg_hist, sig_hist, plottingUtils.options["ht_threshold"], 1),
+         lambda: referenceROCOR(bkg_hist, sig_hist, plottingUtils.options["ht_threshold"], 1)),
+        ("calculateROCOR_L1",
+         lambda: plottingUtils.calculateROCOR(bkg_hist, sig_hist, plottingUtils.options["l1_threshold"], 2),
+         lambda: referenceROCOR(bkg_hist, sig_hist, plottingUtils.options["l1_threshold"], 2)),
+        ("calculateROCPt",
+         lambda: plottingUtils.calculateROCPt(bkg_pt, sig_pt),
+         lambda: referenceROCPt(bkg_pt, sig_pt)),
+        ("getAcceptRatioHist_score", acceptRatio(0), lambda: referenceAcceptRatio(bkg_hist, 0)),
+        ("getAcceptRatioHist_HT", acceptRatio(1), lambda: referenceAcceptRatio(bkg_hist, 1)),
+    ]
+
+# best wall time of n_repeats calls of function, and its last result
+def timeFunction(function, n_repeats):
+    best = float("inf")
+    for i in range(n_repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, tuple(np.asarray(values, dtype=np.float64) for values in result)
+
+def sameArrays(a, b):
+    return len(a) == len(b) and all(np.array_equal(x, y) for x, y in zip(a, b))
+
+def main(golden_path, update_golden, n_repeats, n_events, seed):
+
+    ROOT.gROOT.SetBatch(True)
+    ROOT.TH1.AddDirectory(False)
+
+    rng = np.random.default_rng(seed)
+    bkg_hist = syntheticHist3D("anomalyScore_ZeroBias_test", n_events, 12.0, 0.01, rng)
+    sig_hist = syntheticHist3D("anomalyScore_signal", n_events // 10, 4.0, 0.5, rng)
+    bkg_pt = syntheticHist1D("jetEt_ZeroBias_test", n_events, 12.0, rng)
+    sig_pt = syntheticHist1D("jetEt_signal", n_events // 10, 4.0, rng)
+
+    golden = {}
+    if not update_golden:
+        if not os.path.exists(golden_path):
+            print(f"Golden file {golden_path} not found. Run with -u first to write it from the current implementation")
+            return False
+        with np.load(golden_path) as f:
+            golden = dict(f)
+
+    ok = True
+    results = {}
+    print(f"{'function':<26} {'current s':>10} {'reference s':>12} {'speed up':>9}  reference  golden")
+    for name, current, reference in benchmarkCases(bkg_hist, sig_hist, bkg_pt, sig_pt):
+        time_current, result_current = timeFunction(current, n_repeats)
+        time_reference, result_reference = timeFunction(reference, 1)
+
+        matches_reference = sameArrays(result_current, result_reference)
+        if update_golden:
+            matches_golden = True
+        else:
+            stored = tuple(golden[f"{name}_{i}"] for i in range(len(result_current)) if f"{name}_{i}" in golden)
+            matches_golden = sameArrays(result_current, stored)
+        ok = ok and matches_reference and matches_golden
+
+        for i in range(len(result_current)):
+            results[f"{name}_{i}"] = result_current[i]
+
+        print(f"{name:<26} {time_current:>10.5f} {time_reference:>12.5f} {time_reference/time_current:>9.1f}  {'ok' if matches_reference else 'DIFFERS':<9}  {'ok' if matches_golden else 'DIFFERS'}")
+
+    if update_golden:
+        np.savez(golden_path, **results)
+        print(f"Wrote {golden_path}")
+
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program benchmarks the ROC functions of plottingUtils and checks them against the per-threshold Integral implementation and a golden file"
+    )
+    parser.add_argument("-g", "--golden", default="rocGolden.npz", help="golden file with the expected TPR/FPR arrays")
+    parser.add_argument("-u", "--update_golden", action="store_true", help="write the golden file from the current implementation instead of comparing to it")
+    parser.add_argument("-r", "--repeats", type=int, default=5, help="number of timed calls of each current function")
+    parser.add_argument("-n", "--n_events", type=int, default=10000000, help="number of background events of the synthetic histograms")
+    parser.add_argument("--seed", type=int, default=2024, help="seed of the synthetic histograms")
+
+    args = parser.parse_args()
+
+    if not main(args.golden, args.update_golden, args.repeats, args.n_events, args.seed):
+        sys.exit(1)
@@ -4,13 +4,15 @@
 ## calculate the unprescaled trigger efficiencies for ROC plots       ##
 ########################################################################
 
-import ROOT
 import argparse
+import csv
+import json
 import numpy as np
 from triggers import triggers
-import awkward as ak
+from findUnprescaledTriggers import findUnprescaledTriggers
 import uproot
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 basePath = '/hdfs/store/user/aloelige/'
 
@@ -82,7 +84,118 @@ sampleDates = {
 
 treeName = "L1TTriggerBitsNtuplizer/L1TTriggerBits"
 
-def main(nBins):
+########################################################################
+# Streams the decisions of triggerlist in the file fileName in chunks of
+# step_size and returns (number of events, number of events passing any
+# of them). Only one boolean array of the chunk size is held besides the
+# chunk itself. Returns None for files without the last trigger, which
+# were skipped as bad files before
+def countPassing(fileName, triggerlist, step_size):
+
+    with uproot.open(fileName) as f:
+        tree = f[treeName]
+        branchNames = set(tree.keys())
+        if triggerlist[-1] not in branchNames:
+            print(f"bad file {fileName}")
+            return None
+
+        present = [trigger for trigger in triggerlist if trigger in branchNames]
+        for trigger in triggerlist:
+            if trigger not in branchNames:
+                print("Could not access trigger", trigger)
+
+        total_events = 0
+        pass_events = 0
+        for chunk in tree.iterate(filter_name=present, step_size=step_size, library="np"):
+            decisions = iter(chunk.values())
+            passed = next(decisions) != 0
+            for decision in decisions:
+                np.logical_or(passed, decision, out=passed)
+            total_events += len(passed)
+            pass_events += int(np.count_nonzero(passed))
+
+    return total_events, pass_events
+
+# countPassing for the process pool
+def countTask(task):
+    sample_name, fileName, triggerlist, step_size = task
+    return sample_name, countPassing(fileName, triggerlist, step_size)
+
+########################################################################
+# Computes the L1 unprescaled efficiency of every sample in sampleFiles
+# (sample name -> list of files), counting up to n_workers files at
+# once. Returns a dictionary sample name -> {total, passed, efficiency}
+def countEfficiencies(sampleFiles, triggerlist, step_size, n_workers):
+
+    tasks = [
+        (sample_name, fileName, triggerlist, step_size)
+        for sample_name in sampleFiles
+        for fileName in sampleFiles[sample_name]
+    ]
+
+    counts = {sample_name: [0, 0] for sample_name in sampleFiles}
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(countTask, tasks))
+    else:
+        results = [countTask(task) for task in tasks]
+
+    for sample_name, result in results:
+        if result is None: continue
+        counts[sample_name][0] += result[0]
+        counts[sample_name][1] += result[1]
+
+    efficiencies = {}
+    for sample_name in sampleFiles:
+        total_events, pass_events = counts[sample_name]
+        efficiencies[sample_name] = {
+            "total": total_events,
+            "passed": pass_events,
+            "efficiency": pass_events / total_events if total_events > 0 else None,
+        }
+        print(sample_name, efficiencies[sample_name]["efficiency"])
+
+    return efficiencies
+
+# countEfficiencies for the samples in samplePaths (sample name ->
+# directory holding its files)
+def calculateEfficiencies(samplePaths, triggerlist, step_size, n_workers):
+
+    sampleFiles = {}
+    for sample_name in samplePaths:
+        sampleFiles[sample_name] = []
+        for root, dirs, files in os.walk(samplePaths[sample_name], topdown=True):
+            sampleFiles[sample_name] += [os.path.join(root, fileName) for fileName in files]
+
+    return countEfficiencies(sampleFiles, triggerlist, step_size, n_workers)
+
+########################################################################
+# Writes the efficiencies as JSON, CSV or as the python module
+# efficiencies.py (a dictionary sample name -> efficiency)
+def writeJSON(efficiencies, path):
+    with open(path, "w") as outfile:
+        json.dump(efficiencies, outfile, indent=4)
+
+def writeCSV(efficiencies, path):
+    with open(path, "w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(["sample", "total", "passed", "efficiency"])
+        for sample_name in efficiencies:
+            writer.writerow([
+                sample_name,
+                efficiencies[sample_name]["total"],
+                efficiencies[sample_name]["passed"],
+                efficiencies[sample_name]["efficiency"],
+            ])
+
+def writeModule(efficiencies, path):
+    with open(path, "w") as outfile:
+        outfile.write("efficiencies = {\n\n")
+        for sample_name in efficiencies:
+            outfile.write(f'    "{sample_name}": {efficiencies[sample_name]["efficiency"]},\n')
+        outfile.write("\n}\n")
+
+def main(nBins, n_workers, step_size, sample_names, out_json, out_csv, out_module):
 
     print("Starting...")
 
@@ -97,77 +210,66 @@ def main(nBins):
 
     print("Got samplePaths")
 
-    # get list of sample names
-    sample_names = list(samplePaths.keys())
-
-    j = 0
+    # scan the first 31 ZeroBias files for prescaled triggers
+    zeroBiasFiles = []
     for root, dirs, files in os.walk(samplePaths["ZeroBias"], topdown=True):
-        print("root = ", root)
-        for fileName in files:
+        zeroBiasFiles += [os.path.join(root, fileName) for fileName in files]
+    unprescaled, _, _ = findUnprescaledTriggers(zeroBiasFiles[:31], list(triggers), n_workers)
+    triggers[:] = unprescaled
 
-            print(fileName)
-            f = uproot.open(os.path.join(root, fileName))
-            tree = f[treeName]
-            to_remove = []
+    if sample_names != None:
+        samplePaths = {sample_name: samplePaths[sample_name] for sample_name in sample_names}
 
-            for i in range(len(triggers)):
-                try:
-                    prescales = tree[f"{triggers[i]}_prescale"].array()
-                except Exception:
-                    print("Trigger not found: ", triggers[i])
-                if len(prescales)==0: continue
-                if (sum(prescales)/len(prescales)!=1):
-                    to_remove.append(triggers[i])
-                    #print("Removing ", triggers[i])
+    efficiencies = calculateEfficiencies(samplePaths, triggers, step_size, n_workers)
 
-            for i in range(len(to_remove)):
-                triggers.remove(to_remove[i])
-
-            f.close()
-
-            j+=1
-            if j>30: break
-
-    for i in range(len(sample_names)):
-
-        if sample_names[i] in sampleDates['27Mar2024']: continue
-
-        print(sample_names[i], end=" ")
-        total_events = 0
-        pass_events = 0
-
-        for root, dirs, files in os.walk(samplePaths[sample_names[i]], topdown=True):
-            for fileName in files:
-                f = uproot.open(os.path.join(root, fileName))
-                tree = f[treeName]
-                try:
-                    trig_arr = np.zeros((len(triggers), len(tree[triggers[-1]].array())))
-                except Exception:
-                    print("bad file")
-                    continue
-                for j in range(len(triggers)):
-                    try:
-                        trig_arr[j,:] = tree[triggers[j]].array()
-                    except Exception:
-                        print("Could not access trigger", triggers[j])
-                trig_results = ak.any(trig_arr, axis=0)
-                total_events += len(trig_results)
-                pass_events += sum(trig_results)
-
-        print(pass_events/total_events)
+    if out_json != None:
+        writeJSON(efficiencies, out_json)
+    if out_csv != None:
+        writeCSV(efficiencies, out_csv)
+    if out_module != None:
+        writeModule(efficiencies, out_module)
 
 
 if __name__ == "__main__":
 
 	parser = argparse.ArgumentParser(
-        description="This program creates CICADA score and HT histograms"
+        description="This program calculates the L1 unprescaled trigger efficiency of every sample"
     )
 	parser.add_argument(
         "-n",
         "--n_bins",
         default=100,
         help="number of bins")
+	parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of files processed in parallel")
+	parser.add_argument(
+        "--step_size",
+        default="100 MB",
+        help="uproot step size for reading the trigger decisions")
+	parser.add_argument(
+        "-s",
+        "--samples",
+        nargs="+",
+        default=None,
+        help="samples to process (default all)")
+	parser.add_argument(
+        "-o",
+        "--out_json",
+        default="efficiencies.json",
+        help="JSON file to write the efficiencies to")
+	parser.add_argument(
+        "--csv",
+        default=None,
+        help="CSV file to write the efficiencies to")
+	parser.add_argument(
+        "--module",
+        default=None,
+        help="write the efficiencies as a python module with a hard-coded dictionary (efficiencies.py now reads efficiencyStore.py instead)")
 
 	args = parser.parse_args()
 
-	main( args.n_bins)
+	main(args.n_bins, args.jobs, args.step_size, args.samples, args.out_json, args.csv, args.module)
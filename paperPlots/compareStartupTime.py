@@ -0,0 +1,114 @@
+########################################################################
+## compareStartupTime.py                                              ##
+## measures the start up (compilation) time of the derived columns   ##
+## when JIT-compiled from strings and when using the compiled helpers ##
+## of l1Helpers.h                                                     ##
+########################################################################
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# the string definitions the histogram producers used before the
+# compiled helpers, as (name, expression) pairs in definition order
+jitDefinitions = [
+    ("sum_mask", "(sumBx==0) && (sumType==1)"),
+    ("HT_rec", "sumEt[sum_mask]"),
+    ("jet_mask", "(jetEt > 30) && (jetEta < 2.4) && (jetEta > -2.4) && (jetBx == 0)"),
+    ("HT", "double ht = 0.0; for (auto&& x : jetEt[jet_mask]) ht += x; return ht;"),
+    ("leadJetEt", """
+    auto leadingJetEt = [](const ROOT::RVec<float>& jetEt) {
+        return jetEt.size() > 0 ? jetEt[0] : -1.0f;
+    };
+    return leadingJetEt(jetEt);
+"""),
+]
+
+# the same columns from the compiled helpers
+compiledDefinitions = [
+    ("HT_rec", "l1helpers::inTimeSums(sumEt, sumType, sumBx, 1)"),
+    ("HT", "l1helpers::jetHT(jetEt, jetEta, jetBx)"),
+    ("leadJetEt", "l1helpers::leadingJetEt(jetEt)"),
+]
+
+########################################################################
+# Runs in a fresh process: defines the columns of mode ("jit" or
+# "compiled") on n_dataframes dataframes, each reading the first file of
+# sample_name, and runs a one event loop over each. Prints the times
+# taken to load the helpers and to compile and run the event loops
+def measure(mode, sample_name, n_dataframes):
+
+    import ROOT
+    from sample import sample
+    from paperSampleBuilder import samples, treeNames
+
+    start = time.perf_counter()
+    if mode == "compiled":
+        from compiledHelpers import loadHelpers
+        loadHelpers()
+        definitions = compiledDefinitions
+    else:
+        definitions = jitDefinitions
+    loaded = time.perf_counter()
+
+    theSample = sample(listOfFiles = samples[sample_name].listOfFiles[:1], treeNames = treeNames)
+    results = []
+    for i in range(n_dataframes):
+        rdf = theSample.getNewDataframe().Range(1)
+        for name, expression in definitions:
+            rdf = rdf.Define(name, expression)
+        for name in ["HT_rec", "HT", "leadJetEt"]:
+            results.append(rdf.Histo1D(name))
+    ROOT.RDF.RunGraphs(results)
+    finished = time.perf_counter()
+
+    # checked after the timing, so that it is not counted
+    from compiledHelpers import checkBranchTypes
+    mismatched = checkBranchTypes(theSample.getNewDataframe())
+
+    print(json.dumps({
+        "mode": mode,
+        "load_seconds": loaded - start,
+        "jit_and_run_seconds": finished - loaded,
+        "total_seconds": finished - start,
+        "mismatched_branches": mismatched,
+    }))
+
+def main(sample_name, n_dataframes):
+
+    timings = {}
+    for mode in ["jit", "compiled"]:
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", mode, "-s", sample_name, "-n", str(n_dataframes)],
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout
+        timings[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"Start up time for {n_dataframes} dataframes of {sample_name}:")
+    for mode in timings:
+        print(f"    {mode:>8}: load {timings[mode]['load_seconds']:.2f} s, compile and run {timings[mode]['jit_and_run_seconds']:.2f} s, total {timings[mode]['total_seconds']:.2f} s")
+    print(f"    speed up: {timings['jit']['total_seconds'] / timings['compiled']['total_seconds']:.2f}")
+
+    # the compiled helpers only skip the JIT for the instantiated types
+    mismatched = timings["compiled"]["mismatched_branches"]
+    if len(mismatched) > 0:
+        print(f"    branches not matching the instantiations of l1Helpers.h: {mismatched}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program compares the start up time of JIT-compiled and precompiled derived columns"
+    )
+    parser.add_argument("-s", "--sample", default="ZeroBias", help="sample whose first file is read")
+    parser.add_argument("-n", "--n_dataframes", type=int, default=50, help="number of dataframes, as for one per sample")
+    parser.add_argument("--measure", default=None, choices=["jit", "compiled"], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.measure != None:
+        measure(args.measure, args.sample, args.n_dataframes)
+    else:
+        main(args.sample, args.n_dataframes)
@@ -0,0 +1,67 @@
+########################################################################
+## compiledHelpers.py                                                 ##
+## builds l1Helpers.h into a shared library with ACLiC and loads it,  ##
+## so the derived column code is compiled once instead of JIT-        ##
+## compiled on every run                                              ##
+########################################################################
+
+import os
+import ROOT
+
+# header with the helper functions (namespace l1helpers)
+helpersPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "l1Helpers.h")
+
+loaded = False
+
+# element types of the branches the helpers are instantiated for in
+# l1Helpers.h (the vector<float> and vector<short> branches of the L1
+# upgrade ntuples). defineDerived refuses other types, which would be
+# JIT-instantiated again
+instantiatedTypes = {
+    "jetEt": "float",
+    "jetEta": "float",
+    "jetBx": "short",
+    "sumEt": "float",
+    "sumType": "short",
+    "sumBx": "short",
+}
+
+# spellings of the element types in RDataFrame column types
+typeNames = {
+    "float": ["float", "Float_t"],
+    "short": ["short", "Short_t"],
+}
+
+########################################################################
+# Loads the compiled helpers, building the library first if it does not
+# exist or is older than the header. The library is kept next to the
+# header (or in build_dir), so only the first run after a change pays
+# for the compilation
+def loadHelpers(build_dir=None):
+    global loaded
+    if loaded:
+        return
+
+    if build_dir != None:
+        os.makedirs(build_dir, exist_ok=True)
+        ROOT.gSystem.SetBuildDir(build_dir, True)
+
+    # k: keep the library, O: optimise. Without f ACLiC only rebuilds
+    # when the header changed
+    if not ROOT.gSystem.CompileMacro(helpersPath, "kO"):
+        raise RuntimeError(f"Could not compile {helpersPath}")
+
+    loaded = True
+
+# Returns the branches of the dataframe rdf whose type does not match
+# the instantiations of l1Helpers.h, with their column type
+def checkBranchTypes(rdf):
+    mismatched = {}
+    for branchName, elementType in instantiatedTypes.items():
+        if not rdf.HasColumn(branchName):
+            continue
+        columnType = str(rdf.GetColumnType(branchName))
+        expected = [f"ROOT::VecOps::RVec<{name}>" for name in typeNames[elementType]]
+        if columnType not in expected:
+            mismatched[branchName] = columnType
+    return mismatched
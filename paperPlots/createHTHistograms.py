@@ -7,89 +7,91 @@
 import ROOT
 import argparse
 import numpy as np
-from paperSampleBuilder import samples
+from paperSampleBuilder import samples, useSkims
+from graphRunner import addRunnerArguments, enableThreads, runJobs
+from derivedColumns import defineDerived
+from histManifest import inputHashes, writeManifest
 
-def main(nBins):
+# min and max scores for histograms
+min_score = 0.0
+max_score = 3000.0
 
-    # get list of sample names and remove ZeroBias
-    sample_names = list(samples.keys())
-    if 'ZeroBias' in sample_names:
-        sample_names.remove('ZeroBias')
-
-    # filter training events out of ZeroBias
-    zero_bias = samples['ZeroBias'].getNewDataframe()
-    zero_bias = zero_bias.Filter('lumi % 2 == 1')
+# returns a job for graphRunner.runJobs which books the HT and recomputed
+# HT histograms of the sample sample_name and writes them to output_file.
+# Training events are filtered out of ZeroBias
+def sampleJob(sample_name, nBins, output_file):
 
-    # min and max scores for histograms
-    min_score = 0.0
-    max_score = 3000.0
-
-
-    # create output ROOT file
-    output_file = ROOT.TFile(
-        f'hists_HT_240402.root',
-        'RECREATE'
-    )
+    def job():
+        rdf = samples[sample_name].getNewDataframe()
+        if sample_name == 'ZeroBias':
+            rdf = rdf.Filter('lumi % 2 == 1')
 
-    # make hists for zerobias
-    histModel = ROOT.RDF.TH1DModel(
-        "HT_ZeroBias",
-        "HT_ZeroBias",
-        nBins,
-        min_score,
-        max_score
-    )
-    zero_bias = zero_bias.Define("jet_mask", "(jetEt > 30) && (jetEta < 2.4) && (jetEta > -2.4) && (jetBx == 0)")
-    zero_bias = zero_bias.Define("HT", "double ht = 0.0; for (auto&& x : jetEt[jet_mask]) ht += x; return ht;")
-    hist = zero_bias.Histo1D(histModel, "HT")
-    hist.Write()
-
-    histModel = ROOT.RDF.TH1DModel(
-        "HT_rec_ZeroBias",
-        "HT_rec_ZeroBias",
-        nBins,
-        min_score,
-        max_score
-    )
-    zero_bias = zero_bias.Define("sum_mask", "(sumBx==0) && (sumType==1)")
-    zero_bias = zero_bias.Define("HT_rec", "sumEt[sum_mask]")
-    hist = zero_bias.Histo1D(histModel, "HT_rec")
-    hist.Write()
-
-    # iterate through each sample
-    for k in range(len(sample_names)):
-        print("    Current Sample: ", sample_names[k])
-
-        # make score plot
         histModel = ROOT.RDF.TH1DModel(
-            f"HT_{sample_names[k]}",
-            f"HT_{sample_names[k]}",
+            f"HT_{sample_name}",
+            f"HT_{sample_name}",
             nBins,
             min_score,
-            max_score)
-        rdf = samples[sample_names[k]].getNewDataframe()
-
-        rdf = rdf.Define("jet_mask", "(jetEt > 30) && (jetEta < 2.4) && (jetEta > -2.4) && (jetBx == 0)")
-        rdf = rdf.Define("HT", "double ht = 0.0; for (auto&& x : jetEt[jet_mask]) ht += x; return ht;")
-
-        hist = rdf.Histo1D(histModel, f"HT")
-        hist.Write()
+            max_score
+        )
+        rdf = defineDerived(rdf, ["jetHT", "HT_rec"])
+        hist = rdf.Histo1D(histModel, "jetHT")
 
         histModel = ROOT.RDF.TH1DModel(
-            f"HT_rec_{sample_names[k]}",
-            f"HT_rec_{sample_names[k]}",
+            f"HT_rec_{sample_name}",
+            f"HT_rec_{sample_name}",
             nBins,
             min_score,
             max_score
         )
-        rdf = rdf.Define("sum_mask", "(sumBx==0) && (sumType==1)")
-        rdf = rdf.Define("HT_rec", "sumEt[sum_mask]")
-        hist = rdf.Histo1D(histModel, "HT_rec")
-        hist.Write()
+        hist_rec = rdf.Histo1D(histModel, "HT_rec")
+
+        def finish():
+            print("    Current Sample: ", sample_name)
+            output_file.cd()
+            hist.Write()
+            hist_rec.Write()
+
+        return [hist, hist_rec], finish
+
+    return job
+
+def main(nBins, n_threads, max_graphs, skim_dir):
+
+    # has to happen before any dataframe is created
+    enableThreads(n_threads)
+
+    # read samples from their skims where available
+    if skim_dir != None:
+        useSkims(skim_dir)
+
+    # get list of sample names and remove ZeroBias
+    sample_names = list(samples.keys())
+    if 'ZeroBias' in sample_names:
+        sample_names.remove('ZeroBias')
+
+    # create output ROOT file
+    out_path = 'hists_HT_240402.root'
+    output_file = ROOT.TFile(out_path, 'RECREATE')
+
+    # make hists for zerobias and each sample, running the event loops
+    # of all samples concurrently
+    jobs = [sampleJob('ZeroBias', nBins, output_file)]
+    jobs += [sampleJob(sample_name, nBins, output_file) for sample_name in sample_names]
+    runJobs(jobs, max_graphs)
 
     output_file.Write()
     output_file.Close()
 
+    # list the contents of the file for the draw scripts
+    all_names = ['ZeroBias'] + sample_names
+    writeManifest(
+        out_path,
+        all_names,
+        [f"HT_{sample_name}" for sample_name in all_names] + [f"HT_rec_{sample_name}" for sample_name in all_names],
+        {"HT": [int(nBins), min_score, max_score]},
+        inputs=inputHashes(samples, all_names)
+    )
+
 if __name__ == "__main__":
 	parser = argparse.ArgumentParser(
         description="This program creates CICADA score plots"
@@ -100,7 +102,13 @@ if __name__ == "__main__":
         default=200,
         help="number of bins"
     )
+	parser.add_argument(
+        "-s",
+        "--skim_dir",
+        default=None,
+        help="directory with sample skims written by createSkims.py")
+	addRunnerArguments(parser)
 
 	args = parser.parse_args()
 
-	main( args.n_bins)
+	main(args.n_bins, args.threads, args.max_graphs, args.skim_dir)
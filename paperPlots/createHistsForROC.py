@@ -6,12 +6,19 @@
 
 import ROOT
 import argparse
-import numpy as np
-from paperSampleBuilder import samples
-from triggers import triggers as trig_list
+from paperSampleBuilder import samples, useSkims
+from sample import sample
 import json
-import uproot
-import awkward as ak
+from graphRunner import addRunnerArguments, enableThreads, runJobs
+from triggerBits import defineTriggerOR, maskedOR, readTriggerOrder
+from derivedColumns import defineDerived
+from histManifest import inputHashes, writeManifest
+from rocBinning import (
+    n_bins_cicada, min_score_cicada, max_score_cicada,
+    n_bins_ht, min_score_ht, max_score_ht,
+    n_bins_trig, min_score_trig, max_score_trig,
+    n_bins_pt, min_score_pt, max_score_pt
+)
 
 
 # names of CICADA models
@@ -20,268 +27,198 @@ cicada_names = ["CICADA_v1p2p2",
                 "CICADA_v1p2p2N",
                 "CICADA_v2p2p2N"]
 
-# minimum and maximum scores for histogram
-min_score_cicada = 0.0
-max_score_cicada = 1024.0
-n_bins_cicada = 400
-min_score_ht = 0.0
-max_score_ht = 2000.0
-n_bins_ht = 300
-min_score_trig = -0.5
-max_score_trig = 1.5
-n_bins_trig = 2
-min_score_pt = 0.0
-max_score_pt = 1000.0
-n_bins_pt = 300
 
+# order of the trigger decisions packed in the skim read by theSample,
+# None if it reads the full ntuples. Raises RuntimeError if the files of
+# the skim were packed differently or without storing the order
+def packedTriggersOf(theSample):
+    if theSample.treeNames != [sample.snapshotTreeName]:
+        return None
+
+    orders = [readTriggerOrder(path) for path in theSample.listOfFiles]
+    if None in orders or any(order != orders[0] for order in orders):
+        raise RuntimeError(f"Skim {theSample.listOfFiles} does not store one packed trigger order, write it again with createSkims.py")
+    return orders[0]
+
+# define the columns needed for the histograms (HT, L1 unprescaled OR and
+# leading jet Et) on the dataframe rdf. The L1 unprescaled OR is a masked
+# test of the packed decisions of triggers. packedTriggers is the order of
+# the decisions packed in a skim, whose stored OR may be of another menu
+def defineColumns(rdf, triggers, packedTriggers=None):
+    rdf = defineDerived(rdf, ["HT", "leadJetEt"])
+
+    # create column for whether events pass any unprescaled triggers. For
+    # a skim it is computed again from the packed decisions, so that it
+    # follows the current menu (maskedOR raises ValueError if a trigger of
+    # the menu was not packed)
+    if packedTriggers != None:
+        rdf = rdf.Redefine("L1UnprescaledOR", maskedOR(triggers, packedTriggers))
+    else:
+        rdf = defineTriggerOR(rdf, "L1UnprescaledOR", triggers)
+
+    return rdf
+
+# book (but do not fill) the 3d histogram of CICADA score, HT and L1
+# unprescaled OR for the CICADA version cicada_name
+def bookScoreHist(rdf, hist_name, cicada_name):
+    histModel = ROOT.RDF.TH3DModel(
+        hist_name,
+        hist_name,
+        n_bins_cicada,
+        min_score_cicada,
+        max_score_cicada,
+        n_bins_ht,
+        min_score_ht,
+        max_score_ht,
+        n_bins_trig,
+        min_score_trig,
+        max_score_trig
+    )
 
-# Create a C++ lambda function for OR operation as a string
-or_operation_cpp = """
-int OROperation(const ROOT::VecOps::RVec<int>& cols) {
-    for (auto col : cols) {
-        if (col!=0) return 1;
-    }
-    return 0;
-}
-"""
-
-def getUnprescaledTriggers(triggerlist):
-
-    with open("filePaths.json") as f:
-        f = open("filePaths.json")
-        filePaths = json.load(f)["ZeroBias"]
-
-    j = 0
-    for filePath in filePaths:
-        f = uproot.open(filePath)
-        tree = f["L1TTriggerBitsNtuplizer/L1TTriggerBits"]
-        to_remove = []
-
-        for i in range(len(triggerlist)):
-
-            try:
-                prescales = tree[f"{triggerlist[i]}_prescale"].array()
-            except Exception:
-                print("Trigger not found: ", triggerlist[i])
-                continue
-            if len(prescales)==0: continue
-            if (sum(prescales)/len(prescales)!=1):
-                to_remove.append(triggerlist[i])
-
-        for i in range(len(to_remove)):
-            triggerlist.remove(to_remove[i])
-
-        j+=1
-        if j > 30: break
+    return rdf.Histo3D(
+        histModel,
+        f"{cicada_name}_score",
+        "HT",
+        "L1UnprescaledOR"
+    )
 
-    with open("unprescaledTriggers.json", "w") as final:
-        json.dump(triggerlist, final)
+# book (but do not fill) the histogram of leading jet Et
+def bookJetHist(rdf, hist_name):
+    histModel = ROOT.RDF.TH1DModel(
+        hist_name,
+        hist_name,
+        n_bins_pt,
+        min_score_pt,
+        max_score_pt
+    )
 
+    return rdf.Filter("leadJetEt >= 0").Histo1D(histModel, "leadJetEt")
 
-    return triggerlist
+# book all histograms of one sample for every CICADA version. prefix is
+# the part of the histogram name before the CICADA version (e.g.
+# anomalyScore_ZeroBias_test). The leading jet histogram does not depend
+# on the CICADA version, so it is booked once and written under the name
+# for each version. Returns a list of (name, histogram) pairs
+def bookHists(rdf, score_prefix, jet_prefix):
+    hists = []
 
+    jet_hist = bookJetHist(rdf, f"{jet_prefix}_{cicada_names[0]}")
+    for i in range(len(cicada_names)):
+        score_name = f"{score_prefix}_{cicada_names[i]}"
+        hists.append((score_name, bookScoreHist(rdf, score_name, cicada_names[i])))
+        hists.append((f"{jet_prefix}_{cicada_names[i]}", jet_hist))
+
+    return hists
+
+# write the histograms in hists (list of (name, histogram) pairs) of the
+# sample sample_name to the ROOT file out_path, and its manifest. The
+# first access to a histogram triggers the event loop for all histograms
+# booked on the same dataframe
+def writeHists(out_path, hists, sample_name):
+    output_file = ROOT.TFile(out_path, "RECREATE")
+
+    for name, hist in hists:
+        if name.startswith("anomalyScore"):
+            print(f"    {name}")
+            print("        Bin Content Example 1 = ", hist.GetBinContent(10, 2, 2))
+            print("        Bin Content Example 2 = ", hist.GetBinContent(5, 1, 1))
+        if hist.GetName() != name:
+            hist.Clone(name).Write()
+        else:
+            hist.Write()
 
+    output_file.Write()
+    output_file.Close()
 
-def main(out_prefix):
-    # get unprescaled triggers (filter out prescaled triggers from list)
-    with open("unprescaledTriggerTables.json", "r") as f:
-        triggers = json.load(f)["unprescaledTriggers"]
+    # list the contents of the file for the draw scripts
+    writeManifest(
+        out_path,
+        [sample_name],
+        [name for name, _ in hists],
+        {
+            "score": [n_bins_cicada, min_score_cicada, max_score_cicada],
+            "HT": [n_bins_ht, min_score_ht, max_score_ht],
+            "L1UnprescaledOR": [n_bins_trig, min_score_trig, max_score_trig],
+            "leadJetEt": [n_bins_pt, min_score_pt, max_score_pt],
+        },
+        models=cicada_names,
+        inputs=inputHashes(samples, [sample_name])
+    )
 
-    # Create a C++ function dynamically for the OR operation
-    cpp_code = """
-    #include <ROOT/RVec.hxx>
-    using namespace ROOT::VecOps;
 
-    int OROperation(const RVec<int>& cols) {
-        for (auto col : cols) {
-            if (col != 0) return 1;
-        }
-        return 0;
-    }
-    """
+# returns a job for graphRunner.runJobs which books the zerobias
+# histograms (test and train splits) and writes them to out_prefix
+def zeroBiasJob(out_prefix, triggers):
 
-    # compile cpp code
-    ROOT.gInterpreter.Declare(cpp_code)
+    def job():
+        # get zerobias and create columns for HT, L1 unprescaled OR and
+        # leading jet Et
+        zero_bias = samples['ZeroBias'].getNewDataframe()
+        zero_bias = defineColumns(zero_bias, triggers, packedTriggersOf(samples['ZeroBias']))
 
-    columns_str = ", ".join(triggers)
-    function_call = f"OROperation({{{columns_str}}})"
+        # separate out test and train data
+        zero_bias_test = zero_bias.Filter('lumi % 2 == 1')
+        zero_bias_train = zero_bias.Filter('lumi % 2 == 0')
 
-    # get list of sample names and remove ZeroBias
-    sample_names = list(samples.keys())
-    if 'ZeroBias' in sample_names:
-        sample_names.remove('ZeroBias')
+        # book every zerobias histogram before running the event loop, so
+        # that all of them are filled in a single pass over the data
+        zero_bias_eff = zero_bias_test.Mean("L1UnprescaledOR")
+        hists = bookHists(zero_bias_test, "anomalyScore_ZeroBias_test", "jetEt_ZeroBias_test")
+        hists += bookHists(zero_bias_train, "anomalyScore_ZeroBias_train", "jetEt_ZeroBias_train")
 
-    # get zerobias and filter out training events
-    zero_bias = samples['ZeroBias'].getNewDataframe()
+        def finish():
+            print("Sample: ZeroBias")
+            print("ZB Efficiency = ", zero_bias_eff.GetValue())
+            writeHists(f"{out_prefix}_ZeroBias.root", hists, "ZeroBias")
 
-    # create column for HT
-    zero_bias = zero_bias.Define("sum_mask", "(sumBx==0) && (sumType==1)")
-    zero_bias = zero_bias.Define("HT", "sumEt[sum_mask]")
+        return [zero_bias_eff] + [hist for _, hist in hists], finish
 
-    # create column for whether events pass any unprescaled triggers
-    zero_bias = zero_bias.Define("L1UnprescaledOR", function_call)
+    return job
 
-    zero_bias = zero_bias.Define("leadJetEt", """
-    auto leadingJetEt = [](const ROOT::RVec<float>& jetEt) {
-        return jetEt.size() > 0 ? jetEt[0] : -1.0f;
-    };
-    return leadingJetEt(jetEt);
-""", ["L1Upgrade/jetEt"])
+# returns a job for graphRunner.runJobs which books the histograms of the
+# signal sample sample_name and writes them to out_prefix
+def sampleJob(out_prefix, triggers, sample_name):
 
-    # separate out test and train data
-    zero_bias_test = zero_bias.Filter('lumi % 2 == 1')
-    zero_bias_train = zero_bias.Filter('lumi % 2 == 0')
+    def job():
+        rdf = samples[sample_name].getNewDataframe()
+        rdf = defineColumns(rdf, triggers, packedTriggersOf(samples[sample_name]))
 
-    #array = ak.from_rdataframe(zero_bias_test, columns=("L1UnprescaledOR",))
-    #print(array)
-    l1unprescaledor = zero_bias_test.AsNumpy(columns=["L1UnprescaledOR"])
-    print("ZB Efficiency = ", sum(l1unprescaledor["L1UnprescaledOR"])/len(l1unprescaledor["L1UnprescaledOR"]))
+        sig_eff = rdf.Mean("L1UnprescaledOR")
+        hists = bookHists(rdf, f"anomalyScore_{sample_name}", f"jetEt_{sample_name}")
 
+        def finish():
+            print(f"Sample: {sample_name}")
+            print("    Sig Efficiency = ", sig_eff.GetValue())
+            writeHists(f"{out_prefix}_{sample_name}.root", hists, sample_name)
 
+        return [sig_eff] + [hist for _, hist in hists], finish
 
-    # create file for zerobias hists
-    print("Sample: ZeroBias")
-    output_file = ROOT.TFile(f"{out_prefix}_ZeroBias.root", "RECREATE")
+    return job
 
-    # create and fill CICADA score histograms for zerobias
-    for i in range(len(cicada_names)):
-        print("    CICADA VERSION: ", cicada_names[i])
-
-        histModel = ROOT.RDF.TH3DModel(
-            f"anomalyScore_ZeroBias_test_{cicada_names[i]}",
-            f"anomalyScore_ZeroBias_test_{cicada_names[i]}",
-            n_bins_cicada,
-            min_score_cicada,
-            max_score_cicada,
-            n_bins_ht,
-            min_score_ht,
-            max_score_ht,
-            n_bins_trig,
-            min_score_trig,
-            max_score_trig,
-        )
-
-        hist = zero_bias_test.Histo3D(
-            histModel,
-            f"{cicada_names[i]}_score",
-            "HT",
-            "L1UnprescaledOR"
-        )
-        print("        Bin Content Example 1 = ", hist.GetBinContent(10, 2, 2))
-        print("        Bin Content Example 2 = ", hist.GetBinContent(5, 1, 1))
-        hist.Write()
-
-
-        histModel = ROOT.RDF.TH3DModel(
-            f"anomalyScore_ZeroBias_train_{cicada_names[i]}",
-            f"anomalyScore_ZeroBias_train_{cicada_names[i]}",
-            n_bins_cicada,
-            min_score_cicada,
-            max_score_cicada,
-            n_bins_ht,
-            min_score_ht,
-            max_score_ht,
-            n_bins_trig,
-            min_score_trig,
-            max_score_trig
-        )
-
-        hist = zero_bias_train.Histo3D(
-            histModel,
-            f"{cicada_names[i]}_score",
-            "HT",
-            "L1UnprescaledOR"
-        )
-        hist.Write()
-
-        histModel = ROOT.RDF.TH1DModel(
-            f"jetEt_ZeroBias_test_{cicada_names[i]}",
-            f"jetEt_ZeroBias_test_{cicada_names[i]}",
-            n_bins_pt,
-            min_score_pt,
-            max_score_pt
-        )
-
-        hist = zero_bias_test.Filter("leadJetEt >= 0").Histo1D(histModel, "leadJetEt")
-        hist.Write()
-
-        histModel = ROOT.RDF.TH1DModel(
-            f"jetEt_ZeroBias_train_{cicada_names[i]}",
-            f"jetEt_ZeroBias_train_{cicada_names[i]}",
-            n_bins_pt,
-            min_score_pt,
-            max_score_pt
-        )
-
-        hist = zero_bias_train.Filter("leadJetEt >= 0").Histo1D(histModel, "leadJetEt")
-        hist.Write()
 
-    output_file.Write()
-    output_file.Close()
+def main(out_prefix, n_threads, max_graphs, skim_dir):
+    # has to happen before any dataframe is created
+    enableThreads(n_threads)
 
+    # read samples from their skims where available
+    if skim_dir != None:
+        useSkims(skim_dir)
 
-    # create and write hists for each sample
-    for k in range(len(sample_names)):
-        print(f"Sample: {sample_names[k]}")
-        output_file = ROOT.TFile(f"{out_prefix}_{sample_names[k]}.root", "RECREATE")
-
-        rdf = samples[sample_names[k]].getNewDataframe()
-        rdf = rdf.Define("sum_mask", "(sumBx==0) && (sumType==1)")
-        rdf = rdf.Define("HT", "sumEt[sum_mask]")
-
-        rdf = rdf.Define("L1UnprescaledOR", function_call)
-
-        rdf = rdf.Define("leadJetEt", """
-    auto leadingJetEt = [](const ROOT::RVec<float>& jetEt) {
-        return jetEt.size() > 0 ? jetEt[0] : -1.0f;
-    };
-    return leadingJetEt(jetEt);
-""", ["L1Upgrade/jetEt"])
-
-        l1unprescaledor = rdf.AsNumpy(columns=["L1UnprescaledOR"])
-        print("    Sig Efficiency = ", sum(l1unprescaledor["L1UnprescaledOR"])/len(l1unprescaledor["L1UnprescaledOR"]))
-
-        # create and fill CICADA score histograms
-        for i in range(len(cicada_names)):
-            print("    CICADA VERSION: ", cicada_names[i])
-
-            histModel = ROOT.RDF.TH3DModel(
-                f"anomalyScore_{sample_names[k]}_{cicada_names[i]}",
-                f"anomalyScore_{sample_names[k]}_{cicada_names[i]}",
-                n_bins_cicada,
-                min_score_cicada,
-                max_score_cicada,
-                n_bins_ht,
-                min_score_ht,
-                max_score_ht,
-                n_bins_trig,
-                min_score_trig,
-                max_score_trig
-            )
-
-            hist = rdf.Histo3D(
-                histModel,
-                f"{cicada_names[i]}_score",
-                "HT",
-                "L1UnprescaledOR"
-            )
-            print("        Bin Content Example 1 = ", hist.GetBinContent(10, 2, 2))
-            print("        Bin Content Example 2 = ", hist.GetBinContent(5, 1, 1))
-            hist.Write()
+    # get unprescaled triggers (filter out prescaled triggers from list)
+    with open("unprescaledTriggerTables.json", "r") as f:
+        triggers = json.load(f)["unprescaledTriggers"]
 
-            histModel = ROOT.RDF.TH1DModel(
-                f"jetEt_{sample_names[k]}_{cicada_names[i]}",
-                f"jetEt_{sample_names[k]}_{cicada_names[i]}",
-                n_bins_pt,
-                min_score_pt,
-                max_score_pt
-            )
+    # get list of sample names and remove ZeroBias
+    sample_names = list(samples.keys())
+    if 'ZeroBias' in sample_names:
+        sample_names.remove('ZeroBias')
 
-            hist = rdf.Filter("leadJetEt >= 0").Histo1D(histModel, "leadJetEt")
-            hist.Write()
+    # zerobias goes first so that its (long) event loop starts right away
+    # and the signal samples fill the remaining cores
+    jobs = [zeroBiasJob(out_prefix, triggers)]
+    jobs += [sampleJob(out_prefix, triggers, sample_name) for sample_name in sample_names]
 
-        output_file.Write()
-        output_file.Close()
+    runJobs(jobs, max_graphs)
 
 
 if __name__ == "__main__":
@@ -290,6 +227,8 @@ if __name__ == "__main__":
         description="This program creates 3d histograms with CICADA score, HT, and L1 Unprescaled OR"
     )
     parser.add_argument("-o", "--out_prefix", default = "ROChist", help="output file name/path prefix")
+    parser.add_argument("-s", "--skim_dir", default = None, help="directory with sample skims written by createSkims.py")
+    addRunnerArguments(parser)
     args = parser.parse_args()
 
-    main(args.out_prefix)
+    main(args.out_prefix, args.threads, args.max_graphs, args.skim_dir)
@@ -7,124 +7,148 @@
 import ROOT
 import argparse
 import numpy as np
-from paperSampleBuilder import samples
-
-def main(nBins):
+from paperSampleBuilder import samples, useSkims
+from graphRunner import addRunnerArguments, enableThreads, runJobs
+from histManifest import inputHashes, writeManifest
+
+# names of CICADA models
+cicada_names = ["CICADA_v1p2p2",
+                "CICADA_v2p2p2",
+                "CICADA_v1p2p2N",
+                "CICADA_v2p2p2N"]
+
+# minimum and maximum scores for histogram
+min_score = 0.0
+max_score = 1024.0
+
+# returns a job for graphRunner.runJobs which books the score histogram
+# of the sample sample_name for every CICADA version and stores the
+# booked histograms in hists[sample_name][cicada_name]
+def sampleJob(sample_name, nBins, hists):
+
+    def job():
+        rdf = samples[sample_name].getNewDataframe()
+
+        hists[sample_name] = {}
+        for cicada_name in cicada_names:
+            histModel = ROOT.RDF.TH1DModel(
+                f"anomalyScore_{sample_name}_{cicada_name}",
+                f"anomalyScore_{sample_name}_{cicada_name}",
+                nBins,
+                min_score,
+                max_score)
+            hists[sample_name][cicada_name] = rdf.Histo1D(histModel, f"{cicada_name}_score")
+
+        return list(hists[sample_name].values()), None
+
+    return job
+
+# creates the efficiency histogram (fraction of events with a score above
+# each threshold) for the score histogram hist
+def createEfficiencyHist(hist, name):
+
+    # create efficiency hist
+    eff = ROOT.TH1D(
+        name,
+        name,
+        hist.GetNbinsX(),
+        hist.GetXaxis().GetXmin(),
+        hist.GetXaxis().GetXmax()
+    )
 
-    # get list of sample names and remove ZeroBias
-	sample_names = list(samples.keys())
-	if 'ZeroBias' in sample_names:
-		sample_names.remove('ZeroBias')
+    # get total number of events in score plot
+    scoreplot_int = float(hist.Integral())
 
-    # get zerobias and filter out training events
-	zero_bias = samples['ZeroBias'].getNewDataframe()
-	zero_bias_test = zero_bias.Filter('lumi % 2 == 1')
-    zero_bias_train = zero_bias.Filter('lumi % 2 == 0')
+    # iterate through bins and compute partial sum of events
+    for j in range(1, hist.GetNbinsX()+1):
 
-    # names of CICADA models
-	cicada_names = ["CICADA_v1p2p2",
-                    "CICADA_v2p2p2",
-                    "CICADA_v1p2p2N",
-                    "CICADA_v2p2p2N"]
+        # calculate partial sum
+        scoreplot_int_current = float(hist.Integral(j, hist.GetNbinsX()))
+        # calculate uncertainty as sqrt(N)
+        uncertainty = np.sqrt(scoreplot_int_current)
+        # scale sum and uncertainty by total integral
+        scoreplot_int_current = scoreplot_int_current/scoreplot_int
+        uncertainty = uncertainty/scoreplot_int
 
-    # minimum and maximum scores for histogram
-	min_score = 0.0
-	max_score = 1024.0
+        # set bin content and error of histogram
+        eff.SetBinContent(j,scoreplot_int_current)
+        eff.SetBinError(j, uncertainty)
 
-    # create one output file per CICADA model/version
-	for i in range(len(cicada_names)):
-        print("CICADA VERSION: ", cicada_names[i])
-
-        # create ROOT output file
-		output_file = ROOT.TFile(f'hists_240220_{cicada_names[i]}.root',
-                                 'RECREATE')
-
-		# make histModel for zerobias
-		histModel = ROOT.RDF.TH1DModel(
-            f"anomalyScore_ZeroBias_{cicada_names[i]}",
-            f"anomalyScore_ZeroBias_{cicada_names[i]}",
-            nBins,
-            min_score,
-            max_score)
-
-        # get and write score hist
-        hist = zero_bias.Histo1D(histModel, f"{cicada_names[i]}_score")
-		hist.Write()
-
-        # create efficiency hist
-		eff = ROOT.TH1D(
-            f"efficiency_ZeroBias_{cicada_names[i]}",
-            f"efficiency_ZeroBias_{cicada_names[i]}",
-            hist.GetNbinsX(),
-            hist.GetXaxis().GetXmin(),
-            hist.GetXaxis().GetXmax()
-        )
+    return eff
 
-        # get total number of events in score plot
-		scoreplot_int = float(hist.Integral())
+def main(nBins, n_threads, max_graphs, skim_dir):
 
-        # iterate through bins and compute partial sum of events
-		for j in range(1, hist.GetNbinsX()+1):
+    # has to happen before any dataframe is created
+    enableThreads(n_threads)
 
-            # calculate partial sum
-			scoreplot_int_current = float(hist.Integral(j, hist.GetNbinsX()))
-			# calculate uncertainty as sqrt(N)
-            uncertainty = np.sqrt(scoreplot_int_current)
-            # scale sum and uncertainty by total integral
-			scoreplot_int_current = scoreplot_int_current/scoreplot_int
-			uncertainty = uncertainty/scoreplot_int
+    # read samples from their skims where available
+    if skim_dir != None:
+        useSkims(skim_dir)
 
-            # set bin content and error of histogram
-			eff.SetBinContent(j,scoreplot_int_current)
-			eff.SetBinError(j, uncertainty)
+    # get list of sample names and remove ZeroBias
+    sample_names = list(samples.keys())
+    if 'ZeroBias' in sample_names:
+        sample_names.remove('ZeroBias')
+
+    # book the score histograms of zerobias and every sample and run all
+    # event loops concurrently
+    hists = {}
+    jobs = [sampleJob('ZeroBias', nBins, hists)]
+    jobs += [sampleJob(sample_name, nBins, hists) for sample_name in sample_names]
+    runJobs(jobs, max_graphs)
+    inputs = inputHashes(samples, ['ZeroBias'] + sample_names)
 
-        # clone efficiency hist to create rate hist
-		rate = eff.Clone(f"rate_ZeroBias_{cicada_names[i]}")
-		rate.Scale(2544.0 * 11245e-3) # convert efficiency to rate
-		rate.Write()
+    # create one output file per CICADA model/version
+    for i in range(len(cicada_names)):
+        print("CICADA VERSION: ", cicada_names[i])
 
-        # create and write hists for each sample
-		for k in range(len(sample_names)):
+        # create ROOT output file
+        out_path = f'hists_240220_{cicada_names[i]}.root'
+        output_file = ROOT.TFile(out_path, 'RECREATE')
+        hist_names = []
+
+        # write zerobias score hist
+        hist = hists['ZeroBias'][cicada_names[i]]
+        hist.Write()
+        hist_names.append(hist.GetName())
+
+        # create efficiency hist and clone it to create rate hist
+        eff = createEfficiencyHist(hist, f"efficiency_ZeroBias_{cicada_names[i]}")
+        rate = eff.Clone(f"rate_ZeroBias_{cicada_names[i]}")
+        rate.Scale(2544.0 * 11245e-3) # convert efficiency to rate
+        rate.Write()
+        hist_names.append(rate.GetName())
+
+        # write hists for each sample
+        for k in range(len(sample_names)):
             print("    Current Sample: ", sample_names[k])
 
-			# make score plot
-			histModel = ROOT.RDF.TH1DModel(f"anomalyScore_{sample_names[k]}_{cicada_names[i]}", f"anomalyScore_{sample_names[k]}_{cicada_names[i]}",
-							nBins, min_score, max_score)
-			rdf = samples[sample_names[k]].getNewDataframe()
-			hist = rdf.Histo1D(histModel, f"{cicada_names[i]}_score")
-			hist.Write()
-
-			# make efficiency plot
-			eff = ROOT.TH1D(
-                f"efficiency_{sample_names[k]}_{cicada_names[i]}",
-				f"efficiency_{sample_names[k]}_{cicada_names[i]}",
-				hist.GetNbinsX(),
-				hist.GetXaxis().GetXmin(),
-				hist.GetXaxis().GetXmax()
-            )
-
-			# total integral
-			scoreplot_int = float(hist.Integral())
-
-			# compute value for each threshold
-			for j in range(1, hist.GetNbinsX()+1):
-				scoreplot_int_current = float(hist.Integral(j, hist.GetNbinsX()))
-				uncertainty = np.sqrt(scoreplot_int_current)
-				scoreplot_int_current = scoreplot_int_current/scoreplot_int
-				uncertainty = uncertainty/scoreplot_int
-
-				eff.SetBinContent(j,scoreplot_int_current)
-				eff.SetBinError(j, uncertainty)
-
-			eff.Write()
-
-			# make rate plot
-			rate = eff.Clone(f"rate_{sample_names[k]}_{cicada_names[i]}")
-			rate.Scale(2544.0 * 11245e-3) # convert efficiency to rate
-			rate.Write()
-
-		output_file.Write()
-		output_file.Close()
+            # write score plot
+            hist = hists[sample_names[k]][cicada_names[i]]
+            hist.Write()
+
+            # make efficiency plot
+            eff = createEfficiencyHist(hist, f"efficiency_{sample_names[k]}_{cicada_names[i]}")
+            eff.Write()
+
+            # make rate plot
+            rate = eff.Clone(f"rate_{sample_names[k]}_{cicada_names[i]}")
+            rate.Scale(2544.0 * 11245e-3) # convert efficiency to rate
+            rate.Write()
+            hist_names += [hist.GetName(), eff.GetName(), rate.GetName()]
+
+        output_file.Write()
+        output_file.Close()
+
+        # list the contents of the file for the draw scripts
+        writeManifest(
+            out_path,
+            ['ZeroBias'] + sample_names,
+            hist_names,
+            {"score": [int(nBins), min_score, max_score]},
+            models=[cicada_names[i]],
+            inputs=inputs
+        )
 
 if __name__ == "__main__":
 
@@ -136,7 +160,13 @@ if __name__ == "__main__":
         "--n_bins",
         default=100,
         help="number of bins")
+	parser.add_argument(
+        "-s",
+        "--skim_dir",
+        default=None,
+        help="directory with sample skims written by createSkims.py")
+	addRunnerArguments(parser)
 
 	args = parser.parse_args()
 
-	main( args.n_bins)
+	main(args.n_bins, args.threads, args.max_graphs, args.skim_dir)
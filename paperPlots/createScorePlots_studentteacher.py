@@ -8,31 +8,70 @@ import ROOT
 import argparse
 import numpy as np
 from paperSampleBuilder import samples
+from graphRunner import addRunnerArguments, enableThreads, runJobs
+from histManifest import inputHashes, writeManifest
+
+# names of cicada versions
+cicada_names = [
+    #"CICADA_v1p2p0",
+    #"CICADA_v2p2p0",
+    #"CICADA_v1p2p0N",
+    #"CICADA_v2p2p0N",
+    #"CICADA_vXp2p0_teacher",
+    "CICADA_vXp2p0N_teacher"
+]
+
+# min and max scores for histograms
+min_score = 0.0
+max_score = 1024.0
+
+# returns a job for graphRunner.runJobs which books the score histogram
+# of the sample sample_name for every CICADA version and stores the
+# booked histograms in hists[sample_name][cicada_name]. Training events
+# are filtered out of ZeroBias
+def sampleJob(sample_name, nBins, hists):
+
+    def job():
+        rdf = samples[sample_name].getNewDataframe()
+        if sample_name == 'ZeroBias':
+            rdf = rdf.Filter('lumi % 2 == 1')
+
+        hists[sample_name] = {}
+        for cicada_name in cicada_names:
+            histModel = ROOT.RDF.TH1DModel(
+                f"anomalyScore_{sample_name}_{cicada_name}",
+                f"anomalyScore_{sample_name}_{cicada_name}",
+                nBins,
+                min_score,
+                max_score)
+
+            if "teacher" in cicada_name:
+                print("    Calculating teacher score")
+                rdf = rdf.Redefine(f"{cicada_name}_score", f"32*log({cicada_name}_score)")
 
-def main(nBins):
+            hists[sample_name][cicada_name] = rdf.Histo1D(histModel, f"{cicada_name}_score")
+
+        return list(hists[sample_name].values()), None
+
+    return job
+
+def main(nBins, n_threads, max_graphs):
+
+    # has to happen before any dataframe is created
+    enableThreads(n_threads)
 
     # get list of sample names and remove ZeroBias
     sample_names = list(samples.keys())
     if 'ZeroBias' in sample_names:
         sample_names.remove('ZeroBias')
 
-    # filter training events out of ZeroBias
-    zero_bias = samples['ZeroBias'].getNewDataframe()
-    zero_bias = zero_bias.Filter('lumi % 2 == 1')
-
-    # names of cicada versions
-    cicada_names = [
-        #"CICADA_v1p2p0",
-        #"CICADA_v2p2p0",
-        #"CICADA_v1p2p0N",
-        #"CICADA_v2p2p0N",
-        #"CICADA_vXp2p0_teacher",
-        "CICADA_vXp2p0N_teacher"
-    ]
-
-    # min and max scores for histograms
-    min_score = 0.0
-    max_score = 1024.0
+    # book the score histograms of zerobias and every sample and run all
+    # event loops concurrently
+    hists = {}
+    jobs = [sampleJob('ZeroBias', nBins, hists)]
+    jobs += [sampleJob(sample_name, nBins, hists) for sample_name in sample_names]
+    runJobs(jobs, max_graphs)
+    inputs = inputHashes(samples, ['ZeroBias'] + sample_names)
 
     # create one output file for each cicada version
     for i in range(len(cicada_names)):
@@ -40,49 +79,32 @@ def main(nBins):
         print("CICADA VERSION: ", cicada_names[i])
 
         # create output ROOT file
-        output_file = ROOT.TFile(
-            f'hists_compare_240312_{cicada_names[i]}.root',
-            'RECREATE'
-        )
+        out_path = f'hists_compare_240312_{cicada_names[i]}.root'
+        output_file = ROOT.TFile(out_path, 'RECREATE')
 
-        # make hists for zerobias
-        histModel = ROOT.RDF.TH1DModel(
-            f"anomalyScore_ZeroBias_{cicada_names[i]}",
-            f"anomalyScore_ZeroBias_{cicada_names[i]}",
-             nBins,
-            min_score,
-            max_score
-        )
-        if "teacher" in cicada_names[i]:
-            zero_bias = zero_bias.Redefine(f"{cicada_names[i]}_score", f"32*log({cicada_names[i]}_score)")
-        hist = zero_bias.Histo1D(histModel, f"{cicada_names[i]}_score")
-        hist.Write()
+        # write hists for zerobias
+        hists['ZeroBias'][cicada_names[i]].Write()
 
         # iterate through each sample
         for k in range(len(sample_names)):
             print("    Current Sample: ", sample_names[k])
-
-            # make score plot
-            histModel = ROOT.RDF.TH1DModel(
-                f"anomalyScore_{sample_names[k]}_{cicada_names[i]}",
-                f"anomalyScore_{sample_names[k]}_{cicada_names[i]}",
-                nBins,
-                min_score,
-                max_score)
-            rdf = samples[sample_names[k]].getNewDataframe()
-
-            if "teacher" in cicada_names[i]:
-                print("    Calculating teacher score")
-                rdf = rdf.Redefine(f"{cicada_names[i]}_score", f"32*log({cicada_names[i]}_score)")
-
-            hist = rdf.Histo1D(histModel, f"{cicada_names[i]}_score")
-            hist.Write()
+            hists[sample_names[k]][cicada_names[i]].Write()
 
 
         # write and close file
         output_file.Write()
         output_file.Close()
 
+        # list the contents of the file for the draw scripts
+        writeManifest(
+            out_path,
+            ['ZeroBias'] + sample_names,
+            [hists[sample_name][cicada_names[i]].GetName() for sample_name in ['ZeroBias'] + sample_names],
+            {"score": [int(nBins), min_score, max_score]},
+            models=[cicada_names[i]],
+            inputs=inputs
+        )
+
 if __name__ == "__main__":
 
 	parser = argparse.ArgumentParser(
@@ -94,7 +116,8 @@ if __name__ == "__main__":
         default=100,
         help="number of bins"
     )
+	addRunnerArguments(parser)
 
 	args = parser.parse_args()
 
-	main( args.n_bins)
+	main(args.n_bins, args.threads, args.max_graphs)
@@ -0,0 +1,67 @@
+########################################################################
+## createSkims.py                                                     ##
+## writes one compact local skim per sample holding only the columns  ##
+## used by the paper plots (see paperSampleBuilder.skimColumns)       ##
+########################################################################
+
+import ROOT
+import argparse
+import json
+import os
+from paperSampleBuilder import samples, skimColumns, skimPath
+from graphRunner import enableThreads
+from triggerBits import bitColumnDefines, bitColumnNames, maskedOR, writeTriggerOrder
+
+def main(skim_dir, sample_names, n_threads):
+
+    enableThreads(n_threads)
+
+    # the decisions of every trigger in the tables are packed into bit
+    # words stored in the skim, so that the OR of any menu can be
+    # evaluated later without the trigger branches. The L1 unprescaled OR
+    # is computed once here from the packed words and stored as well
+    with open("unprescaledTriggerTables.json", "r") as f:
+        tables = json.load(f)
+    triggers = tables["unprescaledTriggers"]
+    allTriggers = tables["unprescaledTriggers"] + tables["prescaledTriggers"]
+
+    if sample_names == None:
+        sample_names = list(samples.keys())
+
+    os.makedirs(skim_dir, exist_ok=True)
+
+    for sample_name in sample_names:
+        print(f"Sample: {sample_name}")
+        path = skimPath(skim_dir, sample_name)
+
+        # only pack the triggers present in this sample. The unprescaled
+        # ones are required, as before. The dataframe is reused to write
+        # the skim, so the chain is built once
+        rdf = samples[sample_name].getNewDataframe()
+        packedTriggers = [
+            trigger for trigger in allTriggers
+            if trigger in triggers or rdf.HasColumn(trigger)
+        ]
+
+        defines = bitColumnDefines(packedTriggers)
+        defines["L1UnprescaledOR"] = maskedOR(triggers, packedTriggers)
+        samples[sample_name].snapshot(
+            skimColumns + bitColumnNames(len(packedTriggers)),
+            path,
+            defines = defines,
+            theDataframe = rdf
+        )
+        writeTriggerOrder(path, packedTriggers)
+        print(f"    Wrote {path} ({os.path.getsize(path)/1e6:.1f} MB)")
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="This program writes per-sample skims with the columns needed for the paper plots"
+    )
+    parser.add_argument("-o", "--skim_dir", default="skims", help="directory to write the skims to")
+    parser.add_argument("-s", "--samples", nargs="+", default=None, help="samples to skim (default all)")
+    parser.add_argument("-t", "--threads", type=int, default=0, help="number of threads for ROOT implicit multithreading (0 uses all cores)")
+    args = parser.parse_args()
+
+    main(args.skim_dir, args.samples, args.threads)
@@ -0,0 +1,46 @@
+########################################################################
+## derivedColumns.py                                                  ##
+## registry of the derived columns shared by the histogram producers  ##
+########################################################################
+
+from compiledHelpers import loadHelpers, checkBranchTypes
+
+# name -> (expression, derived columns it requires). Expressions call the
+# compiled helpers of l1Helpers.h, so every dataframe only JIT-compiles a
+# one line call with typed arguments
+derivedColumns = {
+    # Et of the in-time L1 HT sums
+    "HT": ("l1helpers::inTimeSums(sumEt, sumType, sumBx, 1)", []),
+    # the same, as named in the HT comparison histograms
+    "HT_rec": ("l1helpers::inTimeSums(sumEt, sumType, sumBx, 1)", []),
+    # HT recomputed from the in-time jets with Et > 30 and |eta| < 2.4
+    "jetHT": ("l1helpers::jetHT(jetEt, jetEta, jetBx)", []),
+    # Et of the leading jet, -1 for events without jets
+    "leadJetEt": ("l1helpers::leadingJetEt(jetEt)", []),
+}
+
+########################################################################
+# Defines on rdf the derived columns in names and the derived columns
+# they require, each once and in dependency order. Columns the dataframe
+# already has (e.g. stored in a skim) are not defined again, and columns
+# not asked for are not defined at all. Raises TypeError if the branches
+# do not have the types the helpers were compiled for
+def defineDerived(rdf, names):
+
+    loadHelpers()
+    if len(names) > 0:
+        mismatched = checkBranchTypes(rdf)
+        if len(mismatched) > 0:
+            raise TypeError(f"Branches do not match the types compiled in l1Helpers.h: {mismatched}")
+
+    for name in names:
+        if name not in derivedColumns:
+            raise KeyError(f"Unknown derived column {name}")
+        if rdf.HasColumn(name):
+            continue
+
+        expression, requires = derivedColumns[name]
+        rdf = defineDerived(rdf, requires)
+        rdf = rdf.Define(name, expression)
+
+    return rdf
@@ -9,7 +9,7 @@ import ROOT
 import argparse
 import numpy as np
 from array import array
-from paperSampleBuilder import samples
+from histManifest import manifestSamples
 from sampleNames import sample_name_dict
 
 # function for drawing the CMS label on the plot
@@ -28,7 +28,7 @@ def main(input_file, output_dir):
     f = ROOT.TFile(input_file)
 
     # grab the sample names
-    sample_names = list(samples.keys())
+    sample_names = manifestSamples(input_file)
 
      # iterate through all samples
     for i in range(len(sample_names)):
@@ -10,13 +10,38 @@ import argparse
 import numpy as np
 from array import array
 from sampleNames import sample_name_dict
-from plottingUtils import convertCICADANametoPrint, createLabel, calculateROC, calculateROCPt, calculateROCOR, createROCTGraph, getL1UnprescaledEfficiency, getHTEfficiency, getAcceptRatioHist
+from plottingUtils import convertCICADANametoPrint, createLabel, createROCTGraph, getL1UnprescaledEfficiency, getHTEfficiency, getAcceptRatioHist
 import json
 import re
+import multiprocessing
+from histRepository import histRepository
+from rocStore import rocStore
 
 with open('plottingOptions.json') as f:
     options = json.load(f)
 
+# histograms of the files read by this process, shared by all plots
+hists = None
+
+# returns the histogram repository of the files with prefix file_prefix
+def getHists(file_prefix):
+    global hists
+    if hists == None or hists.file_prefix != file_prefix:
+        if hists != None:
+            hists.close()
+        hists = histRepository(file_prefix)
+    return hists
+
+# ROC curves computed or read by this process
+rocs = None
+
+# returns the ROC curve store in the directory store_dir
+def getRocs(store_dir):
+    global rocs
+    if rocs == None or rocs.store_dir != store_dir:
+        rocs = rocStore(store_dir)
+    return rocs
+
 def findClosestY(graph, x_point):
     n_points = graph.GetN()
     x_values = np.array(graph.GetX())
@@ -29,9 +54,9 @@ def findClosestY(graph, x_point):
 
 
 ########################################################################
-# creates a rate plot for HT from the file f_bkg which has events from
-# background sample bkg_name and saves the plot to out_dir
-def plotRateHT(f_bkg, out_dir, bkg_name):
+# creates a rate plot for HT from the histograms of background sample
+# bkg_name in the histogram repository repo and saves the plot to out_dir
+def plotRateHT(repo, out_dir, bkg_name):
     print("Making rate plot for HT")
 
     # create ROOT canvas
@@ -40,10 +65,7 @@ def plotRateHT(f_bkg, out_dir, bkg_name):
     # get score histogram from ZB file (cicada version doesn't matter
     # since we are integrating over that axis
     c_name = options["cicada_names"][0]
-    if bkg_name == "ZeroBias":
-        hist = f_bkg.Get(f"anomalyScore_ZeroBias_test_{c_name}")
-    else:
-        hist = f_bkg.Get(f"anomalyScore_{bkg_name}_{c_name}")
+    hist = repo.get(bkg_name, getBkgHistNames(bkg_name, c_name)[0])
 
     # get accepted ratio histogram from above hist
     h = getAcceptRatioHist(hist, 1, hist_name = "HT")
@@ -106,10 +128,11 @@ def plotRateCICADA(hist_bkg, out_dir, cicada_name):
 ########################################################################
 # creates a ROC plot for (HT>ht_threshold or CICADA score>threshold)
 # for the CICADA version cicada_name for signal samples listed in
-# sample_shortlist and loaded from files with prefix file_prefix and the
+# sample_shortlist and loaded from the histogram repository repo and the
 # background histogram hist_bkg, which has events from background sample
-# bkg_name and saves the plot to out_dir
-def plotROCHTShortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_name, file_prefix):
+# bkg_name and saves the plot to out_dir. Curves come from the ROC store
+# rocs
+def plotROCHTShortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_name, repo, rocs):
     print(f"Making ROC shortlist plot for (HT>ht_threshold or CICADA score>threshold) for {cicada_name} and background {bkg_name}")
 
     # create ROOT canvas
@@ -122,18 +145,15 @@ def plotROCHTShortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_nam
 
         print("    Current Sample = ", sample_shortlist[i])
 
-        try:
-            f_s = ROOT.TFile(f"{file_prefix}_{sample_shortlist[i]}.root")
-        except Exception:
+        # load histograms
+        h_s = repo.get(sample_shortlist[i], f"anomalyScore_{sample_shortlist[i]}_{cicada_name}")
+        if h_s == None:
             print(f"    ROOT file for sample {sample_shortlist[i]} does not exist")
             continue
 
-        # load histograms
-        h_s = f_s.Get(f"anomalyScore_{sample_shortlist[i]}_{cicada_name}")
-
         # calcualte ROC for CICADA score > threshold OR HT > ht_threshold
         try:
-            tpr_or_ht, fpr_or_ht = calculateROCOR(hist_bkg, h_s, options["ht_threshold"], 1)
+            tpr_or_ht, fpr_or_ht = rocs.calculateROCOR((bkg_name, cicada_name, sample_shortlist[i]), hist_bkg, h_s, options["ht_threshold"], 1)
         except ValueError as e:
             print("    Error:", e)
 
@@ -183,10 +203,11 @@ def plotROCHTShortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_nam
 ########################################################################
 # creates a ROC plot for (l1 unprescaled or CICADA score>threshold)
 # for the CICADA version cicada_name for signal samples listed in
-# sample_shortlist and loaded from files with prefix file_prefix and the
+# sample_shortlist and loaded from the histogram repository repo and the
 # background histogram hist_bkg, which has events from background sample
-# bkg_name and saves the plot to out_dir
-def plotROCL1Shortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_name, file_prefix):
+# bkg_name and saves the plot to out_dir. Curves come from the ROC store
+# rocs
+def plotROCL1Shortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_name, repo, rocs):
     print(f"Making ROC shortlist plot for (l1 unprescaled  or CICADA score>threshold) for {cicada_name} and background {bkg_name}")
 
     # create ROOT canvas
@@ -198,18 +219,15 @@ def plotROCL1Shortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_nam
     graphs = []
     for i in range(len(sample_shortlist)):
 
-        try:
-            f_s = ROOT.TFile(f"{file_prefix}_{sample_shortlist[i]}.root")
-        except Exception:
+        # load histograms
+        h_s = repo.get(sample_shortlist[i], f"anomalyScore_{sample_shortlist[i]}_{cicada_name}")
+        if h_s == None:
             print(f"ROOT file for sample {sample_shortlist[i]} does not exist")
             continue
 
-        # load histograms
-        h_s = f_s.Get(f"anomalyScore_{sample_shortlist[i]}_{cicada_name}")
-
         # calcualte ROC for CICADA score > threshold OR L1 Trigger
         try:
-            tpr_or_l1, fpr_or_l1 = calculateROCOR(hist_bkg, h_s, options["l1_threshold"], 2)
+            tpr_or_l1, fpr_or_l1 = rocs.calculateROCOR((bkg_name, cicada_name, sample_shortlist[i]), hist_bkg, h_s, options["l1_threshold"], 2)
         except ValueError as e:
             print("Error:", e)
 
@@ -257,7 +275,12 @@ def plotROCL1Shortlist(hist_bkg, out_dir, bkg_name, sample_shortlist, cicada_nam
 
     return
 
-def plotCombinedROC(hist_bkg, signal_list, file_prefix, c_name, out_dir, suffix):
+########################################################################
+# creates one plot of the CICADA and HT ROCs of every signal sample in
+# signal_list, loaded from the histogram repository repo, against the
+# histogram hist_bkg of background bkg_name for the CICADA version c_name.
+# Curves come from the ROC store rocs
+def plotCombinedROC(hist_bkg, bkg_name, signal_list, repo, rocs, c_name, out_dir, suffix):
 
     # create ROOT canvas
     canvas = ROOT.TCanvas("c", "ROC", 1000, 800)
@@ -273,7 +296,6 @@ def plotCombinedROC(hist_bkg, signal_list, file_prefix, c_name, out_dir, suffix)
     pad1.cd()
 
     tgraphs = []
-    sig_files = []
     max_y = 0.0
     first = True
 
@@ -282,13 +304,12 @@ def plotCombinedROC(hist_bkg, signal_list, file_prefix, c_name, out_dir, suffix)
         signal_index = options["sample_shortlist"].index(signal_list[i])
         signal_color = ROOT.TColor.GetColor(options["shortlist_colors"][signal_index])
 
-        sig_files.append(ROOT.TFile(f"{file_prefix}_{signal_list[i]}.root"))
-
         # load histograms
-        hist_sig = sig_files[-1].Get(f"anomalyScore_{signal_list[i]}_{c_name}")
+        hist_sig = repo.get(signal_list[i], f"anomalyScore_{signal_list[i]}_{c_name}")
 
-        tpr_cicada, fpr_cicada = calculateROC(hist_bkg, hist_sig, 0)
-        tpr_ht, fpr_ht = calculateROC(hist_bkg, hist_sig, 1)
+        label = (bkg_name, c_name, signal_list[i])
+        tpr_cicada, fpr_cicada = rocs.calculateROC(label, hist_bkg, hist_sig, 0)
+        tpr_ht, fpr_ht = rocs.calculateROC(label, hist_bkg, hist_sig, 1)
 
         # get TGraph for CICADA
         g_cicada = createROCTGraph(tpr_cicada,
@@ -348,9 +369,6 @@ def plotCombinedROC(hist_bkg, signal_list, file_prefix, c_name, out_dir, suffix)
 
     canvas.SaveAs(f"{out_dir}/ROC_CICADA_HT_combined_{c_name}_{suffix}.pdf")
 
-    for i in range(len(sig_files)):
-        sig_files[i].Close()
-
     return
 
 ########################################################################
@@ -596,26 +614,28 @@ def plotL1OR(hist_sig, hist_bkg,
 ########################################################################
 # creates OR ROC plots for the CICADA version cicada_name for signal
 # sample sample_name from events from background bkg_name. Uses
-# background histogram hist_bkg and signal histogram hist_sig. Saves
-# plots to out_dir
-def createIndividualROCPlots(hist_bkg, hist_sig, hist_bkg_pt, hist_sig_pt, out_dir, bkg_name, cicada_name, sample_name):
+# background histogram hist_bkg and signal histogram hist_sig, with the
+# curves taken from the ROC store rocs. Saves plots to out_dir
+def createIndividualROCPlots(hist_bkg, hist_sig, hist_bkg_pt, hist_sig_pt, out_dir, bkg_name, cicada_name, sample_name, rocs):
 
     print(f"Creating ROC plots for sample {sample_name}")
 
+    label = (bkg_name, cicada_name, sample_name)
+
     # calculate simple ROC for CICADA score and HT
-    tpr_cicada, fpr_cicada = calculateROC(hist_bkg, hist_sig, 0)
-    tpr_ht, fpr_ht = calculateROC(hist_bkg, hist_sig, 1)
-    tpr_pt, fpr_pt = calculateROCPt(hist_bkg_pt, hist_sig_pt)
+    tpr_cicada, fpr_cicada = rocs.calculateROC(label, hist_bkg, hist_sig, 0)
+    tpr_ht, fpr_ht = rocs.calculateROC(label, hist_bkg, hist_sig, 1)
+    tpr_pt, fpr_pt = rocs.calculateROCPt(label, hist_bkg_pt, hist_sig_pt)
 
     # calculate ROC for CICADA score > threshold OR HT > ht_threshold
     try:
-        tpr_or_ht, fpr_or_ht = calculateROCOR(hist_bkg, hist_sig, options["ht_threshold"], 1)
+        tpr_or_ht, fpr_or_ht = rocs.calculateROCOR(label, hist_bkg, hist_sig, options["ht_threshold"], 1)
     except ValueError as e:
         print("Error:", e)
 
     # calcualte ROC for CICADA score > threshold OR L1 Unprescaled Trigger
     try:
-        tpr_or_l1, fpr_or_l1 = calculateROCOR(hist_bkg, hist_sig, options["l1_threshold"], 2)
+        tpr_or_l1, fpr_or_l1 = rocs.calculateROCOR(label, hist_bkg, hist_sig, options["l1_threshold"], 2)
     except ValueError as e:
         print("Error:", e)
 
@@ -648,75 +668,117 @@ def createIndividualROCPlots(hist_bkg, hist_sig, hist_bkg_pt, hist_sig_pt, out_d
 
 
 ########################################################################
-def main(file_prefix, out_dir):
+# returns the names of the score and jet pT histograms of the background
+# sample bkg_name for the CICADA version c_name
+def getBkgHistNames(bkg_name, c_name):
+    if bkg_name=="ZeroBias":
+        return f"anomalyScore_ZeroBias_test_{c_name}", f"jetEt_ZeroBias_test_{c_name}"
+    else:
+        return f"anomalyScore_{bkg_name}_{c_name}", f"jetEt_{bkg_name}_{c_name}"
+
+########################################################################
+# creates the individual ROC plots for one (background, CICADA version,
+# signal sample) task. The histograms are read through the repository
+# of the process running the task, so that tasks can run in separate
+# worker processes and each process reads a histogram only once
+def processSignal(task):
+
+    file_prefix, roc_dir, out_dir, bkg_name, c_name, sample_name = task
 
-    print("Loading bkg files ...")
+    # worker processes never draw to the screen
+    ROOT.gROOT.SetBatch(True)
 
-    # grab background files
-    f_zb = ROOT.TFile(f"{file_prefix}_ZeroBias.root")
-    f_sn = ROOT.TFile(f"{file_prefix}_SingleNeutrino_E-10-gun.root")
-    f_bkg = [f_zb, f_sn]
+    print(sample_name)
+
+    repo = getHists(file_prefix)
+
+    # load signal histograms, skip signal if its file is missing
+    h_s = repo.get(sample_name, f"anomalyScore_{sample_name}_{c_name}")
+    h_s_pt = repo.get(sample_name, f"jetEt_{sample_name}_{c_name}")
+    if h_s == None:
+        print(f"ROOT file for sample {sample_name} does not exist")
+        return
+
+    # load background histograms
+    bkg_hist_name, bkg_hist_name_pt = getBkgHistNames(bkg_name, c_name)
+    h_zb = repo.get(bkg_name, bkg_hist_name)
+    h_zb_pt = repo.get(bkg_name, bkg_hist_name_pt)
+
+    # plot ROCs
+    createIndividualROCPlots(h_zb, h_s, h_zb_pt, h_s_pt, out_dir, bkg_name, c_name, sample_name, getRocs(roc_dir))
+
+    return
+
+########################################################################
+def main(file_prefix, out_dir, n_jobs, roc_dir):
+
+    # every histogram file is read through one repository, and ROC
+    # curves are only computed when their inputs changed
+    repo = getHists(file_prefix)
+    rocs = getRocs(roc_dir)
 
     # names and associated print names of backgrounds
     bkg_names = ["ZeroBias", "SingleNeutrino_E-10-gun"]
 
     # get rate plot for HT
-    plotRateHT(f_bkg[0], out_dir, bkg_names[0])
+    plotRateHT(repo, out_dir, bkg_names[0])
 
     # get list of sample names
     sample_names = list(sample_name_dict.keys())
 
     # iterate through backgrounds
-    for l in range(len(f_bkg)):
+    for l in range(len(bkg_names)):
         # iterate through CICADA versions
         for k in range(len(options["cicada_names"])):
 
             c_name = options["cicada_names"][k]
 
-            # load ZeroBias histograms
-            if bkg_names[l]=="ZeroBias":
-                h_zb = f_bkg[l].Get(f"anomalyScore_ZeroBias_test_{c_name}")
-                h_zb_pt = f_bkg[l].Get(f"jetEt_ZeroBias_test_{c_name}")
-            else:
-                h_zb = f_bkg[l].Get(f"anomalyScore_SingleNeutrino_E-10-gun_{c_name}")
-                h_zb_pt = f_bkg[l].Get(f"jetEt_SingleNeutrino_E-10-gun_{c_name}")
+            # load background histograms
+            bkg_hist_name, _ = getBkgHistNames(bkg_names[l], c_name)
+            h_zb = repo.get(bkg_names[l], bkg_hist_name)
 
             # combined ROC plots
-            plotCombinedROC(h_zb, options["samples_loweff"], file_prefix, c_name, out_dir, "low")
-            plotCombinedROC(h_zb, options["samples_higheff"], file_prefix, c_name, out_dir, "high")
+            plotCombinedROC(h_zb, bkg_names[l], options["samples_loweff"], repo, rocs, c_name, out_dir, "low")
+            plotCombinedROC(h_zb, bkg_names[l], options["samples_higheff"], repo, rocs, c_name, out_dir, "high")
 
             # get rate plot for current CICADA version
             if bkg_names[l]=="ZeroBias":
                 plotRateCICADA(h_zb, out_dir, c_name)
 
             # combined shortlist plot for HT or CICADA
-            #plotROCHTShortlist(h_zb, out_dir, bkg_names[l], options["sample_shortlist"], c_name, file_prefix)
+            #plotROCHTShortlist(h_zb, out_dir, bkg_names[l], options["sample_shortlist"], c_name, repo, rocs)
             # combined shortlist plot for L1 or CICADA
-            #plotROCL1Shortlist(h_zb, out_dir, bkg_names[l], options["sample_shortlist"], c_name, file_prefix)
-
-            # individual plots for signal samples
-            for i in range(len(sample_names)):
-
-                # skip over the samples that are not signal
-                if sample_names[i]=="ZeroBias": continue
-                if sample_names[i]=="SingleNeutrino_E-10-gun": continue
-
-                print(sample_names[i])
-
-                # try to open signal file, skip signal if failed
-                try:
-                    f_s = ROOT.TFile(f"{file_prefix}_{sample_names[i]}.root")
-                except Exception:
-                    print(f"ROOT file for sample {sample_names[i]} does not exist")
-                    continue
-
-                # load histograms
-                h_s = f_s.Get(f"anomalyScore_{sample_names[i]}_{c_name}")
-                h_s_pt = f_s.Get(f"jetEt_{sample_names[i]}_{c_name}")
-
-                # plot ROCs
-                createIndividualROCPlots(h_zb, h_s, h_zb_pt, h_s_pt, out_dir, bkg_names[l], c_name, sample_names[i])
+            #plotROCL1Shortlist(h_zb, out_dir, bkg_names[l], options["sample_shortlist"], c_name, repo, rocs)
+
+    # (background, CICADA version, signal) combinations for the
+    # individual ROC plots, grouped by signal so that each signal file is
+    # read once while the background histograms stay cached
+    tasks = []
+    for i in range(len(sample_names)):
+
+        # skip over the samples that are not signal
+        if sample_names[i]=="ZeroBias": continue
+        if sample_names[i]=="SingleNeutrino_E-10-gun": continue
+
+        for l in range(len(bkg_names)):
+            for k in range(len(options["cicada_names"])):
+                tasks.append((file_prefix, roc_dir, out_dir, bkg_names[l], options["cicada_names"][k], sample_names[i]))
+
+    # each task writes its own plots, so running them in a pool of worker
+    # processes gives the same output as running them one by one
+    if n_jobs > 1:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(n_jobs) as pool:
+            # one chunk holds the tasks of one signal sample
+            chunksize = len(bkg_names) * len(options["cicada_names"])
+            for _ in pool.imap(processSignal, tasks, chunksize=chunksize):
+                pass
+    else:
+        for task in tasks:
+            processSignal(task)
 
+    print(f"ROC curves of the main process: {rocs.n_read} read from {roc_dir}, {rocs.n_computed} computed")
+    repo.close()
 
 
 
@@ -737,11 +799,26 @@ if __name__ == "__main__":
         default='./',
         help="directory to save output plots"
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes for the individual ROC plots"
+    )
+    parser.add_argument(
+        "-r",
+        "--roc_store",
+        default="rocCurves",
+        help="directory of the cached ROC curves"
+    )
 
     args = parser.parse_args()
 
 
     main(
         args.file_prefix,
-        args.output_dir
+        args.output_dir,
+        args.jobs,
+        args.roc_store
     )
@@ -1,7 +1,7 @@
 import ROOT
 import argparse
 import numpy as np
-from paperSampleBuilder import samples
+from histManifest import manifestSamples
 
 def createCMSLabel():
 	cmsLatex = ROOT.TLatex()
@@ -16,7 +16,7 @@ def main(input_file, output_dir, cicada_name):
 
 	f = ROOT.TFile(input_file)
 
-	sample_names = list(samples.keys())
+	sample_names = manifestSamples(input_file)
 	if 'ZeroBias' in sample_names:
 		sample_names.remove('ZeroBias')
 	
@@ -10,7 +10,7 @@ import ROOT
 import argparse
 import numpy as np
 from array import array
-from paperSampleBuilder import samples
+from histManifest import manifestSamples
 from sampleNames import sample_name_dict
 
 # function for drawing the CMS label on the plot
@@ -36,7 +36,7 @@ def main(input_v1, input_v2, input_teacher, N,  output_dir):
     f_teacher = ROOT.TFile(input_teacher)
 
     # grab the sample names
-    sample_names = list(samples.keys())
+    sample_names = manifestSamples(input_v1)
 
      # iterate through all samples
     for i in range(len(sample_names)):
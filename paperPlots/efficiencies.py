@@ -1,4 +1,15 @@
-efficiencies = {
+########################################################################
+## efficiencies.py                                                    ##
+## L1 unprescaled efficiencies of the samples, read from the cache of ##
+## efficiencyStore.py. Samples not in the cache fall back to the      ##
+## efficiencies recorded by hand before it                            ##
+########################################################################
+
+from efficiencyStore import efficiencyStore
+
+# L1 unprescaled efficiencies as recorded before efficiencyStore.py, used
+# for the samples it has not computed
+recordedEfficiencies = {
 
     "GluGluHToBB_M-125_TuneCP5_13p6TeV_powheg-pythia8": 0.9929485596707819,
     "GluGluHToGG_M-125_TuneCP5_13p6TeV_powheg-pythia8": 0.8919113054341037,
@@ -46,3 +57,20 @@ efficiencies = {
     "ZeroBias": 0.007204272772241323,
 
 }
+
+_efficiencies = None
+
+# the store reads the trigger menu and the cache, so it is only built
+# when efficiencies is first imported from this module. It never reads
+# the events of the samples; run efficiencyStore.py to compute missing
+# entries
+def getEfficiencies():
+    global _efficiencies
+    if _efficiencies == None:
+        _efficiencies = efficiencyStore(seed=recordedEfficiencies)
+    return _efficiencies
+
+def __getattr__(name):
+    if name == "efficiencies":
+        return getEfficiencies()
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -0,0 +1,132 @@
+########################################################################
+## efficiencyStore.py                                                 ##
+## cache of the L1 unprescaled efficiencies of the samples, computed  ##
+## on demand and kept until the trigger menu or the files change      ##
+########################################################################
+
+import argparse
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from fileCatalog import filesHash
+from paperSampleBuilder import filePaths
+from calculateUnprescaledTriggerEfficiency import countEfficiencies
+
+# default location of the cache
+storePath = "efficiencyStore.json"
+
+# hash of a trigger menu. The OR does not depend on the order of the
+# triggers, so neither does the hash
+def menuHash(triggers):
+    return hashlib.sha256(json.dumps(sorted(triggers)).encode()).hexdigest()[:16]
+
+########################################################################
+# Mapping sample name -> L1 unprescaled efficiency of the sample for the
+# trigger menu triggers. Entries are stored in the JSON file path under
+# the key (sample, menu hash, catalog hash), so an efficiency is only
+# computed again when the menu or the files of the sample change.
+# Samples without a stored entry fall back to the values of seed (e.g.
+# the efficiencies recorded by hand before the store). Missing
+# efficiencies are only computed with compute=True, as that reads every
+# file of the sample; otherwise looking them up raises KeyError
+class efficiencyStore(Mapping):
+    def __init__(self, triggers=None, path=storePath, step_size="100 MB", n_workers=os.cpu_count(), seed=None, compute=False):
+        if triggers == None:
+            with open("unprescaledTriggerTables.json", "r") as f:
+                triggers = json.load(f)["unprescaledTriggers"]
+        self.triggers = triggers
+        self.menu = menuHash(triggers)
+        self.path = path
+        self.step_size = step_size
+        self.n_workers = n_workers
+        self.seed = seed if seed != None else {}
+        self.compute = compute
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+        self.sampleKeys = {}
+
+    # key of sample_name, hashed once per store as hashing stats every
+    # file of the sample
+    def key(self, sample_name):
+        if sample_name not in self.sampleKeys:
+            self.sampleKeys[sample_name] = f"{sample_name}:{self.menu}:{filesHash(filePaths[sample_name])}"
+        return self.sampleKeys[sample_name]
+
+    def save(self):
+        temporaryPath = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporaryPath, "w") as outfile:
+            json.dump(self.entries, outfile, indent=4)
+        os.replace(temporaryPath, self.path)
+
+    # computes the efficiencies of every sample in sample_names that is
+    # not stored yet, in one pass over their files
+    def update(self, sample_names):
+        keys = {sample_name: self.key(sample_name) for sample_name in sample_names}
+        missing = [sample_name for sample_name in sample_names if keys[sample_name] not in self.entries]
+        if len(missing) == 0:
+            return
+
+        print(f"Computing efficiencies of {missing}")
+        computed = countEfficiencies(
+            {sample_name: filePaths[sample_name] for sample_name in missing},
+            self.triggers,
+            self.step_size,
+            self.n_workers
+        )
+        for sample_name in missing:
+            self.entries[keys[sample_name]] = dict(sample=sample_name, **computed[sample_name])
+        self.save()
+
+    def __getitem__(self, sample_name):
+        if sample_name in filePaths:
+            key = self.key(sample_name)
+            if key not in self.entries and self.compute:
+                self.update([sample_name])
+            if key in self.entries:
+                return self.entries[key]["efficiency"]
+        if sample_name in self.seed:
+            return self.seed[sample_name]
+        raise KeyError(f"No efficiency of {sample_name} stored for the current menu, compute it with python efficiencyStore.py -s {sample_name}")
+
+    # samples with an efficiency stored for the current menu and files,
+    # followed by the other samples of seed
+    def stored(self):
+        names = [sample_name for sample_name in filePaths if self.key(sample_name) in self.entries]
+        return names + [sample_name for sample_name in self.seed if sample_name not in names]
+
+    def __contains__(self, sample_name):
+        return sample_name in self.seed or (sample_name in filePaths and self.key(sample_name) in self.entries)
+
+    def __iter__(self):
+        return iter(self.stored())
+
+    def __len__(self):
+        return len(self.stored())
+
+def main(sample_names, out_path, step_size, n_workers):
+
+    store = efficiencyStore(path=out_path, step_size=step_size, n_workers=n_workers, compute=True)
+    if sample_names == None:
+        sample_names = list(filePaths)
+    store.update(sample_names)
+
+    for sample_name in sample_names:
+        print(f"{sample_name}: {store[sample_name]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program fills the cache of L1 unprescaled efficiencies for the samples whose entry is missing or outdated"
+    )
+    parser.add_argument("-s", "--samples", nargs="+", default=None, help="samples to compute (default all)")
+    parser.add_argument("-o", "--out_path", default=storePath, help="JSON file holding the cache")
+    parser.add_argument("--step_size", default="100 MB", help="uproot step size for reading the trigger decisions")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of files processed in parallel")
+
+    args = parser.parse_args()
+
+    main(args.samples, args.out_path, args.step_size, args.jobs)
@@ -0,0 +1,166 @@
+########################################################################
+## findUnprescaledTriggers.py                                         ##
+## finds the L1 seeds that are unprescaled in the ZeroBias ntuples    ##
+## and writes unprescaledTriggerTables.json                           ##
+########################################################################
+
+import argparse
+import json
+import os
+import numpy as np
+import uproot
+from concurrent.futures import ProcessPoolExecutor
+from triggers import triggers
+from paperSampleBuilder import filePaths
+
+# tree holding the L1 decisions and prescales
+triggerTreeName = "L1TTriggerBitsNtuplizer/L1TTriggerBits"
+# tree holding the run number
+eventTreeName = "l1EventTree/L1EventTree"
+
+########################################################################
+# Reads the prescales of every trigger in triggerlist from the file
+# fileName with one tree.arrays call. Returns a dictionary with
+#   passes:  bool array over triggerlist, False if the mean prescale of
+#            the trigger in this file is not 1 (triggers missing from the
+#            file or files without events pass, as before)
+#   found:   bool array over triggerlist, whether the trigger is in the
+#            file
+#   runs:    the runs in the file
+#   events:  the number of events of each run
+#   minimum, maximum: (runs, triggers) arrays of the smallest and largest
+#            prescale of each trigger in each run (nan if not found)
+def scanFile(fileName, triggerlist):
+
+    with uproot.open(fileName) as f:
+        tree = f[triggerTreeName]
+        branchNames = set(tree.keys())
+        found = np.array([f"{trigger}_prescale" in branchNames for trigger in triggerlist])
+        foundNames = [f"{triggerlist[i]}_prescale" for i in np.nonzero(found)[0]]
+
+        prescales = tree.arrays(filter_name=foundNames, library="np")
+        run = f[eventTreeName].arrays(filter_name=["run"], library="np")
+        run = next(iter(run.values()))
+
+    # both trees hold one entry per event, so the run of every prescale
+    # is the run of the same entry of L1EventTree
+    n_events = len(run)
+    for name in foundNames:
+        if len(prescales[name]) != n_events:
+            raise RuntimeError(f"{fileName}: {triggerTreeName} has {len(prescales[name])} entries but {eventTreeName} has {n_events}")
+    # (triggers found, events) matrix of prescales
+    matrix = np.empty((len(foundNames), n_events), dtype=np.float64)
+    for i in range(len(foundNames)):
+        matrix[i] = prescales[foundNames[i]]
+
+    passes = np.ones(len(triggerlist), dtype=bool)
+    if n_events > 0:
+        passes[found] = matrix.sum(axis=1) / n_events == 1
+
+    # per run minimum and maximum of every prescale
+    order = np.argsort(run, kind='stable')
+    runs, starts, events = np.unique(run[order], return_index=True, return_counts=True)
+    minimum = np.full((len(runs), len(triggerlist)), np.nan)
+    maximum = np.full((len(runs), len(triggerlist)), np.nan)
+    if n_events > 0 and len(foundNames) > 0:
+        matrix = matrix[:, order]
+        minimum[:, found] = np.minimum.reduceat(matrix, starts, axis=1).T
+        maximum[:, found] = np.maximum.reduceat(matrix, starts, axis=1).T
+
+    return {
+        "passes": passes,
+        "found": found,
+        "runs": runs,
+        "events": events,
+        "minimum": minimum,
+        "maximum": maximum,
+    }
+
+# scanFile for the process pool
+def scanTask(task):
+    fileName, triggerlist = task
+    print(fileName)
+    return scanFile(fileName, triggerlist)
+
+########################################################################
+# Scans files in n_workers processes and combines the results. Returns
+# the list of unprescaled triggers, the list of prescaled triggers and a
+# dictionary of per-run prescale information
+def findUnprescaledTriggers(files, triggerlist, n_workers):
+
+    tasks = [(fileName, triggerlist) for fileName in files]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(scanTask, tasks))
+    else:
+        results = [scanTask(task) for task in tasks]
+
+    # a trigger is unprescaled if it passes in every file
+    passes = np.logical_and.reduce([result["passes"] for result in results])
+    found = np.logical_or.reduce([result["found"] for result in results])
+    for i in np.nonzero(~found)[0]:
+        print("Trigger not found: ", triggerlist[i])
+
+    # combine the per-run extrema of every file
+    runs = np.unique(np.concatenate([result["runs"] for result in results]))
+    events = np.zeros(len(runs), dtype=np.int64)
+    minimum = np.full((len(runs), len(triggerlist)), np.nan)
+    maximum = np.full((len(runs), len(triggerlist)), np.nan)
+    for result in results:
+        rows = np.searchsorted(runs, result["runs"])
+        events[rows] += result["events"]
+        minimum[rows] = np.fmin(minimum[rows], result["minimum"])
+        maximum[rows] = np.fmax(maximum[rows], result["maximum"])
+
+    runInfo = {}
+    inRun = ~np.isnan(minimum)
+    for i in range(len(runs)):
+        # triggers not running unprescaled somewhere in this run
+        prescaled = np.nonzero(inRun[i] & ((minimum[i] != 1) | (maximum[i] != 1)))[0]
+        # triggers whose prescale changed within this run
+        changed = np.nonzero(inRun[i] & (minimum[i] != maximum[i]))[0]
+        runInfo[str(runs[i])] = {
+            "events": int(events[i]),
+            "prescaledTriggers": [triggerlist[j] for j in prescaled],
+            "prescaleChanges": {
+                triggerlist[j]: [float(minimum[i, j]), float(maximum[i, j])]
+                for j in changed
+            },
+        }
+
+    unprescaled = [triggerlist[i] for i in range(len(triggerlist)) if passes[i]]
+    prescaled = [triggerlist[i] for i in range(len(triggerlist)) if not passes[i]]
+
+    return unprescaled, prescaled, runInfo
+
+def main(out_path, n_files, n_workers):
+
+    files = filePaths["ZeroBias"]
+    if n_files > 0:
+        files = files[:n_files]
+
+    unprescaled, prescaled, runInfo = findUnprescaledTriggers(files, list(triggers), n_workers)
+    print(f"{len(unprescaled)} unprescaled and {len(prescaled)} prescaled triggers in {len(runInfo)} runs")
+
+    with open(out_path, "w") as outfile:
+        json.dump(
+            {
+                "unprescaledTriggers": unprescaled,
+                "prescaledTriggers": prescaled,
+                "runs": runInfo,
+            },
+            outfile,
+            indent=4
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program finds the unprescaled L1 triggers in the ZeroBias ntuples"
+    )
+    parser.add_argument("-o", "--out_path", default="unprescaledTriggerTables.json", help="where to write the trigger tables")
+    parser.add_argument("-n", "--n_files", type=int, default=31, help="number of ZeroBias files to scan (0 for all)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of files scanned in parallel")
+
+    args = parser.parse_args()
+
+    main(args.out_path, args.n_files, args.jobs)
@@ -0,0 +1,60 @@
+########################################################################
+## graphRunner.py                                                     ##
+## runs the RDataFrame computation graphs of several samples          ##
+## concurrently                                                       ##
+########################################################################
+
+import ROOT
+import profiling
+
+# add the command line options shared by the histogram producers
+def addRunnerArguments(parser):
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=0,
+        help="number of threads for ROOT implicit multithreading (0 uses all cores)"
+    )
+    parser.add_argument(
+        "--max_graphs",
+        type=int,
+        default=0,
+        help="maximum number of sample event loops to run at the same time (0 runs all of them together)"
+    )
+
+# enable ROOT implicit multithreading. Has to be called before any
+# RDataFrame is created
+def enableThreads(n_threads):
+    ROOT.EnableImplicitMT(n_threads)
+    print("Implicit multithreading enabled with pool size ", ROOT.GetThreadPoolSize())
+
+########################################################################
+# Runs the event loops of several samples concurrently. jobs is a list
+# of functions taking no arguments, one per sample, which book (but do
+# not fill) the sample's histograms and return a tuple (results, finish)
+# where results is the list of booked RDataFrame results and finish is
+# called once they are filled (or is None). Booking is delayed until a
+# job is run so at most max_graphs sample graphs (and their per-thread
+# histogram copies) are held in memory at once (0 for no limit)
+def runJobs(jobs, max_graphs=0):
+
+    if max_graphs <= 0:
+        max_graphs = max(len(jobs), 1)
+
+    for i in range(0, len(jobs), max_graphs):
+
+        # book the histograms of every sample in this batch
+        booked = [job() for job in jobs[i:i + max_graphs]]
+
+        # run all event loops of the batch concurrently
+        results = [result for job_results, _ in booked for result in job_results]
+        if len(results) > 0:
+            with profiling.stage("runGraphs", f"{len(booked)} graphs", countEvents=True):
+                ROOT.RDF.RunGraphs(results)
+
+        for _, finish in booked:
+            if finish is not None:
+                finish()
+
+    return
@@ -0,0 +1,52 @@
+########################################################################
+## histManifest.py                                                    ##
+## small JSON manifests written next to the histogram files, listing  ##
+## the samples, models, histograms and binning they hold, so that the ##
+## draw scripts do not need the sample catalog                        ##
+########################################################################
+
+import json
+import os
+import sys
+import time
+from fileCatalog import filesHash
+
+# path of the manifest of the histogram file root_path
+def manifestPath(root_path):
+    return os.path.splitext(root_path)[0] + ".manifest.json"
+
+# hash of the input files of each sample of sample_names in the sample
+# collection samples, to tell which inputs a histogram file was made from
+def inputHashes(samples, sample_names):
+    return {sample_name: filesHash(samples[sample_name].listOfFiles) for sample_name in sample_names}
+
+########################################################################
+# Writes the manifest of the histogram file root_path. binning maps the
+# name of each histogram axis to [number of bins, minimum, maximum]
+def writeManifest(root_path, sample_names, histograms, binning, models=None, inputs=None):
+
+    manifest = {
+        "producer": os.path.basename(sys.argv[0]),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "samples": list(sample_names),
+        "models": list(models) if models != None else [],
+        "histograms": list(histograms),
+        "binning": binning,
+        "inputs": inputs if inputs != None else {},
+    }
+
+    with open(manifestPath(root_path), "w") as outfile:
+        json.dump(manifest, outfile, indent=4)
+
+def readManifest(root_path):
+    with open(manifestPath(root_path), "r") as f:
+        return json.load(f)
+
+# names of the samples in the histogram file root_path. Files made before
+# manifests were written fall back to the names in the sample catalog
+def manifestSamples(root_path):
+    if os.path.exists(manifestPath(root_path)):
+        return readManifest(root_path)["samples"]
+    print(f"No manifest found for {root_path}, taking the sample names from the catalog")
+    from paperSampleBuilder import samples
+    return list(samples.keys())
@@ -0,0 +1,77 @@
+########################################################################
+## histRepository.py                                                  ##
+## read-once access to the histograms of the per-sample files written ##
+## by createHistsForROC.py, keeping a bounded number of files open    ##
+## and of histograms in memory                                        ##
+########################################################################
+
+import os
+from collections import OrderedDict
+import ROOT
+
+########################################################################
+# Histograms of the files {file_prefix}_{sample}.root, looked up by
+# (sample, histogram name). Histograms are detached from their file when
+# first read and kept until max_hists others were read since their last
+# use. At most max_open_files files are open at a time, the least
+# recently used one being closed first
+class histRepository:
+    def __init__(self, file_prefix, max_open_files=16, max_hists=32):
+        self.file_prefix = file_prefix
+        self.max_open_files = max_open_files
+        self.max_hists = max_hists
+        self.openFiles = OrderedDict()
+        self.hists = OrderedDict()
+
+    def filePath(self, sample_name):
+        return f"{self.file_prefix}_{sample_name}.root"
+
+    # open file of sample sample_name, or None if it cannot be read
+    def openFile(self, sample_name):
+        if sample_name in self.openFiles:
+            self.openFiles.move_to_end(sample_name)
+            return self.openFiles[sample_name]
+
+        path = self.filePath(sample_name)
+        if not os.path.exists(path):
+            return None
+        f = ROOT.TFile.Open(path)
+        if not f or f.IsZombie():
+            return None
+
+        self.openFiles[sample_name] = f
+        if len(self.openFiles) > self.max_open_files:
+            _, oldest = self.openFiles.popitem(last=False)
+            oldest.Close()
+        return f
+
+    # histogram hist_name of sample sample_name, or None if the file or
+    # the histogram does not exist
+    def get(self, sample_name, hist_name):
+        key = (sample_name, hist_name)
+        if key in self.hists:
+            self.hists.move_to_end(key)
+            return self.hists[key]
+
+        f = self.openFile(sample_name)
+        if f == None:
+            return None
+        hist = f.Get(hist_name)
+        if not hist:
+            return None
+
+        # keep the histogram when its file is closed; python deletes it
+        # once it is evicted and no longer used
+        hist.SetDirectory(0)
+        ROOT.SetOwnership(hist, True)
+
+        self.hists[key] = hist
+        if len(self.hists) > self.max_hists:
+            self.hists.popitem(last=False)
+        return hist
+
+    def close(self):
+        for f in self.openFiles.values():
+            f.Close()
+        self.openFiles.clear()
+        self.hists.clear()
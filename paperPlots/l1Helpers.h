@@ -0,0 +1,52 @@
+////////////////////////////////////////////////////////////////////////
+// l1Helpers.h                                                        //
+// derived L1 quantities used by the histogram producers. Compiled    //
+// once into a shared library by compiledHelpers.py (ACLiC) instead of //
+// being JIT-compiled from strings for every dataframe                //
+////////////////////////////////////////////////////////////////////////
+
+#ifndef L1HELPERS_H
+#define L1HELPERS_H
+
+#include "ROOT/RVec.hxx"
+
+namespace l1helpers {
+
+// Et of the leading jet, -1 for events without jets
+template <typename T>
+float leadingJetEt(const ROOT::RVec<T>& jetEt) {
+    return jetEt.size() > 0 ? jetEt[0] : -1.0f;
+}
+
+// scalar sum of the Et of the in-time jets with Et > 30 and |eta| < 2.4
+template <typename TEt, typename TEta, typename TBx>
+double jetHT(const ROOT::RVec<TEt>& jetEt, const ROOT::RVec<TEta>& jetEta, const ROOT::RVec<TBx>& jetBx) {
+    double ht = 0.0;
+    for (std::size_t i = 0; i < jetEt.size(); ++i) {
+        if ((jetEt[i] > 30) && (jetEta[i] < 2.4) && (jetEta[i] > -2.4) && (jetBx[i] == 0)) ht += jetEt[i];
+    }
+    return ht;
+}
+
+// Et of the in-time energy sums of type sumType (1 is the HT sum)
+template <typename TEt, typename TType, typename TBx>
+ROOT::RVec<TEt> inTimeSums(const ROOT::RVec<TEt>& sumEt, const ROOT::RVec<TType>& sumType, const ROOT::RVec<TBx>& sumBx, int type) {
+    return sumEt[(sumBx == 0) && (sumType == type)];
+}
+
+// instantiations for the branch types of the L1 ntuples. They are
+// compiled into the library, and the interpreter is told to use those
+// instead of instantiating them again
+#ifdef __ACLIC__
+#define L1HELPERS_INSTANTIATE template
+#else
+#define L1HELPERS_INSTANTIATE extern template
+#endif
+L1HELPERS_INSTANTIATE float leadingJetEt<float>(const ROOT::RVec<float>&);
+L1HELPERS_INSTANTIATE double jetHT<float, float, short>(const ROOT::RVec<float>&, const ROOT::RVec<float>&, const ROOT::RVec<short>&);
+L1HELPERS_INSTANTIATE ROOT::RVec<float> inTimeSums<float, short, short>(const ROOT::RVec<float>&, const ROOT::RVec<short>&, const ROOT::RVec<short>&, int);
+#undef L1HELPERS_INSTANTIATE
+
+}
+
+#endif
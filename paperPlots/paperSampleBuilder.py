@@ -4,12 +4,12 @@
 ## A generic template for samples for the paper                       ##
 ########################################################################
 from sample import sample
+from fileCatalog import fileCatalog, sampleCollection
 import os
-import json
 
-# load json file
-f = open("filePaths.json")
-filePaths = json.load(f)
+# catalog of the files of every sample. The json is indexed on first use
+# and only the file lists of the samples a script touches are read
+filePaths = fileCatalog("filePaths.json")
 
 # the ROOT trees we care about
 treeNames = [
@@ -35,21 +35,56 @@ treeNames = [
     #'CICADA_vXp2p1N_Teacher_Ntuplizer/CICADA_vXp2p1N_teacher'
 ]
 
+# how the friend trees of the samples are kept event aligned (see
+# sample.__init__). Off by default; set it before the first use of a
+# sample, e.g. paperSampleBuilder.friendCheck = "index"
+friendCheck = None
+
 # function for building sample object from files
 def buildSample(paths, treeNames):
     theSample = sample(
         listOfFiles = paths,
         treeNames = treeNames,
+        friendCheck = friendCheck,
     )
     return theSample
 
-# create dictionary of samples with keys corresponding to sample name
-samples = dict(
-    [
-        (
-            sampleName,
-            buildSample(filePaths[sampleName], treeNames)
-        )
-        for sampleName in filePaths
-    ]
+# dictionary-like collection of samples with keys corresponding to sample
+# name. Each sample is only built when it is first used
+samples = sampleCollection(
+    filePaths,
+    lambda paths: buildSample(paths, treeNames)
 )
+
+# columns kept in the per-sample skims written by createSkims.py, which
+# also stores the packed trigger decisions (triggerBits.bitColumnNames)
+skimColumns = [
+    'run',
+    'lumi',
+    'event',
+    'sumEt',
+    'sumBx',
+    'sumType',
+    'jetEt',
+    'jetEta',
+    'jetBx',
+    'L1UnprescaledOR',
+] + [
+    f"{treeName.split('/')[1]}_score"
+    for treeName in treeNames
+    if treeName.startswith('CICADA')
+]
+
+# path of the skim of sample sampleName in the directory skim_dir
+def skimPath(skim_dir, sampleName):
+    return os.path.join(skim_dir, f"{sampleName}.root")
+
+# read every sample that has a skim in skim_dir from the skim instead of
+# from the full set of ntuples
+def useSkims(skim_dir):
+    for sampleName in samples:
+        path = skimPath(skim_dir, sampleName)
+        if os.path.exists(path):
+            samples[sampleName] = sample.fromSnapshot(path)
+        else:
+            print(f"No skim found for sample {sampleName}, reading full ntuples")
@@ -3,6 +3,7 @@ import argparse
 import numpy as np
 from array import array
 import json
+import rocEngine
 
 with open('plottingOptions.json') as f:
     options = json.load(f)
@@ -29,73 +30,9 @@ def createLabel():
 # for HT). Returns TPR and FPR as arrays
 def calculateROC(bkg_hist, sig_hist, axis):
 
-    if axis not in [0,1]:
-        raise ValueError("axis must be 0 or 1")
-
-    # get total integral of background histogram
-    integral_bkg = float(
-        bkg_hist.Integral(0, bkg_hist.GetNbinsX()+1,
-                          0, bkg_hist.GetNbinsY()+1,
-                          0, bkg_hist.GetNbinsZ()+1)
-    )
-
-    # get total integral of signal histogram
-    integral_sig = float(
-        sig_hist.Integral(0, sig_hist.GetNbinsX()+1,
-                          0, sig_hist.GetNbinsY()+1,
-                          0, sig_hist.GetNbinsZ()+1)
-    )
-
-
-    # get list of thresholds
-    if axis==0:
-        edges = [sig_hist.GetXaxis().GetBinLowEdge(i) for i in range(1, sig_hist.GetNbinsX() + 2)]
-    else:
-        edges = [sig_hist.GetYaxis().GetBinLowEdge(i) for i in range(1, sig_hist.GetNbinsY() + 2)]
-
-    tpr = []
-    fpr = []
-    # compute FPR and TPR for each threshold value
-    for threshold in edges:
-
-        if axis==0:
-            # find bin that corresponds to current threshold
-            threshold_bin = sig_hist.GetXaxis().FindBin(threshold)
-
-            # compute partial integrals for accepted events
-            integral_sig_partial = sig_hist.Integral(
-                threshold_bin, sig_hist.GetNbinsX() + 1,
-                0, sig_hist.GetNbinsY()+1,
-                0, sig_hist.GetNbinsZ()+1
-            )
-            integral_bkg_partial = bkg_hist.Integral(
-                threshold_bin, bkg_hist.GetNbinsX() + 1,
-                0, bkg_hist.GetNbinsY()+1,
-                0, bkg_hist.GetNbinsZ()+1
-            )
-        else:
-            threshold_bin = sig_hist.GetYaxis().FindBin(threshold)
-
-            integral_sig_partial = sig_hist.Integral(
-                0, sig_hist.GetNbinsX() + 1,
-                threshold_bin, sig_hist.GetNbinsY()+1,
-                0, sig_hist.GetNbinsZ()+1
-            )
-            integral_bkg_partial = bkg_hist.Integral(
-                0, bkg_hist.GetNbinsX() + 1,
-                threshold_bin, bkg_hist.GetNbinsY()+1,
-                0, bkg_hist.GetNbinsZ()+1
-            )
-
-        # divide accepted events by total events
-        tpr_current = integral_sig_partial / integral_sig
-        fpr_current = integral_bkg_partial / integral_bkg
-
-        tpr.append(tpr_current)
-        fpr.append(fpr_current)
-
-        if (tpr_current==0) and (fpr_current==0):
-            break
+    # all thresholds are computed at once from reverse cumulative sums of
+    # the bin contents (see rocEngine.py)
+    tpr, fpr = rocEngine.calculateROC(bkg_hist, sig_hist, axis)
 
     # convert to array
     tpr = array('d', tpr)
@@ -109,125 +46,7 @@ def calculateROC(bkg_hist, sig_hist, axis):
 # or_threshold) ROC. Returns TPR and FPR as arrays
 def calculateROCOR(bkg_hist, sig_hist, or_threshold, or_axis):
 
-    # get total integral of background histogram
-    integral_bkg = float(
-        bkg_hist.Integral(
-            0, bkg_hist.GetNbinsX()+1,
-            0, bkg_hist.GetNbinsY()+1,
-            0, bkg_hist.GetNbinsZ()+1
-        )
-    )
-
-    # get total integral of signal histogram
-    integral_sig = float(
-        sig_hist.Integral(
-            0, sig_hist.GetNbinsX()+1,
-            0, sig_hist.GetNbinsY()+1,
-            0, sig_hist.GetNbinsZ()+1
-        )
-    )
-
-    if or_axis not in [1,2]:
-        raise ValueError("or_axis must be 1 or 2")
-
-    # compute bin associated with or_threshold
-    if or_axis == 1:
-        or_threshold_bin = sig_hist.GetYaxis().FindBin(or_threshold)
-    else:
-        or_threshold_bin = sig_hist.GetZaxis().FindBin(or_threshold)
-
-    # get list of thresholds
-    edges = [sig_hist.GetXaxis().GetBinLowEdge(i) for i in range(1, sig_hist.GetNbinsX() + 2)]
-
-    tpr = []
-    fpr = []
-    for threshold in edges:
-        threshold_bin = sig_hist.GetXaxis().FindBin(threshold)
-
-        # Integrate over bins where x > threshold, including
-        # overflow bins
-        integral_sig_partial_x = sig_hist.Integral(
-            threshold_bin, sig_hist.GetNbinsX() + 1,
-            0, sig_hist.GetNbinsY() + 1,
-            0, sig_hist.GetNbinsZ() + 1
-        )
-        integral_bkg_partial_x = bkg_hist.Integral(
-            threshold_bin, bkg_hist.GetNbinsX() + 1,
-            0, bkg_hist.GetNbinsY() + 1,
-            0, bkg_hist.GetNbinsZ() + 1
-        )
-
-        if or_axis == 1:
-            # Integrate over bins where y or z > or_threshold,
-            # including overflow bins
-            integral_sig_partial_yz = sig_hist.Integral(
-                0, sig_hist.GetNbinsX() + 1,
-                or_threshold_bin, sig_hist.GetNbinsY() + 1,
-                0, sig_hist.GetNbinsZ() + 1
-            )
-            integral_bkg_partial_yz = bkg_hist.Integral(
-                0, bkg_hist.GetNbinsX() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsY() + 1,
-                0, bkg_hist.GetNbinsZ() + 1
-            )
-
-            # Compute the double-counted accepted events,
-            # including overlap and overflow bins
-            overlap_sig = sig_hist.Integral(
-                threshold_bin, sig_hist.GetNbinsX() + 1,
-                or_threshold_bin, sig_hist.GetNbinsY() + 1,
-                0, sig_hist.GetNbinsZ() + 1
-            )
-            overlap_bkg = bkg_hist.Integral(
-                threshold_bin, bkg_hist.GetNbinsX() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsY() + 1,
-                0, bkg_hist.GetNbinsZ() + 1
-            )
-
-        else:
-            # Integrate over bins where y or z > or_threshold,
-            # including overflow bins
-            integral_sig_partial_yz = sig_hist.Integral(
-                0, sig_hist.GetNbinsX() + 1,
-                0, sig_hist.GetNbinsY() + 1,
-                or_threshold_bin, sig_hist.GetNbinsZ() + 1
-            )
-            integral_bkg_partial_yz = bkg_hist.Integral(
-                0, bkg_hist.GetNbinsX() + 1,
-                0, bkg_hist.GetNbinsY() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsZ() + 1
-            )
-
-            # Compute the double-counted accepted events,
-            # including overlap and overflow bins
-            overlap_sig = sig_hist.Integral(
-                threshold_bin, sig_hist.GetNbinsX() + 1,
-                0, sig_hist.GetNbinsY() + 1,
-                or_threshold_bin, sig_hist.GetNbinsZ() + 1
-            )
-            overlap_bkg = bkg_hist.Integral(
-                threshold_bin, bkg_hist.GetNbinsX() + 1,
-                0, bkg_hist.GetNbinsY() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsZ() + 1
-            )
-
-
-        # compute total number of accepted events and subtract
-        # out overlap
-        accepted_sig = (integral_sig_partial_x + integral_sig_partial_yz
-                        - overlap_sig)
-        accepted_bkg = (integral_bkg_partial_x + integral_bkg_partial_yz
-                        - overlap_bkg)
-
-        # divide by total number of events to get rates
-        tpr_current = accepted_sig / integral_sig
-        fpr_current = accepted_bkg / integral_bkg
-
-        tpr.append(tpr_current)
-        fpr.append(fpr_current)
-
-        if (tpr_current==0) and (fpr_current==0):
-            break
+    tpr, fpr = rocEngine.calculateROCOR(bkg_hist, sig_hist, or_threshold, or_axis)
 
     # convert to arrays
     tpr = array('d', tpr)
@@ -241,45 +60,7 @@ def calculateROCOR(bkg_hist, sig_hist, or_threshold, or_axis):
 # than HT and CICADA)
 def calculateROCPt(bkg_hist, sig_hist):
 
-    # get total integral of background histogram
-    integral_bkg = float(
-        bkg_hist.Integral(0, bkg_hist.GetNbinsX()+1)
-    )
-
-    # get total integral of signal histogram
-    integral_sig = float(
-        sig_hist.Integral(0, sig_hist.GetNbinsX()+1)
-    )
-
-
-    # get list of thresholds
-    edges = [sig_hist.GetXaxis().GetBinLowEdge(i) for i in range(1, sig_hist.GetNbinsX() + 2)]
-
-    tpr = []
-    fpr = []
-    # compute FPR and TPR for each threshold value
-    for threshold in edges:
-
-        # find bin that corresponds to current threshold
-        threshold_bin = sig_hist.GetXaxis().FindBin(threshold)
-
-        # compute partial integrals for accepted events
-        integral_sig_partial = sig_hist.Integral(
-            threshold_bin, sig_hist.GetNbinsX() + 1
-        )
-        integral_bkg_partial = bkg_hist.Integral(
-            threshold_bin, bkg_hist.GetNbinsX() + 1,
-        )
-
-        # divide accepted events by total events
-        tpr_current = integral_sig_partial / integral_sig
-        fpr_current = integral_bkg_partial / integral_bkg
-
-        tpr.append(tpr_current)
-        fpr.append(fpr_current)
-
-        if (tpr_current==0) and (fpr_current==0):
-            break
+    tpr, fpr = rocEngine.calculateROCPt(bkg_hist, sig_hist)
 
     # convert to array
     tpr = array('d', tpr)
@@ -287,138 +68,6 @@ def calculateROCPt(bkg_hist, sig_hist):
 
     return tpr, fpr
 
-########################################################################
-# Uses two 3d histograms (bkg_hist for background, sig_hist for signal)
-# to compute the CICADA (or other variable associated with or_axis >
-# or_threshold) ROC. Returns TPR and FPR as arrays
-def calculateROCOR(bkg_hist, sig_hist, or_threshold, or_axis):
-
-    # get total integral of background histogram
-    integral_bkg = float(
-        bkg_hist.Integral(
-            0, bkg_hist.GetNbinsX()+1,
-            0, bkg_hist.GetNbinsY()+1,
-            0, bkg_hist.GetNbinsZ()+1
-        )
-    )
-
-    # get total integral of signal histogram
-    integral_sig = float(
-        sig_hist.Integral(
-            0, sig_hist.GetNbinsX()+1,
-            0, sig_hist.GetNbinsY()+1,
-            0, sig_hist.GetNbinsZ()+1
-        )
-    )
-
-    if or_axis not in [1,2]:
-        raise ValueError("or_axis must be 1 or 2")
-
-    # compute bin associated with or_threshold
-    if or_axis == 1:
-        or_threshold_bin = sig_hist.GetYaxis().FindBin(or_threshold)
-    else:
-        or_threshold_bin = sig_hist.GetZaxis().FindBin(or_threshold)
-
-    # get list of thresholds
-    edges = [sig_hist.GetXaxis().GetBinLowEdge(i) for i in range(1, sig_hist.GetNbinsX() + 2)]
-
-    tpr = []
-    fpr = []
-    for threshold in edges:
-        threshold_bin = sig_hist.GetXaxis().FindBin(threshold)
-
-        # Integrate over bins where x > threshold, including
-        # overflow bins
-        integral_sig_partial_x = sig_hist.Integral(
-            threshold_bin, sig_hist.GetNbinsX() + 1,
-            0, sig_hist.GetNbinsY() + 1,
-            0, sig_hist.GetNbinsZ() + 1
-        )
-        integral_bkg_partial_x = bkg_hist.Integral(
-            threshold_bin, bkg_hist.GetNbinsX() + 1,
-            0, bkg_hist.GetNbinsY() + 1,
-            0, bkg_hist.GetNbinsZ() + 1
-        )
-
-        if or_axis == 1:
-            # Integrate over bins where y or z > or_threshold,
-            # including overflow bins
-            integral_sig_partial_yz = sig_hist.Integral(
-                0, sig_hist.GetNbinsX() + 1,
-                or_threshold_bin, sig_hist.GetNbinsY() + 1,
-                0, sig_hist.GetNbinsZ() + 1
-            )
-            integral_bkg_partial_yz = bkg_hist.Integral(
-                0, bkg_hist.GetNbinsX() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsY() + 1,
-                0, bkg_hist.GetNbinsZ() + 1
-            )
-
-            # Compute the double-counted accepted events,
-            # including overlap and overflow bins
-            overlap_sig = sig_hist.Integral(
-                threshold_bin, sig_hist.GetNbinsX() + 1,
-                or_threshold_bin, sig_hist.GetNbinsY() + 1,
-                0, sig_hist.GetNbinsZ() + 1
-            )
-            overlap_bkg = bkg_hist.Integral(
-                threshold_bin, bkg_hist.GetNbinsX() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsY() + 1,
-                0, bkg_hist.GetNbinsZ() + 1
-            )
-
-        else:
-            # Integrate over bins where y or z > or_threshold,
-            # including overflow bins
-            integral_sig_partial_yz = sig_hist.Integral(
-                0, sig_hist.GetNbinsX() + 1,
-                0, sig_hist.GetNbinsY() + 1,
-                or_threshold_bin, sig_hist.GetNbinsZ() + 1
-            )
-            integral_bkg_partial_yz = bkg_hist.Integral(
-                0, bkg_hist.GetNbinsX() + 1,
-                0, bkg_hist.GetNbinsY() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsZ() + 1
-            )
-
-            # Compute the double-counted accepted events,
-            # including overlap and overflow bins
-            overlap_sig = sig_hist.Integral(
-                threshold_bin, sig_hist.GetNbinsX() + 1,
-                0, sig_hist.GetNbinsY() + 1,
-                or_threshold_bin, sig_hist.GetNbinsZ() + 1
-            )
-            overlap_bkg = bkg_hist.Integral(
-                threshold_bin, bkg_hist.GetNbinsX() + 1,
-                0, bkg_hist.GetNbinsY() + 1,
-                or_threshold_bin, bkg_hist.GetNbinsZ() + 1
-            )
-
-
-        # compute total number of accepted events and subtract
-        # out overlap
-        accepted_sig = (integral_sig_partial_x + integral_sig_partial_yz
-                        - overlap_sig)
-        accepted_bkg = (integral_bkg_partial_x + integral_bkg_partial_yz
-                        - overlap_bkg)
-
-        # divide by total number of events to get rates
-        tpr_current = accepted_sig / integral_sig
-        fpr_current = accepted_bkg / integral_bkg
-
-        tpr.append(tpr_current)
-        fpr.append(fpr_current)
-
-        if (tpr_current==0) and (fpr_current==0):
-            break
-
-    # convert to arrays
-    tpr = array('d', tpr)
-    fpr = array('d', fpr)
-
-    return tpr, fpr
-
 ########################################################################
 # Uses tpr and fpr arrays to create a ROOT TGraph, plotting fpr on the
 # x-axis and tpr along the y-axis. color refers to the marker and line
@@ -499,20 +148,11 @@ def getAcceptRatioHist(hist, axis, hist_name = "ratio_accepted"):
     if axis not in [0,1]:
         raise ValueError("axis must be 0 or 1")
 
-    # get total integral of histogram
-    integral = float(
-        hist.Integral(
-            0, hist.GetNbinsX()+1,
-            0, hist.GetNbinsY()+1,
-            0, hist.GetNbinsZ()+1
-        )
-    )
+    # get number of accepted events for every threshold at once
+    integrals_partial, integral = rocEngine.acceptedEvents(hist, axis)
 
-    # get list of thresholds
+    # create efficiency hist
     if axis==0:
-        thresholds = [hist.GetXaxis().GetBinLowEdge(i) for i in range(1, hist.GetNbinsX() + 2)]
-
-        # create efficiency hist
         hist_out = ROOT.TH1D(
             hist_name,
             "(Number Accepted) / (Total Number)",
@@ -520,11 +160,7 @@ def getAcceptRatioHist(hist, axis, hist_name = "ratio_accepted"):
             hist.GetXaxis().GetXmin(),
             hist.GetXaxis().GetXmax()
         )
-
     else:
-        thresholds = [hist.GetYaxis().GetBinLowEdge(i) for i in range(1, hist.GetNbinsY() + 2)]
-
-        # create efficiency hist
         hist_out = ROOT.TH1D(
             hist_name,
             "(Number Accepted) / (Total Number)",
@@ -534,26 +170,9 @@ def getAcceptRatioHist(hist, axis, hist_name = "ratio_accepted"):
         )
 
     # compute rate for each threshold value
-    for j in range(len(thresholds)):
-
-        if axis==0:
-            # find bin that corresponds to current threshold
-            threshold_bin = hist.GetXaxis().FindBin(thresholds[j])
-
-            # Integrate over bins where x > threshold
-            integral_partial = hist.Integral(
-                threshold_bin, hist.GetNbinsX() + 1,
-                0, hist.GetNbinsY() + 1,
-                0, hist.GetNbinsZ() + 1
-            )
-        else:
-            threshold_bin = hist.GetYaxis().FindBin(thresholds[j])
+    for j in range(len(integrals_partial)):
 
-            integral_partial = hist.Integral(
-                0, hist.GetNbinsX() + 1,
-                threshold_bin, hist.GetNbinsY() + 1,
-                0, hist.GetNbinsZ() + 1
-            )
+        integral_partial = float(integrals_partial[j])
 
         # calculate uncertainty
         uncertainty = np.sqrt(integral_partial)/integral
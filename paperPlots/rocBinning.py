@@ -0,0 +1,19 @@
+########################################################################
+## rocBinning.py                                                      ##
+## binning of the score, HT, trigger and jet pT histograms written by ##
+## createHistsForROC.py                                               ##
+########################################################################
+
+# minimum and maximum scores for histogram
+min_score_cicada = 0.0
+max_score_cicada = 1024.0
+n_bins_cicada = 400
+min_score_ht = 0.0
+max_score_ht = 2000.0
+n_bins_ht = 300
+min_score_trig = -0.5
+max_score_trig = 1.5
+n_bins_trig = 2
+min_score_pt = 0.0
+max_score_pt = 1000.0
+n_bins_pt = 300
@@ -0,0 +1,268 @@
+########################################################################
+## rocEngine.py                                                       ##
+## computes ROC curves from the bin contents of the score histograms  ##
+## using reverse cumulative sums instead of one Integral per threshold##
+########################################################################
+
+import numpy as np
+
+# numpy type of the bin contents for each ROOT histogram type suffix
+content_types = {
+    "D": np.float64,
+    "F": np.float32,
+    "L": np.int64,
+    "I": np.int32,
+    "S": np.int16,
+    "C": np.int8,
+}
+
+########################################################################
+# Returns the bin contents of the ROOT histogram hist (1, 2 or 3d),
+# including underflow and overflow bins, as a float64 numpy array
+# indexed [x, y, z] with ROOT bin numbers (0 is underflow)
+def histToArray(hist):
+
+    content_type = content_types[hist.ClassName()[-1]]
+    contents = np.frombuffer(hist.GetArray(), dtype=content_type, count=hist.GetNcells())
+    contents = contents.astype(np.float64)
+
+    n_x = hist.GetNbinsX() + 2
+    n_y = hist.GetNbinsY() + 2
+    n_z = hist.GetNbinsZ() + 2
+
+    # ROOT stores bin (x, y, z) at x + n_x * (y + n_y * z)
+    if hist.GetDimension() == 1:
+        return contents
+    elif hist.GetDimension() == 2:
+        return contents.reshape(n_y, n_x).T
+    else:
+        return contents.reshape(n_z, n_y, n_x).transpose(2, 1, 0)
+
+########################################################################
+# Returns the bins that the ROC functions use as thresholds along the
+# ROOT axis: the bins containing the low edge of every bin plus the
+# upper edge of the last bin (the overflow bin). FindBin is used rather
+# than assuming bin i, so that floating point rounding of the edges is
+# treated exactly as in a per-threshold Integral over the histogram
+def thresholdBins(axis):
+    return np.array(
+        [axis.FindBin(axis.GetBinLowEdge(i)) for i in range(1, axis.GetNbins() + 2)],
+        dtype=np.int64
+    )
+
+# returns the lower edges used as thresholds along the ROOT axis
+def thresholdEdges(axis):
+    return np.array([axis.GetBinLowEdge(i) for i in range(1, axis.GetNbins() + 2)])
+
+# for each bin b along axis, sum of counts in bins >= b (including the
+# overflow bin)
+def reverseCumsum(counts, axis=0):
+    return np.flip(np.cumsum(np.flip(counts, axis=axis), axis=axis), axis=axis)
+
+# sums counts over every axis except axis
+def projectAxis(counts, axis):
+    other_axes = tuple(i for i in range(counts.ndim) if i != axis)
+    if len(other_axes) == 0:
+        return counts
+    return counts.sum(axis=other_axes)
+
+# number of events with the variable along axis in a bin >= each of the
+# threshold bins in bins
+def acceptedAbove(counts, axis, bins):
+    return reverseCumsum(projectAxis(counts, axis))[bins]
+
+########################################################################
+# number of events of the 3d counts array with x in a bin >= each of the
+# threshold bins in bins OR with the variable along or_axis (1 or 2) in
+# a bin >= or_bin, computed as accepted(x) + accepted(or) - overlap
+def acceptedOR(counts, bins, or_axis, or_bin):
+
+    # project onto (x, or_axis) by summing over the remaining axis
+    projection = counts.sum(axis=3 - or_axis)
+    passing_or = projection[:, or_bin:].sum(axis=1)
+
+    accepted_x = reverseCumsum(projectAxis(counts, 0))[bins]
+    accepted_or = passing_or.sum()
+    overlap = reverseCumsum(passing_or)[bins]
+
+    return accepted_x + accepted_or - overlap
+
+########################################################################
+# Converts accepted signal and background counts into TPR and FPR.
+# Like the original per-threshold loop, the curve stops at the first
+# threshold where both TPR and FPR are zero
+def rocFromAccepted(accepted_sig, total_sig, accepted_bkg, total_bkg):
+
+    tpr = accepted_sig / total_sig
+    fpr = accepted_bkg / total_bkg
+
+    both_zero = np.nonzero((tpr == 0) & (fpr == 0))[0]
+    if len(both_zero) > 0:
+        tpr = tpr[:both_zero[0] + 1]
+        fpr = fpr[:both_zero[0] + 1]
+
+    return tpr, fpr
+
+########################################################################
+# ROC along axis (0 for CICADA score, 1 for HT) of the 3d histograms
+# bkg_hist and sig_hist. Thresholds are taken from the signal histogram,
+# as in plottingUtils.calculateROC. Bin contents of unweighted
+# histograms are integers, so the sums are exact and the results are
+# bit-identical to summing with Integral
+def calculateROC(bkg_hist, sig_hist, axis):
+
+    if axis not in [0,1]:
+        raise ValueError("axis must be 0 or 1")
+
+    counts_bkg = histToArray(bkg_hist)
+    counts_sig = histToArray(sig_hist)
+
+    if axis == 0:
+        bins = thresholdBins(sig_hist.GetXaxis())
+    else:
+        bins = thresholdBins(sig_hist.GetYaxis())
+
+    return rocFromAccepted(
+        acceptedAbove(counts_sig, axis, bins), float(counts_sig.sum()),
+        acceptedAbove(counts_bkg, axis, bins), float(counts_bkg.sum())
+    )
+
+########################################################################
+# ROC for (CICADA score > threshold) OR (variable along or_axis >
+# or_threshold), where or_axis is 1 for HT and 2 for the L1 unprescaled
+# OR
+def calculateROCOR(bkg_hist, sig_hist, or_threshold, or_axis):
+
+    if or_axis not in [1,2]:
+        raise ValueError("or_axis must be 1 or 2")
+
+    counts_bkg = histToArray(bkg_hist)
+    counts_sig = histToArray(sig_hist)
+
+    # compute bin associated with or_threshold
+    if or_axis == 1:
+        or_bin = sig_hist.GetYaxis().FindBin(or_threshold)
+    else:
+        or_bin = sig_hist.GetZaxis().FindBin(or_threshold)
+
+    bins = thresholdBins(sig_hist.GetXaxis())
+
+    return rocFromAccepted(
+        acceptedOR(counts_sig, bins, or_axis, or_bin), float(counts_sig.sum()),
+        acceptedOR(counts_bkg, bins, or_axis, or_bin), float(counts_bkg.sum())
+    )
+
+########################################################################
+# ROC for the 1d jet pT histograms bkg_hist and sig_hist
+def calculateROCPt(bkg_hist, sig_hist):
+
+    counts_bkg = histToArray(bkg_hist)
+    counts_sig = histToArray(sig_hist)
+
+    bins = thresholdBins(sig_hist.GetXaxis())
+
+    return rocFromAccepted(
+        acceptedAbove(counts_sig, 0, bins), float(counts_sig.sum()),
+        acceptedAbove(counts_bkg, 0, bins), float(counts_bkg.sum())
+    )
+
+########################################################################
+# For the 3d histogram hist, returns the number of accepted events for
+# each threshold along axis (0 for CICADA score, 1 for HT) and the total
+# number of events
+def acceptedEvents(hist, axis):
+
+    if axis not in [0,1]:
+        raise ValueError("axis must be 0 or 1")
+
+    counts = histToArray(hist)
+
+    if axis == 0:
+        bins = thresholdBins(hist.GetXaxis())
+    else:
+        bins = thresholdBins(hist.GetYaxis())
+
+    return acceptedAbove(counts, axis, bins), float(counts.sum())
+
+########################################################################
+# Linearly interpolates the values (e.g. thresholds or TPR) of the
+# points of a ROC curve with false positive rates fpr at each of the
+# false positive rates target_fpr. The FPR falls as the threshold rises,
+# so the curve is reversed for np.interp. Targets outside the range of
+# the curve give nan rather than the value at its end
+def valuesAtFPR(fpr, values, target_fpr):
+
+    fpr = np.asarray(fpr, dtype=np.float64)[::-1]
+    values = np.asarray(values, dtype=np.float64)[::-1]
+    target_fpr = np.asarray(target_fpr, dtype=np.float64)
+
+    result = np.interp(target_fpr, fpr, values)
+    result[(target_fpr < fpr[0]) | (target_fpr > fpr[-1])] = np.nan
+    return result
+
+########################################################################
+# Number of events of the 3d counts array with x in a bin >= x_bins[i]
+# OR y in a bin >= y_bins[j], for every pair (i, j) at once. A 2d reverse
+# cumulative sum over (x, y) gives the events passing both thresholds,
+# and accepted(x) + accepted(y) - both gives those passing either
+def acceptedORGrid(counts, x_bins, y_bins):
+
+    projection = counts.sum(axis=2)
+    both = reverseCumsum(reverseCumsum(projection, axis=0), axis=1)
+
+    # column 0 and row 0 include the underflow, so they hold the events
+    # passing the x or the y threshold alone
+    accepted_x = both[x_bins, 0]
+    accepted_y = both[0, y_bins]
+
+    return accepted_x[:, np.newaxis] + accepted_y[np.newaxis, :] - both[np.ix_(x_bins, y_bins)]
+
+########################################################################
+# Indices of the points (fpr, tpr) on the Pareto front: those for which
+# no other point has a lower or equal FPR and a higher TPR. Returned in
+# order of increasing FPR
+def paretoFront(fpr, tpr):
+
+    fpr = np.ravel(fpr)
+    tpr = np.ravel(tpr)
+
+    # by increasing FPR, and by decreasing TPR among equal FPRs, a point
+    # is on the front if its TPR beats every point before it
+    order = np.lexsort((-tpr, fpr))
+    best_before = np.concatenate([[-np.inf], np.maximum.accumulate(tpr[order])[:-1]])
+    return order[tpr[order] > best_before]
+
+########################################################################
+# Scans every pair of CICADA score (x) and HT (y) thresholds of the 3d
+# histograms bkg_hist and sig_hist for (CICADA > x threshold) OR (HT >
+# y threshold). Thresholds are taken from the signal histogram as in
+# calculateROC. Returns a dictionary with the threshold edges, the TPR
+# and FPR grids indexed [CICADA threshold, HT threshold], and the points
+# of the Pareto front of the grid (front_fpr, front_tpr and the
+# thresholds front_cicada and front_ht)
+def scanORThresholds(bkg_hist, sig_hist):
+
+    counts_bkg = histToArray(bkg_hist)
+    counts_sig = histToArray(sig_hist)
+
+    x_bins = thresholdBins(sig_hist.GetXaxis())
+    y_bins = thresholdBins(sig_hist.GetYaxis())
+    cicada_thresholds = thresholdEdges(sig_hist.GetXaxis())
+    ht_thresholds = thresholdEdges(sig_hist.GetYaxis())
+
+    tpr = acceptedORGrid(counts_sig, x_bins, y_bins) / float(counts_sig.sum())
+    fpr = acceptedORGrid(counts_bkg, x_bins, y_bins) / float(counts_bkg.sum())
+
+    front = paretoFront(fpr, tpr)
+    front_x, front_y = np.unravel_index(front, tpr.shape)
+
+    return {
+        "cicada_thresholds": cicada_thresholds,
+        "ht_thresholds": ht_thresholds,
+        "tpr": tpr,
+        "fpr": fpr,
+        "front_fpr": fpr[front_x, front_y],
+        "front_tpr": tpr[front_x, front_y],
+        "front_cicada": cicada_thresholds[front_x],
+        "front_ht": ht_thresholds[front_y],
+    }
@@ -0,0 +1,144 @@
+########################################################################
+## rocStore.py                                                        ##
+## on-disk cache of the ROC curves drawn by drawROC.py, one npz file  ##
+## per (ROC type, background, CICADA version, signal), recomputed     ##
+## only when the input histograms or thresholds change                ##
+########################################################################
+
+import hashlib
+import os
+from array import array
+from collections import OrderedDict
+import numpy as np
+import rocEngine
+
+# default directory of the cache
+storeDir = "rocCurves"
+
+########################################################################
+# Hash of the bin contents and binning of the ROOT histogram hist
+def histHash(hist):
+    digest = hashlib.sha256(hist.ClassName().encode())
+    for axis in [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()]:
+        digest.update(f"{axis.GetNbins()}:{axis.GetXmin()}:{axis.GetXmax()}\n".encode())
+    content_type = rocEngine.content_types[hist.ClassName()[-1]]
+    digest.update(np.frombuffer(hist.GetArray(), dtype=content_type, count=hist.GetNcells()).tobytes())
+    return digest.hexdigest()
+
+# binomial uncertainty of the efficiencies eff of total events
+def efficiencyErrors(eff, total):
+    return np.sqrt(eff * (1 - eff) / total)
+
+########################################################################
+# ROC curves of histogram pairs, read from the npz files in store_dir.
+# Each file holds the TPR and FPR, the threshold of each point, their
+# binomial uncertainties and the hash of the inputs the curve was
+# computed from. A curve is computed with rocEngine and written again
+# when that hash does not match the current inputs. The hashes of the
+# last max_hashes histograms are kept, as the histograms are not changed
+# once read
+class rocStore:
+    def __init__(self, store_dir=storeDir, max_hashes=64):
+        self.store_dir = store_dir
+        self.max_hashes = max_hashes
+        self.hashes = OrderedDict()
+        self.n_read = 0
+        self.n_computed = 0
+
+    # histHash of hist, computed once per histogram object. The histogram
+    # is kept with its hash, so that its id is not reused while cached
+    def histHash(self, hist):
+        key = id(hist)
+        if key in self.hashes:
+            self.hashes.move_to_end(key)
+            return self.hashes[key][1]
+
+        digest = histHash(hist)
+        self.hashes[key] = (hist, digest)
+        if len(self.hashes) > self.max_hashes:
+            self.hashes.popitem(last=False)
+        return digest
+
+    # path of the curve roc_type of the signal sample sig_name against
+    # the background bkg_name for the CICADA version model
+    def path(self, roc_type, bkg_name, model, sig_name):
+        return os.path.join(self.store_dir, f"{roc_type}_{bkg_name}_{model}_{sig_name}.npz")
+
+    ####################################################################
+    # Returns the curve roc_type for label = (bkg_name, model, sig_name)
+    # as a dictionary of arrays. parameters are the thresholds besides
+    # the histograms the curve depends on, compute(bkg_hist, sig_hist)
+    # computes (tpr, fpr) and threshold_axis(sig_hist) is the ROOT axis
+    # the thresholds are taken from
+    def curve(self, roc_type, label, bkg_hist, sig_hist, parameters, compute, threshold_axis):
+
+        input_hash = hashlib.sha256(
+            f"{roc_type}:{parameters}:{self.histHash(bkg_hist)}:{self.histHash(sig_hist)}".encode()
+        ).hexdigest()
+
+        path = self.path(roc_type, *label)
+        if os.path.exists(path):
+            with np.load(path) as stored:
+                if str(stored["input_hash"]) == input_hash:
+                    self.n_read += 1
+                    return {name: stored[name] for name in stored.files if name != "input_hash"}
+
+        tpr, fpr = compute(bkg_hist, sig_hist)
+        total_sig = float(rocEngine.histToArray(sig_hist).sum())
+        total_bkg = float(rocEngine.histToArray(bkg_hist).sum())
+        result = {
+            "tpr": tpr,
+            "fpr": fpr,
+            "thresholds": rocEngine.thresholdEdges(threshold_axis(sig_hist))[:len(tpr)],
+            "tpr_err": efficiencyErrors(tpr, total_sig),
+            "fpr_err": efficiencyErrors(fpr, total_bkg),
+        }
+
+        # written to a temporary file first, so that worker processes
+        # never read a partly written curve
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, input_hash=input_hash, **result)
+        os.replace(tmp_path, path)
+
+        self.n_computed += 1
+        return result
+
+    ####################################################################
+    # curves of the ROC types drawn by drawROC, as dictionaries of arrays
+    def scoreCurve(self, label, bkg_hist, sig_hist, axis):
+        return self.curve(
+            "CICADA" if axis == 0 else "HT", label, bkg_hist, sig_hist, axis,
+            lambda bkg, sig: rocEngine.calculateROC(bkg, sig, axis),
+            lambda sig: sig.GetXaxis() if axis == 0 else sig.GetYaxis()
+        )
+
+    def orCurve(self, label, bkg_hist, sig_hist, or_threshold, or_axis):
+        return self.curve(
+            "CICADA_OR_HT" if or_axis == 1 else "CICADA_OR_L1", label, bkg_hist, sig_hist, (or_threshold, or_axis),
+            lambda bkg, sig: rocEngine.calculateROCOR(bkg, sig, or_threshold, or_axis),
+            lambda sig: sig.GetXaxis()
+        )
+
+    def ptCurve(self, label, bkg_hist, sig_hist):
+        return self.curve(
+            "jetPt", label, bkg_hist, sig_hist, None,
+            rocEngine.calculateROCPt,
+            lambda sig: sig.GetXaxis()
+        )
+
+    ####################################################################
+    # cached versions of the ROC functions of plottingUtils, returning
+    # TPR and FPR as arrays in the same way
+    def calculateROC(self, label, bkg_hist, sig_hist, axis):
+        result = self.scoreCurve(label, bkg_hist, sig_hist, axis)
+        return array('d', result["tpr"]), array('d', result["fpr"])
+
+    def calculateROCOR(self, label, bkg_hist, sig_hist, or_threshold, or_axis):
+        result = self.orCurve(label, bkg_hist, sig_hist, or_threshold, or_axis)
+        return array('d', result["tpr"]), array('d', result["fpr"])
+
+    def calculateROCPt(self, label, bkg_hist, sig_hist):
+        result = self.ptCurve(label, bkg_hist, sig_hist)
+        return array('d', result["tpr"]), array('d', result["fpr"])
@@ -0,0 +1,200 @@
+########################################################################
+## test_rocEngine.py                                                  ##
+## checks the cumulative-sum ROC engine against the per-threshold     ##
+## Integral calls it replaced, on small synthetic histograms, and     ##
+## against rocGolden_baseline.npz written by the original             ##
+## plottingUtils functions                                            ##
+########################################################################
+
+import os
+import numpy as np
+import pytest
+import rocEngine
+
+# golden TPR/FPR arrays of the original plottingUtils.calculateROC,
+# calculateROCOR and calculateROCPt on the histograms of syntheticHists
+goldenPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rocGolden_baseline.npz")
+
+########################################################################
+# Uniform axis with the TAxis methods used by rocEngine and plottingUtils
+class arrayAxis:
+    def __init__(self, n_bins, minimum, maximum):
+        self.n_bins = n_bins
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def GetNbins(self):
+        return self.n_bins
+
+    def GetBinLowEdge(self, i):
+        return self.minimum + (i - 1) * (self.maximum - self.minimum) / self.n_bins
+
+    def FindBin(self, x):
+        if x < self.minimum:
+            return 0
+        if not x < self.maximum:
+            return self.n_bins + 1
+        return 1 + int(self.n_bins * (x - self.minimum) / (self.maximum - self.minimum))
+
+########################################################################
+# Histogram with the TH1D/TH3D methods used by rocEngine and
+# plottingUtils, holding counts (including under- and overflow) indexed
+# [x, y, z] with ROOT bin numbers. Counts are whole numbers, so Integral
+# is exact whatever order the bins are summed in
+class arrayHist:
+    def __init__(self, counts, axes):
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.axes = axes
+
+    def ClassName(self):
+        return "TH1D" if self.counts.ndim == 1 else "TH3D"
+
+    def GetDimension(self):
+        return self.counts.ndim
+
+    def GetArray(self):
+        # ROOT stores bin (x, y, z) at x + n_x * (y + n_y * z)
+        return np.ascontiguousarray(self.counts.T).ravel()
+
+    def GetNcells(self):
+        return self.counts.size
+
+    def GetXaxis(self):
+        return self.axes[0]
+
+    def GetYaxis(self):
+        return self.axes[1]
+
+    def GetZaxis(self):
+        return self.axes[2]
+
+    def GetNbinsX(self):
+        return self.axes[0].GetNbins()
+
+    def GetNbinsY(self):
+        return self.axes[1].GetNbins() if len(self.axes) > 1 else 1
+
+    def GetNbinsZ(self):
+        return self.axes[2].GetNbins() if len(self.axes) > 2 else 1
+
+    def Integral(self, *bins):
+        window = tuple(slice(bins[2*i], bins[2*i + 1] + 1) for i in range(len(bins) // 2))
+        return float(self.counts[window].sum())
+
+########################################################################
+# Background and signal histograms with a coarse version of the
+# createHistsForROC binning (bin widths that are not exact in binary, so
+# FindBin of a low edge can fall in the bin below). Counts fall with
+# score and HT, faster for background, leaving the highest bins empty
+def syntheticHists(seed=2024):
+
+    rng = np.random.default_rng(seed)
+    axes = [arrayAxis(40, 0.0, 1024.0), arrayAxis(30, 0.0, 2000.0), arrayAxis(2, -0.5, 1.5)]
+    x = np.arange(42)[:, np.newaxis]
+    y = np.arange(32)[np.newaxis, :]
+
+    def hist3D(n_events, slope, trigger_fraction):
+        shape = np.exp(-slope * (x / 40 + y / 30))
+        z = np.array([0.0, 1.0 - trigger_fraction, trigger_fraction, 0.0])
+        means = n_events * shape[:, :, np.newaxis] / shape.sum() * z[np.newaxis, np.newaxis, :]
+        return arrayHist(rng.poisson(means), axes)
+
+    def hist1D(n_events, slope):
+        shape = np.exp(-slope * np.arange(32) / 30)
+        return arrayHist(rng.poisson(n_events * shape / shape.sum()), [arrayAxis(30, 0.0, 1000.0)])
+
+    return {
+        "bkg": hist3D(200000, 12.0, 0.01),
+        "sig": hist3D(20000, 4.0, 0.5),
+        "bkg_pt": hist1D(200000, 12.0),
+        "sig_pt": hist1D(20000, 4.0),
+    }
+
+@pytest.fixture(scope="module")
+def hists():
+    return syntheticHists()
+
+########################################################################
+# Reference: one Integral per threshold, as plottingUtils computed the
+# curves before rocEngine
+def integralAbove(hist, x_bin=0, y_bin=0, z_bin=0):
+    return hist.Integral(x_bin, hist.GetNbinsX()+1, y_bin, hist.GetNbinsY()+1, z_bin, hist.GetNbinsZ()+1)
+
+def thresholdBinsOf(axis):
+    return [axis.FindBin(axis.GetBinLowEdge(i)) for i in range(1, axis.GetNbins() + 2)]
+
+def truncated(tpr, fpr):
+    for i in range(len(tpr)):
+        if tpr[i] == 0 and fpr[i] == 0:
+            return np.array(tpr[:i+1]), np.array(fpr[:i+1])
+    return np.array(tpr), np.array(fpr)
+
+def referenceROC(bkg, sig, axis):
+    total_bkg = integralAbove(bkg)
+    total_sig = integralAbove(sig)
+    name = "x_bin" if axis == 0 else "y_bin"
+    bins = thresholdBinsOf(sig.GetXaxis() if axis == 0 else sig.GetYaxis())
+    return truncated(
+        [integralAbove(sig, **{name: b}) / total_sig for b in bins],
+        [integralAbove(bkg, **{name: b}) / total_bkg for b in bins]
+    )
+
+def referenceORAccepted(hist, x_bin, or_bins):
+    return integralAbove(hist, x_bin=x_bin) + integralAbove(hist, **or_bins) - integralAbove(hist, x_bin=x_bin, **or_bins)
+
+def referenceROCOR(bkg, sig, or_threshold, or_axis):
+    total_bkg = integralAbove(bkg)
+    total_sig = integralAbove(sig)
+    if or_axis == 1:
+        or_bins = {"y_bin": sig.GetYaxis().FindBin(or_threshold)}
+    else:
+        or_bins = {"z_bin": sig.GetZaxis().FindBin(or_threshold)}
+    bins = thresholdBinsOf(sig.GetXaxis())
+    return truncated(
+        [referenceORAccepted(sig, b, or_bins) / total_sig for b in bins],
+        [referenceORAccepted(bkg, b, or_bins) / total_bkg for b in bins]
+    )
+
+########################################################################
+@pytest.mark.parametrize("axis", [0, 1])
+def test_calculateROC_matches_integral(hists, axis):
+    tpr, fpr = rocEngine.calculateROC(hists["bkg"], hists["sig"], axis)
+    tpr_ref, fpr_ref = referenceROC(hists["bkg"], hists["sig"], axis)
+    np.testing.assert_array_equal(tpr, tpr_ref)
+    np.testing.assert_array_equal(fpr, fpr_ref)
+
+@pytest.mark.parametrize("or_threshold, or_axis", [(200.0, 1), (0.5, 2)])
+def test_calculateROCOR_matches_integral(hists, or_threshold, or_axis):
+    tpr, fpr = rocEngine.calculateROCOR(hists["bkg"], hists["sig"], or_threshold, or_axis)
+    tpr_ref, fpr_ref = referenceROCOR(hists["bkg"], hists["sig"], or_threshold, or_axis)
+    np.testing.assert_array_equal(tpr, tpr_ref)
+    np.testing.assert_array_equal(fpr, fpr_ref)
+
+def test_scanORThresholds_matches_integral(hists):
+    bkg, sig = hists["bkg"], hists["sig"]
+    scan = rocEngine.scanORThresholds(bkg, sig)
+
+    x_bins = thresholdBinsOf(sig.GetXaxis())
+    y_bins = thresholdBinsOf(sig.GetYaxis())
+    for i, x_bin in enumerate(x_bins):
+        for j, y_bin in enumerate(y_bins):
+            or_bins = {"y_bin": y_bin}
+            assert scan["tpr"][i, j] == referenceORAccepted(sig, x_bin, or_bins) / integralAbove(sig)
+            assert scan["fpr"][i, j] == referenceORAccepted(bkg, x_bin, or_bins) / integralAbove(bkg)
+
+    # no point of the grid beats a front point in both FPR and TPR
+    for fpr, tpr in zip(scan["front_fpr"], scan["front_tpr"]):
+        assert not np.any((scan["fpr"] <= fpr) & (scan["tpr"] > tpr))
+
+def test_matches_baseline_golden(hists):
+    with np.load(goldenPath) as golden:
+        results = {
+            "calculateROC_score": rocEngine.calculateROC(hists["bkg"], hists["sig"], 0),
+            "calculateROC_HT": rocEngine.calculateROC(hists["bkg"], hists["sig"], 1),
+            "calculateROCOR_HT": rocEngine.calculateROCOR(hists["bkg"], hists["sig"], 200.0, 1),
+            "calculateROCOR_L1": rocEngine.calculateROCOR(hists["bkg"], hists["sig"], 0.5, 2),
+            "calculateROCPt": rocEngine.calculateROCPt(hists["bkg_pt"], hists["sig_pt"]),
+        }
+        for name, (tpr, fpr) in results.items():
+            np.testing.assert_array_equal(tpr, golden[f"{name}_tpr"], err_msg=name)
+            np.testing.assert_array_equal(fpr, golden[f"{name}_fpr"], err_msg=name)
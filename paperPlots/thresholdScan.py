@@ -0,0 +1,91 @@
+########################################################################
+## thresholdScan.py                                                   ##
+## scans every pair of CICADA and HT thresholds of (CICADA > t1) OR   ##
+## (HT > t2) and writes the rate/efficiency Pareto front of every     ##
+## signal sample and CICADA version                                   ##
+########################################################################
+
+import argparse
+import csv
+import time
+import ROOT
+from sampleNames import sample_name_dict
+from drawROC import options, getBkgHistNames, getHists
+from rocEngine import scanORThresholds
+from workingPoints import bkg_samples
+
+########################################################################
+# Returns the rows of the Pareto fronts of background bkg_name for
+# every CICADA version and signal sample, read from the histogram
+# repository repo. Points above max_rate (in kHz) are dropped
+def paretoFronts(repo, bkg_name, max_rate=None):
+
+    rows = []
+    for c_name in options["cicada_names"]:
+
+        bkg_hist_name, _ = getBkgHistNames(bkg_name, c_name)
+        h_bkg = repo.get(bkg_name, bkg_hist_name)
+        if h_bkg == None:
+            print(f"No histogram {bkg_hist_name} for background {bkg_name}, skipping {c_name}")
+            continue
+
+        for sample_name in sample_name_dict:
+            if sample_name in bkg_samples: continue
+
+            h_sig = repo.get(sample_name, f"anomalyScore_{sample_name}_{c_name}")
+            if h_sig == None:
+                print(f"ROOT file for sample {sample_name} does not exist")
+                continue
+
+            scan = scanORThresholds(h_bkg, h_sig)
+            rates = scan["front_fpr"] * options["rate_scale_factor"]
+
+            for i in range(len(rates)):
+                if max_rate != None and rates[i] > max_rate: continue
+                rows.append({
+                    "background": bkg_name,
+                    "model": c_name,
+                    "sample": sample_name,
+                    "rate_kHz": rates[i],
+                    "efficiency": scan["front_tpr"][i],
+                    "cicada_threshold": scan["front_cicada"][i],
+                    "ht_threshold": scan["front_ht"][i],
+                })
+
+    return rows
+
+def writeTable(rows, path):
+    columns = ["background", "model", "sample", "rate_kHz", "efficiency", "cicada_threshold", "ht_threshold"]
+    with open(path, "w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([row[column] for column in columns])
+
+def main(file_prefix, bkg_names, max_rate, out_path):
+
+    ROOT.gROOT.SetBatch(True)
+
+    start = time.perf_counter()
+    repo = getHists(file_prefix)
+
+    rows = []
+    for bkg_name in bkg_names:
+        rows += paretoFronts(repo, bkg_name, max_rate)
+    repo.close()
+
+    writeTable(rows, out_path)
+    print(f"Wrote {len(rows)} Pareto front points to {out_path} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program scans all CICADA and HT threshold pairs and writes the rate/efficiency Pareto front of every signal sample"
+    )
+    parser.add_argument("-p", "--file_prefix", help="prefix of files containing histograms")
+    parser.add_argument("-b", "--backgrounds", nargs="+", default=["ZeroBias"], choices=bkg_samples, help="backgrounds the rates refer to")
+    parser.add_argument("-m", "--max_rate", type=float, default=None, help="drop front points above this rate in kHz")
+    parser.add_argument("-o", "--out_path", default="paretoFronts.csv", help="path of the output table")
+
+    args = parser.parse_args()
+
+    main(args.file_prefix, args.backgrounds, args.max_rate, args.out_path)
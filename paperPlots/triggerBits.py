@@ -0,0 +1,82 @@
+########################################################################
+## triggerBits.py                                                     ##
+## packs the L1 trigger decisions of each event into 64 bit words so  ##
+## that the OR of any set of triggers is a masked bitwise test        ##
+########################################################################
+
+import json
+import ROOT
+
+# prefix of the names of the packed decision columns (L1Bits0, L1Bits1,
+# ...). Trigger i of the packed list is bit i % 64 of word i // 64
+bitColumnPrefix = "L1Bits"
+# name under which the packed trigger order is stored in a skim
+triggerOrderName = "L1BitsTriggers"
+
+# names of the words needed to pack n_triggers decisions
+def bitColumnNames(n_triggers):
+    return [f"{bitColumnPrefix}{i}" for i in range((n_triggers + 63) // 64)]
+
+########################################################################
+# Returns a dictionary of column name -> C++ expression packing the
+# decisions of triggers (in this order) into unsigned 64 bit words
+def bitColumnDefines(triggers):
+
+    defines = {}
+    for word, columnName in enumerate(bitColumnNames(len(triggers))):
+        terms = [
+            f"(ULong64_t({triggers[i]} != 0) << {i - 64*word})"
+            for i in range(64*word, min(64*(word + 1), len(triggers)))
+        ]
+        defines[columnName] = " | ".join(terms)
+
+    return defines
+
+########################################################################
+# Returns the C++ expression (an int, as the old OROperation) for the OR
+# of the triggers in menu, given the order packedTriggers in which the
+# decisions were packed. Only words holding a trigger of the menu are
+# read
+def maskedOR(menu, packedTriggers):
+
+    position = {trigger: i for i, trigger in enumerate(packedTriggers)}
+    missing = [trigger for trigger in menu if trigger not in position]
+    if len(missing) > 0:
+        raise ValueError(f"Triggers not in the packed decisions: {missing}")
+
+    masks = [0] * len(bitColumnNames(len(packedTriggers)))
+    for trigger in menu:
+        masks[position[trigger] // 64] |= 1 << (position[trigger] % 64)
+
+    tests = [
+        f"(({bitColumnPrefix}{word} & {hex(mask)}ULL) != 0)"
+        for word, mask in enumerate(masks)
+        if mask != 0
+    ]
+    if len(tests) == 0:
+        return "0"
+    return f"int({' || '.join(tests)})"
+
+# defines the packed words of triggers on rdf and the column columnName
+# holding the OR of all of them
+def defineTriggerOR(rdf, columnName, triggers):
+    defines = bitColumnDefines(triggers)
+    for bitColumn in defines:
+        rdf = rdf.Define(bitColumn, defines[bitColumn])
+    return rdf.Define(columnName, maskedOR(triggers, triggers))
+
+########################################################################
+# Stores the packed trigger order in the ROOT file at path (e.g. a skim)
+def writeTriggerOrder(path, packedTriggers):
+    outfile = ROOT.TFile(path, "UPDATE")
+    ROOT.TNamed(triggerOrderName, json.dumps(packedTriggers)).Write()
+    outfile.Close()
+
+# Reads back the packed trigger order stored by writeTriggerOrder, None
+# if the file holds none
+def readTriggerOrder(path):
+    infile = ROOT.TFile(path)
+    stored = infile.Get(triggerOrderName)
+    packedTriggers = json.loads(stored.GetTitle()) if stored else None
+    infile.Close()
+    return packedTriggers
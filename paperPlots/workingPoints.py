@@ -0,0 +1,114 @@
+########################################################################
+## workingPoints.py                                                   ##
+## tabulates the CICADA and HT thresholds and the signal efficiency   ##
+## at fixed background rates for every signal sample and CICADA       ##
+## version, from the ROC curves of drawROC.py                         ##
+########################################################################
+
+import argparse
+import csv
+import time
+import numpy as np
+import ROOT
+from sampleNames import sample_name_dict
+from drawROC import options, getBkgHistNames, getHists, getRocs
+from rocEngine import valuesAtFPR
+
+# samples that are backgrounds rather than signals
+bkg_samples = ["ZeroBias", "SingleNeutrino_E-10-gun"]
+
+########################################################################
+# Returns the rows of the working point table of background bkg_name
+# for the target rates (in kHz), read from the histogram repository
+# repo and the ROC store rocs. Each row holds the thresholds (nan where
+# the rate is outside the curve, None where the ROC has no such
+# threshold) and the signal efficiency with its uncertainty
+def workingPoints(repo, rocs, bkg_name, rates):
+
+    target_fpr = np.asarray(rates, dtype=np.float64) / options["rate_scale_factor"]
+
+    rows = []
+    for c_name in options["cicada_names"]:
+
+        bkg_hist_name, _ = getBkgHistNames(bkg_name, c_name)
+        h_bkg = repo.get(bkg_name, bkg_hist_name)
+        if h_bkg == None:
+            print(f"No histogram {bkg_hist_name} for background {bkg_name}, skipping {c_name}")
+            continue
+
+        for sample_name in sample_name_dict:
+            if sample_name in bkg_samples: continue
+
+            h_sig = repo.get(sample_name, f"anomalyScore_{sample_name}_{c_name}")
+            if h_sig == None:
+                print(f"ROOT file for sample {sample_name} does not exist")
+                continue
+
+            label = (bkg_name, c_name, sample_name)
+
+            # (ROC type, curve, whether the thresholds are HT thresholds,
+            # fixed HT threshold of the ROC)
+            curves = [
+                ("CICADA", rocs.scoreCurve(label, h_bkg, h_sig, 0), False, None),
+                ("HT", rocs.scoreCurve(label, h_bkg, h_sig, 1), True, None),
+                ("CICADA_OR_HT", rocs.orCurve(label, h_bkg, h_sig, options["ht_threshold"], 1), False, options["ht_threshold"]),
+                ("CICADA_OR_L1", rocs.orCurve(label, h_bkg, h_sig, options["l1_threshold"], 2), False, None),
+            ]
+
+            for roc_type, curve, ht_axis, ht_fixed in curves:
+                thresholds = valuesAtFPR(curve["fpr"], curve["thresholds"], target_fpr)
+                efficiency = valuesAtFPR(curve["fpr"], curve["tpr"], target_fpr)
+                efficiency_err = valuesAtFPR(curve["fpr"], curve["tpr_err"], target_fpr)
+
+                for j in range(len(rates)):
+                    rows.append({
+                        "background": bkg_name,
+                        "model": c_name,
+                        "sample": sample_name,
+                        "roc": roc_type,
+                        "rate_kHz": rates[j],
+                        "cicada_threshold": None if ht_axis else thresholds[j],
+                        "ht_threshold": thresholds[j] if ht_axis else ht_fixed,
+                        "efficiency": efficiency[j],
+                        "efficiency_err": efficiency_err[j],
+                    })
+
+    return rows
+
+def writeTable(rows, path):
+    columns = ["background", "model", "sample", "roc", "rate_kHz", "cicada_threshold", "ht_threshold", "efficiency", "efficiency_err"]
+    with open(path, "w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(["" if row[column] is None else row[column] for column in columns])
+
+def main(file_prefix, rates, bkg_names, out_path, roc_dir):
+
+    ROOT.gROOT.SetBatch(True)
+
+    start = time.perf_counter()
+    repo = getHists(file_prefix)
+    rocs = getRocs(roc_dir)
+
+    rows = []
+    for bkg_name in bkg_names:
+        rows += workingPoints(repo, rocs, bkg_name, rates)
+    repo.close()
+
+    writeTable(rows, out_path)
+    print(f"Wrote {len(rows)} working points to {out_path} in {time.perf_counter() - start:.1f} s ({rocs.n_read} ROC curves read from {roc_dir}, {rocs.n_computed} computed)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This program tabulates CICADA and HT thresholds and signal efficiencies at fixed background rates"
+    )
+    parser.add_argument("-p", "--file_prefix", help="prefix of files containing histograms")
+    parser.add_argument("-r", "--rates", type=float, nargs="+", default=[1.0, 2.0, 5.0, 10.0], help="background rates in kHz")
+    parser.add_argument("-b", "--backgrounds", nargs="+", default=["ZeroBias"], choices=bkg_samples, help="backgrounds the rates refer to")
+    parser.add_argument("-o", "--out_path", default="workingPoints.csv", help="path of the output table")
+    parser.add_argument("--roc_store", default="rocCurves", help="directory of the cached ROC curves")
+
+    args = parser.parse_args()
+
+    main(args.file_prefix, args.rates, args.backgrounds, args.out_path, args.roc_store)
@@ -0,0 +1,112 @@
+########################################################################
+## profiling.py                                                       ##
+## opt-in timing of chain building, dataframe creation and event      ##
+## loops, with a per-run JSON report and a summary table             ##
+########################################################################
+
+
+#!/usr/bin/env python3
+
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import ROOT
+
+#Profiling is off unless the environment variable CICADA_PROFILE holds
+#the path of the JSON report to write, or enable is called
+reportPath = os.environ.get("CICADA_PROFILE")
+records = []
+#Count results booked on the dataframes, read once their loop has run
+pendingCounts = []
+startTime = time.time()
+
+def enabled():
+    return reportPath != None
+
+#Turns profiling on for the rest of the run and writes the report to
+#path when the program exits
+def enable(path:str):
+    global reportPath
+    if reportPath == None:
+        atexit.register(report)
+    reportPath = path
+
+#Times the block as one record of stage (e.g. generateChains), with the
+#bytes read from ROOT files during it. For blocks running event loops,
+#countEvents also records the number of events of the dataframes passed
+#to trackEvents whose loop ran. Does nothing when profiling is off
+@contextmanager
+def stage(name:str, label:str=None, countEvents:bool=False):
+    if not enabled():
+        yield None
+        return
+    record = {"stage": name, "label": label, "events": None}
+    bytesBefore = ROOT.TFile.GetFileBytesRead()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["bytes_read"] = ROOT.TFile.GetFileBytesRead() - bytesBefore
+        if countEvents:
+            record["events"] = collectEvents()
+        records.append(record)
+
+#Books a count of the events of theDataframe so that the next event loop
+#reports how many events it processed
+def trackEvents(theDataframe):
+    if enabled():
+        pendingCounts.append(theDataframe.Count())
+
+#Number of events processed by the loops that ran since the last call
+def collectEvents():
+    global pendingCounts
+    ready = [count for count in pendingCounts if count.IsReady()]
+    pendingCounts = [count for count in pendingCounts if not count.IsReady()]
+    return sum(int(count.GetValue()) for count in ready)
+
+#Per stage totals of the records
+def summary():
+    stages = {}
+    for record in records:
+        total = stages.setdefault(record["stage"], {"calls": 0, "seconds": 0.0, "bytes_read": 0, "events": 0})
+        total["calls"] += 1
+        total["seconds"] += record["seconds"]
+        total["bytes_read"] += record["bytes_read"]
+        total["events"] += record["events"] or 0
+    return stages
+
+#Writes the JSON report of this run and prints the summary table
+def report(path:str=None):
+    if path == None:
+        path = reportPath
+    if path == None:
+        return
+
+    stages = summary()
+    with open(path, "w") as outfile:
+        json.dump(
+            {
+                "command": sys.argv,
+                "start_time": startTime,
+                "wall_seconds": time.time() - startTime,
+                "summary": stages,
+                "records": records,
+            },
+            outfile,
+            indent=4
+        )
+
+    print(f"{'stage':<20} {'calls':>6} {'seconds':>10} {'MB read':>10} {'events':>12} {'events/s':>12}")
+    for name in stages:
+        total = stages[name]
+        rate = total["events"] / total["seconds"] if total["events"] > 0 and total["seconds"] > 0 else 0
+        print(f"{name:<20} {total['calls']:>6} {total['seconds']:>10.2f} {total['bytes_read']/1e6:>10.1f} {total['events']:>12} {rate:>12.0f}")
+    print(f"Profile written to {path}")
+
+if reportPath != None:
+    atexit.register(report)
@@ -7,28 +7,61 @@
 
 #!/usr/bin/env python3
 
+import os
 import ROOT
+import profiling
+from fileCatalog import filesHash
 
 class sample:
-    def __init__(self, listOfFiles:list[str], treeNames:list[str]):
+    # directory/tree name of the tree written by snapshot
+    snapshotTreeName = 'skim/Events'
+    # directory holding the friend indices built for friendCheck = "index"
+    indexCacheDir = 'friendIndices'
+    # branches the friend indices are built on. Event numbers are unique
+    # within a run, so the lumisection is not needed to find an event
+    indexMajor = 'run'
+    indexMinor = 'event'
+
+    #friendCheck decides how friend trees are kept event aligned:
+    #  None      pair friends by entry number, unchecked
+    #  "entries" check up front that every file holds the same number of
+    #            entries in each tree, and fail if not
+    #  "index"   look friends up by (run, event) through an index cached
+    #            in indexCacheDir. Friends without these branches get the
+    #            entries check instead
+    #fileEntries maps file names to the entries of each tree, as recorded
+    #by compareScores/saveFilesToJSON.py, so the entries check does not
+    #have to open the files
+    def __init__(self, listOfFiles:list[str], treeNames:list[str], friendCheck:str=None, fileEntries:dict=None):
+        assert(friendCheck in [None, "entries", "index"]), f"Unknown friend check {friendCheck}"
         self.listOfFiles = listOfFiles
         self.treeNames = treeNames
+        self.friendCheck = friendCheck
+        self.fileEntries = fileEntries if fileEntries != None else {}
+        self.checkedTrees = set()
 
     #We're going to move this off to be a reset of state
     #since undoing the friend process doesn't seem to be working
     def generateChains(self):
-        self.chains = {}
-        for treeName in self.treeNames:
-            splitName = treeName.split('/')
-            assert(len(splitName) == 2), "Sample got a tree name without a splitting /, or with more than one. This is not implemented"
-            if splitName[0] not in self.chains.keys():
-                self.chains[splitName[0]] = {}
-            self.chains[splitName[0]][splitName[1]] = ROOT.TChain(treeName)
+        with profiling.stage("generateChains", self.profileLabel()):
+            self.chains = {}
+            for treeName in self.treeNames:
+                splitName = treeName.split('/')
+                assert(len(splitName) == 2), "Sample got a tree name without a splitting /, or with more than one. This is not implemented"
+                if splitName[0] not in self.chains.keys():
+                    self.chains[splitName[0]] = {}
+                self.chains[splitName[0]][splitName[1]] = ROOT.TChain(treeName)
 
-        for fileName in self.listOfFiles:
-            for directoryName in self.chains:
-                for treeName in self.chains[directoryName]:
-                    self.chains[directoryName][treeName].Add(fileName)
+            for fileName in self.listOfFiles:
+                for directoryName in self.chains:
+                    for treeName in self.chains[directoryName]:
+                        self.chains[directoryName][treeName].Add(fileName)
+
+    #Identifies the sample in profiling records
+    def profileLabel(self):
+        if len(self.listOfFiles) == 0:
+            return "no files"
+        return f"{self.listOfFiles[0]} (+{len(self.listOfFiles) - 1} files)"
 
     def listOfNamesToListOfChains(self, listOfTrees:list[str]):
         finalList = []
@@ -50,20 +83,143 @@ class sample:
                 finalList.append(self.chains[directoryName][treeName])
         return finalList
 
+    #Returns the files in which the trees treeNames (all trees of the
+    #sample by default) do not all hold the same number of entries, with
+    #the entries of each tree. A tree missing from a file has None entries
+    def entryMismatches(self, treeNames:list[str]=None):
+        if treeNames == None:
+            treeNames = self.treeNames
+        mismatched = []
+        for fileName in self.listOfFiles:
+            entries = self.entriesOf(fileName, treeNames)
+            if len(set(entries.values())) > 1:
+                mismatched.append({"file": fileName, "entries": entries})
+        return mismatched
+
+    #Entries of each tree of treeNames in fileName, from fileEntries where
+    #recorded and otherwise from the file itself
+    def entriesOf(self, fileName:str, treeNames:list[str]):
+        recorded = self.fileEntries.get(fileName) or {}
+        entries = {treeName: recorded.get(treeName) for treeName in treeNames}
+        missing = [treeName for treeName in treeNames if entries[treeName] == None]
+        if len(missing) > 0:
+            theFile = ROOT.TFile.Open(fileName)
+            if not theFile or theFile.IsZombie():
+                raise OSError(f"Could not open {fileName}")
+            for treeName in missing:
+                tree = theFile.Get(treeName)
+                entries[treeName] = int(tree.GetEntries()) if tree else None
+            theFile.Close()
+        return entries
+
+    #Path of the cached index of treeName on this sample's files. The key
+    #changes whenever a file is added, removed or rewritten
+    def indexPath(self, treeName:str):
+        treeKey = f"{treeName}_{sample.indexMajor}_{sample.indexMinor}".replace('/', '_')
+        return os.path.join(sample.indexCacheDir, f"{treeKey}_{filesHash(self.listOfFiles)}.root")
+
+    #Gives the friend chain an index on (run, event), so that its entries
+    #are looked up by event rather than paired by entry number with
+    #theChain. The index is read from the cache if it was built before on
+    #the same files. Returns False if either chain lacks the branches
+    def attachIndex(self, treeName:str, chain, theChain):
+        for branchName in [sample.indexMajor, sample.indexMinor]:
+            if not chain.GetBranch(branchName) or not theChain.GetBranch(branchName):
+                return False
+
+        path = self.indexPath(treeName)
+        index = None
+        if os.path.exists(path):
+            indexFile = ROOT.TFile.Open(path)
+            if indexFile and not indexFile.IsZombie():
+                index = indexFile.Get("index")
+            if index:
+                #the chain deletes its index
+                ROOT.SetOwnership(index, False)
+                index.SetTree(chain)
+                chain.SetTreeIndex(index)
+            indexFile.Close()
+
+        if not index:
+            chain.BuildIndex(sample.indexMajor, sample.indexMinor)
+            index = chain.GetTreeIndex()
+            #an index of the whole chain can be stored on its own
+            if index and index.ClassName() == "TTreeIndex":
+                os.makedirs(sample.indexCacheDir, exist_ok=True)
+                tmpPath = f"{path}.{os.getpid()}.tmp"
+                indexFile = ROOT.TFile(tmpPath, "RECREATE")
+                indexFile.WriteObject(index, "index")
+                indexFile.Close()
+                os.replace(tmpPath, path)
+        return True
+
+    #Makes sure the friends of the first of treeNames are read with the
+    #right events, according to friendCheck, before anything is read.
+    #Raises RuntimeError if the entries of the trees do not match
+    def alignFriends(self, treeNames:list[str], listOfChains:list):
+        unindexed = [treeNames[0]]
+        for treeName, chain in zip(treeNames[1:], listOfChains[1:]):
+            if self.friendCheck == "index" and self.attachIndex(treeName, chain, listOfChains[0]):
+                continue
+            unindexed.append(treeName)
+
+        #the files of a sample do not change, so each set of trees is
+        #only checked once
+        checked = tuple(sorted(unindexed))
+        if len(unindexed) < 2 or checked in self.checkedTrees:
+            return
+        mismatched = self.entryMismatches(unindexed)
+        if len(mismatched) > 0:
+            details = "\n".join(f"    {m['file']}: {m['entries']}" for m in mismatched[:10])
+            raise RuntimeError(
+                f"Friend trees of {len(mismatched)} file(s) hold different numbers of entries and would be paired with the wrong events:\n{details}"
+            )
+        self.checkedTrees.add(checked)
+
     def getNewChain(self, listOfTrees:list[str]=None):
         self.generateChains()
         if listOfTrees != None:
             listOfChains = self.listOfNamesToListOfChains(listOfTrees)
         else:
+            #all chains, in the order of self.chains as before
+            listOfTrees = [f"{directoryName}/{treeName}" for directoryName in self.chains for treeName in self.chains[directoryName]]
             listOfChains = self.getListOfAllChains()
         theChain = listOfChains[0]
-        if len(listOfChains) > 1:
-            for chain in listOfChains[1:]:
-                theChain.AddFriend(chain)
+        if self.friendCheck != None:
+            foundTrees = [treeName for treeName in listOfTrees if treeName in self.treeNames]
+            with profiling.stage("alignFriends", self.profileLabel()):
+                self.alignFriends(foundTrees, listOfChains)
+        with profiling.stage("addFriends", self.profileLabel()):
+            if len(listOfChains) > 1:
+                for chain in listOfChains[1:]:
+                    theChain.AddFriend(chain)
         return theChain
 
     def getNewDataframe(self, listOfTrees:list[str]=None):
         theChain = self.getNewChain(listOfTrees)
-        theDataframe = ROOT.RDataFrame(theChain)
+        with profiling.stage("getNewDataframe", self.profileLabel()):
+            theDataframe = ROOT.RDataFrame(theChain)
+        profiling.trackEvents(theDataframe)
         return theDataframe
 
+    #Write only the listed columns of the full friend chain to one compact
+    #local file. defines maps names of extra columns to the expressions
+    #computed for them before writing (e.g. a trigger OR). theDataframe
+    #is a dataframe of this sample already built with getNewDataframe,
+    #so that the chain is not built again
+    def snapshot(self, columns:list[str], path:str, defines:dict[str, str]=None, listOfTrees:list[str]=None, theDataframe=None):
+        if theDataframe == None:
+            theDataframe = self.getNewDataframe(listOfTrees)
+        if defines != None:
+            for columnName in defines:
+                theDataframe = theDataframe.Define(columnName, defines[columnName])
+        with profiling.stage("snapshot", path, countEvents=True):
+            theDataframe.Snapshot(sample.snapshotTreeName, path, columns)
+        return sample.fromSnapshot(path)
+
+    #Build a sample reading back the file(s) written by snapshot
+    @staticmethod
+    def fromSnapshot(path):
+        if isinstance(path, str):
+            path = [path]
+        return sample(listOfFiles = path, treeNames = [sample.snapshotTreeName])